@@ -6,6 +6,18 @@ import "./CurrencyNetworkBasicV2.sol";
 contract CurrencyNetworkOwnableV2 is CurrencyNetworkV2 {
     address public owner;
 
+    struct AccountMigration {
+        address creditor;
+        address debtor;
+        uint64 creditlineGiven;
+        uint64 creditlineReceived;
+        int16 interestRateGiven;
+        int16 interestRateReceived;
+        bool isFrozen;
+        uint32 mtime;
+        int72 balance;
+    }
+
     event NetworkUnfreeze();
     event OwnerRemoval();
 
@@ -17,6 +29,14 @@ contract CurrencyNetworkOwnableV2 is CurrencyNetworkV2 {
         _;
     }
 
+    /**
+     * @dev Throws if the network is not frozen.
+     */
+    modifier onlyFrozen() {
+        require(isNetworkFrozen == true, "Network is not frozen");
+        _;
+    }
+
     function removeOwner() external onlyOwner {
         owner = address(0);
         emit OwnerRemoval();
@@ -46,40 +66,32 @@ contract CurrencyNetworkOwnableV2 is CurrencyNetworkV2 {
         uint32 _mtime,
         int72 _balance
     ) external virtual onlyOwner {
-        TrustlineAgreement memory trustlineAgreement;
-        trustlineAgreement.creditlineGiven = _creditlineGiven;
-        trustlineAgreement.creditlineReceived = _creditlineReceived;
-        trustlineAgreement.interestRateGiven = _interestRateGiven;
-        trustlineAgreement.interestRateReceived = _interestRateReceived;
-        trustlineAgreement.isFrozen = _isFrozen;
-
-        // We apply the interests and set mtime to now because it should match with
-        // the time at which BalanceUpdate is emitted (e.g. to compute pending interests offchain)
-        TrustlineBalances memory trustlineBalances;
-        trustlineBalances.mtime = uint32(block.timestamp);
-        int72 balanceWithInterests = calculateBalanceWithInterests(
-            _balance,
-            _mtime,
-            block.timestamp,
-            _interestRateGiven,
-            _interestRateReceived
-        );
-        trustlineBalances.balance = balanceWithInterests;
-
-        _storeTrustlineAgreement(_creditor, _debtor, trustlineAgreement);
-        _storeTrustlineBalances(_creditor, _debtor, trustlineBalances);
+        AccountMigration memory account;
+        account.creditor = _creditor;
+        account.debtor = _debtor;
+        account.creditlineGiven = _creditlineGiven;
+        account.creditlineReceived = _creditlineReceived;
+        account.interestRateGiven = _interestRateGiven;
+        account.interestRateReceived = _interestRateReceived;
+        account.isFrozen = _isFrozen;
+        account.mtime = _mtime;
+        account.balance = _balance;
+        _migrateAccount(account);
+    }
 
-        addToUsersAndFriends(_creditor, _debtor);
-        emit TrustlineUpdate(
-            _creditor,
-            _debtor,
-            _creditlineGiven,
-            _creditlineReceived,
-            _interestRateGiven,
-            _interestRateReceived,
-            _isFrozen
-        );
-        emit BalanceUpdate(_creditor, _debtor, balanceWithInterests);
+    /**
+     * @dev Set the accounts of multiple trustlines at once, see `setAccount`.
+     *      Can only be used while the network is frozen, i.e. during its migration.
+     * @param _accounts The accounts to set
+     */
+    function setAccounts(AccountMigration[] calldata _accounts)
+        external
+        onlyOwner
+        onlyFrozen
+    {
+        for (uint256 i = 0; i < _accounts.length; i++) {
+            _migrateAccount(_accounts[i]);
+        }
     }
 
     /**
@@ -114,8 +126,24 @@ contract CurrencyNetworkOwnableV2 is CurrencyNetworkV2 {
     }
 
     function setOnboarder(address user, address onBoarder) external onlyOwner {
-        onboarder[user] = onBoarder;
-        emit Onboard(onBoarder, user);
+        _setOnboarder(user, onBoarder);
+    }
+
+    /**
+     * @dev Set the onboarders of multiple users at once, see `setOnboarder`.
+     *      Can only be used while the network is frozen, i.e. during its migration.
+     * @param users The users to set the onboarder of
+     * @param onBoarders The onboarders of the users at the same index
+     */
+    function setOnboarders(address[] calldata users, address[] calldata onBoarders)
+        external
+        onlyOwner
+        onlyFrozen
+    {
+        require(users.length == onBoarders.length, "Arrays length mismatch");
+        for (uint256 i = 0; i < users.length; i++) {
+            _setOnboarder(users[i], onBoarders[i]);
+        }
     }
 
     function setDebt(
@@ -126,6 +154,28 @@ contract CurrencyNetworkOwnableV2 is CurrencyNetworkV2 {
         _addToDebt(debtor, creditor, value);
     }
 
+    /**
+     * @dev Set the debts of multiple pairs of users at once, see `setDebt`.
+     *      Can only be used while the network is frozen, i.e. during its migration.
+     * @param debtors The debtors of the debts
+     * @param creditors The creditors of the debts at the same index
+     * @param values The values of the debts at the same index
+     */
+    function setDebts(
+        address[] calldata debtors,
+        address[] calldata creditors,
+        int256[] calldata values
+    ) external onlyOwner onlyFrozen {
+        require(
+            debtors.length == creditors.length &&
+                debtors.length == values.length,
+            "Arrays length mismatch"
+        );
+        for (uint256 i = 0; i < debtors.length; i++) {
+            _addToDebt(debtors[i], creditors[i], values[i]);
+        }
+    }
+
     function unfreezeNetwork() external onlyOwner {
         require(isNetworkFrozen == true, "Network is not frozen");
         isNetworkFrozen = false;
@@ -170,6 +220,60 @@ contract CurrencyNetworkOwnableV2 is CurrencyNetworkV2 {
             authorizedAddresses
         );
     }
+
+    function _migrateAccount(AccountMigration memory _account) internal {
+        TrustlineAgreement memory trustlineAgreement;
+        trustlineAgreement.creditlineGiven = _account.creditlineGiven;
+        trustlineAgreement.creditlineReceived = _account.creditlineReceived;
+        trustlineAgreement.interestRateGiven = _account.interestRateGiven;
+        trustlineAgreement.interestRateReceived = _account.interestRateReceived;
+        trustlineAgreement.isFrozen = _account.isFrozen;
+
+        // We apply the interests and set mtime to now because it should match with
+        // the time at which BalanceUpdate is emitted (e.g. to compute pending interests offchain)
+        TrustlineBalances memory trustlineBalances;
+        trustlineBalances.mtime = uint32(block.timestamp);
+        int72 balanceWithInterests = calculateBalanceWithInterests(
+            _account.balance,
+            _account.mtime,
+            block.timestamp,
+            _account.interestRateGiven,
+            _account.interestRateReceived
+        );
+        trustlineBalances.balance = balanceWithInterests;
+
+        _storeTrustlineAgreement(
+            _account.creditor,
+            _account.debtor,
+            trustlineAgreement
+        );
+        _storeTrustlineBalances(
+            _account.creditor,
+            _account.debtor,
+            trustlineBalances
+        );
+
+        addToUsersAndFriends(_account.creditor, _account.debtor);
+        emit TrustlineUpdate(
+            _account.creditor,
+            _account.debtor,
+            _account.creditlineGiven,
+            _account.creditlineReceived,
+            _account.interestRateGiven,
+            _account.interestRateReceived,
+            _account.isFrozen
+        );
+        emit BalanceUpdate(
+            _account.creditor,
+            _account.debtor,
+            balanceWithInterests
+        );
+    }
+
+    function _setOnboarder(address user, address onBoarder) internal {
+        onboarder[user] = onBoarder;
+        emit Onboard(onBoarder, user);
+    }
 }
 
 // SPDX-License-Identifier: MIT
@@ -0,0 +1,35 @@
+pragma solidity ^0.8.0;
+
+/**
+ * @title Aggregate the results of multiple view calls into a single call
+ **/
+contract Multicall {
+    struct Call {
+        address target;
+        bytes callData;
+    }
+
+    /**
+     * @dev Call every target with its call data, reverts if any of the calls fails
+     * @param calls The calls to make
+     * @return blockNumber The number of the block the calls were made in
+     * @return returnData The data returned by every call, in the order of `calls`
+     */
+    function aggregate(Call[] calldata calls)
+        external
+        view
+        returns (uint256 blockNumber, bytes[] memory returnData)
+    {
+        blockNumber = block.number;
+        returnData = new bytes[](calls.length);
+        for (uint256 i = 0; i < calls.length; i++) {
+            (bool success, bytes memory data) = calls[i].target.staticcall(
+                calls[i].callData
+            );
+            require(success, "Multicall: call failed");
+            returnData[i] = data;
+        }
+    }
+}
+
+// SPDX-License-Identifier: MIT
@@ -52,6 +52,7 @@ setup(
         "contract-deploy-tools>=0.11.1",
         "attrs>=18.2",
         "pendulum>=2.0.0",
+        "requests>=2.16.0,<3.0.0",
     ],
     python_requires=">=3.6",
     # To provide executable scripts, use entry points in preference to the
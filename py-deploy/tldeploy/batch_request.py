@@ -0,0 +1,107 @@
+import itertools
+import json
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+from hexbytes import HexBytes
+from web3 import HTTPProvider, Web3
+from web3._utils.request import make_post_request
+
+# Ids of the requests in batches, unique per process so that responses cannot be mixed up
+_request_ids = itertools.count()
+
+
+def make_batch_request(
+    provider: HTTPProvider, requests: Sequence[Tuple[str, List[Any]]]
+) -> List[Dict]:
+    """Send the json rpc `requests` of method and params in a single batch request to the node of `provider`
+    and return the responses in the order of `requests`. The params have to be formatted for json rpc already."""
+    if not requests:
+        return []
+    if provider.endpoint_uri is None:
+        raise ValueError("Batch requests need a provider with an endpoint uri")
+    request_ids = [next(_request_ids) for _ in requests]
+    request_data = json.dumps(
+        [
+            {"jsonrpc": "2.0", "method": method, "params": params, "id": request_id}
+            for request_id, (method, params) in zip(request_ids, requests)
+        ]
+    ).encode()
+    raw_response = make_post_request(
+        provider.endpoint_uri, request_data, **provider.get_request_kwargs()
+    )
+    responses = json.loads(raw_response)
+    if not isinstance(responses, list):
+        # Nodes answer a batch with a single error, e.g. if they do not support batches
+        raise ValueError(f"Batch request failed: {responses}")
+    responses_by_id = {response.get("id"): response for response in responses}
+    return [
+        responses_by_id.get(
+            request_id, {"error": f"No response to request with id {request_id}"}
+        )
+        for request_id in request_ids
+    ]
+
+
+def estimate_gas_batch(
+    web3: Web3, transactions: Sequence[Dict]
+) -> List[Union[int, Exception]]:
+    """Estimate the gas of `transactions` with their fields `from`, `to`, `data` and optionally `value`.
+    Returns the estimated gas or the error per transaction, in the order of `transactions`.
+
+    With an `HTTPProvider`, all estimations are sent in a single batch request,
+    otherwise one `eth_estimateGas` request is sent per transaction."""
+    if not isinstance(web3.provider, HTTPProvider):
+        return [_estimate_gas(web3, transaction) for transaction in transactions]
+
+    responses = make_batch_request(
+        web3.provider,
+        [
+            ("eth_estimateGas", [_format_transaction(transaction)])
+            for transaction in transactions
+        ],
+    )
+    return [
+        ValueError(response["error"])
+        if "error" in response
+        else int(response["result"], 16)
+        for response in responses
+    ]
+
+
+def get_code_batch(web3: Web3, addresses: Sequence[str]) -> List[HexBytes]:
+    """Get the code of `addresses` at the latest block, in the order of `addresses`.
+
+    With an `HTTPProvider`, the codes are fetched in a single batch request,
+    otherwise one `eth_getCode` request is sent per address."""
+    if not isinstance(web3.provider, HTTPProvider):
+        return [web3.eth.getCode(address) for address in addresses]
+
+    responses = make_batch_request(
+        web3.provider, [("eth_getCode", [address, "latest"]) for address in addresses]
+    )
+    codes = []
+    for address, response in zip(addresses, responses):
+        if "error" in response:
+            raise ValueError(
+                f"Could not get the code of {address}: {response['error']}"
+            )
+        codes.append(HexBytes(response["result"]))
+    return codes
+
+
+def _estimate_gas(web3: Web3, transaction: Dict) -> Union[int, Exception]:
+    try:
+        return web3.eth.estimateGas(transaction)
+    except Exception as exception:
+        return exception
+
+
+def _format_transaction(transaction: Dict) -> Dict:
+    formatted_transaction = {
+        "from": transaction["from"],
+        "to": transaction["to"],
+        "data": HexBytes(transaction["data"]).hex(),
+    }
+    if "value" in transaction:
+        formatted_transaction["value"] = hex(transaction["value"])
+    return formatted_transaction
@@ -0,0 +1,113 @@
+# This file provides a tracker of the latest blocks of the chain,
+# which keeps state derived from events current and rolls it back when blocks get reorganized
+import collections
+from typing import List, Optional
+
+from hexbytes import HexBytes
+from web3.exceptions import BlockNotFound
+
+DEFAULT_HISTORY_SIZE = 128
+
+
+class ReorgTooDeep(Exception):
+    pass
+
+
+class BlockTracker:
+    """Tracker of the hashes of the last `history_size` blocks that feeds new blocks to registered consumers.
+
+    Consumers provide `apply_blocks(from_block, to_block)` to apply the events of the given blocks
+    and `roll_back(block_number)` to discard everything they derived from the blocks from `block_number` on.
+    They may provide `finalize(block_number)`, called with the oldest tracked block,
+    to drop what they keep to roll back to blocks before it, which will not be reorganized anymore.
+
+    `update` first compares the tracked hashes with the chain. If blocks were reorganized,
+    all consumers roll back to the first reorganized block, and only then the blocks from there up to
+    the latest block minus `confirmations` are applied again. A reorganisation of all tracked blocks
+    raises `ReorgTooDeep`, as the first reorganized block cannot be known."""
+
+    def __init__(
+        self,
+        web3,
+        *,
+        next_block: int = 0,
+        history_size: int = DEFAULT_HISTORY_SIZE,
+        confirmations: int = 0,
+    ):
+        if history_size < 1:
+            raise ValueError(f"History size has to be positive, got {history_size}")
+        self.web3 = web3
+        self.next_block = next_block
+        self.history_size = history_size
+        self.confirmations = confirmations
+        # Block number to block hash of the last tracked blocks, in ascending order
+        self._block_hashes: collections.OrderedDict = collections.OrderedDict()
+        self._consumers: List = []
+
+    def register(self, consumer) -> None:
+        """Register a consumer, which has to be current up to the block before `next_block`"""
+        self._consumers.append(consumer)
+
+    def update(self) -> Optional[int]:
+        """Roll back reorganized blocks and apply the new ones to all consumers,
+        return the first reorganized block if there was a reorganisation"""
+        first_reorganized_block = self._find_first_reorganized_block()
+        if first_reorganized_block is not None:
+            self._roll_back(first_reorganized_block)
+
+        from_block = self.next_block
+        to_block = self.web3.eth.blockNumber - self.confirmations
+        if to_block < from_block:
+            return first_reorganized_block
+
+        last_block_hash = self._track_blocks(from_block, to_block)
+        for consumer in self._consumers:
+            consumer.apply_blocks(from_block, to_block)
+        if self._get_block_hash(to_block) != last_block_hash:
+            # Reorganized while applying, the consumers may have applied blocks of either chain
+            self._roll_back(from_block)
+            return first_reorganized_block
+
+        self.next_block = to_block + 1
+        oldest_tracked_block = next(iter(self._block_hashes))
+        for consumer in self._consumers:
+            if hasattr(consumer, "finalize"):
+                consumer.finalize(oldest_tracked_block)
+        return first_reorganized_block
+
+    def _find_first_reorganized_block(self) -> Optional[int]:
+        first_reorganized_block = None
+        for block_number, block_hash in reversed(self._block_hashes.items()):
+            if self._get_block_hash(block_number) == block_hash:
+                return first_reorganized_block
+            first_reorganized_block = block_number
+        if first_reorganized_block is not None:
+            raise ReorgTooDeep(
+                f"All tracked blocks from {first_reorganized_block} on were reorganized."
+            )
+        return None
+
+    def _roll_back(self, block_number: int) -> None:
+        for consumer in self._consumers:
+            consumer.roll_back(block_number)
+        for tracked_block_number in list(reversed(self._block_hashes)):
+            if tracked_block_number < block_number:
+                break
+            del self._block_hashes[tracked_block_number]
+        self.next_block = min(self.next_block, block_number)
+
+    def _track_blocks(self, from_block: int, to_block: int) -> Optional[str]:
+        """Track the hashes of the last blocks up to `to_block` and return the hash of `to_block`"""
+        for block_number in range(
+            max(from_block, to_block - self.history_size + 1), to_block + 1
+        ):
+            self._block_hashes[block_number] = self._get_block_hash(block_number)
+        while len(self._block_hashes) > self.history_size:
+            self._block_hashes.popitem(last=False)
+        return self._block_hashes[to_block]
+
+    def _get_block_hash(self, block_number: int) -> Optional[str]:
+        try:
+            return HexBytes(self.web3.eth.getBlock(block_number)["hash"]).hex()
+        except BlockNotFound:
+            return None
@@ -28,6 +28,7 @@ from tldeploy.identity import (
 
 from .core import (
     deploy_exchange,
+    deploy_multicall,
     deploy_network,
     deploy_networks,
     deploy_unw_eth,
@@ -37,10 +38,12 @@ from .core import (
     deploy_currency_network_proxy,
     unfreeze_owned_network,
     remove_owner_of_network,
-    deploy_gnosis_safe,
-    deploy_gnosis_safe_proxy_factory,
+    get_chain_id,
 )
+from tldeploy.interest_report import generate_interest_report, write_interest_report_csv
+from tldeploy.load_contracts import get_contract_interface
 from tldeploy.migration import migrate_networks, verify_networks_migrations
+from tldeploy.pipeline import TransactionPipeline
 
 
 def report_version():
@@ -60,6 +63,16 @@ def validate_date(ctx, param, value):
         ) from e
 
 
+def validate_optional_address(ctx, param, value):
+    if value is None:
+        return None
+    return validate_address(ctx, param, value)
+
+
+def validate_addresses(ctx, param, values):
+    return [validate_address(ctx, param, value) for value in values]
+
+
 @click.group(invoke_without_command=True)
 @click.option("--version", help="Prints the version of the software", is_flag=True)
 @click.pass_context
@@ -97,6 +110,37 @@ proxy_owner_option = click.option(
     callback=validate_address,
 )
 
+parallel_option = click.option(
+    "--parallel",
+    help="Number of networks migrated at the same time, their transactions are sent with consecutive nonces",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+)
+
+batch_gas_budget_option = click.option(
+    "--batch-gas-budget",
+    help="Gas budget of the transactions migrating accounts, on boarders and debts in batches, "
+    "if left out every item is migrated in its own transaction",
+    default=None,
+    type=click.IntRange(min=1),
+)
+safe_address_cache_option = click.option(
+    "--safe-address-cache",
+    "safe_address_cache_file_path",
+    help="Path to a file caching the gnosis safe addresses of migrated users across runs",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+)
+
+read_workers_option = click.option(
+    "--read-workers",
+    help="Number of threads reading accounts from the source chain while migrating",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+)
+
 
 @cli.command(short_help="Deploy a currency network contract.")
 @click.argument("name", type=str)
@@ -295,6 +339,28 @@ def exchange(jsonrpc: str, gas: int, gas_price: int, nonce: int, keystore: str):
     click.echo("Unwrapping ether: {}".format(to_checksum_address(unw_eth_address)))
 
 
+@cli.command(short_help="Deploy a multicall contract.")
+@jsonrpc_option
+@gas_option
+@gas_price_option
+@nonce_option
+@keystore_option
+def multicall(jsonrpc: str, gas: int, gas_price: int, nonce: int, keystore: str):
+    """Deploy a contract to aggregate view calls, used to speed up reading state of currency networks
+    e.g. when verifying a migration.
+    """
+    web3 = connect_to_json_rpc(jsonrpc)
+    private_key = retrieve_private_key(keystore)
+    nonce = get_nonce(web3=web3, nonce=nonce, private_key=private_key)
+    transaction_options = build_transaction_options(
+        gas=gas, gas_price=gas_price, nonce=nonce
+    )
+    multicall_contract = deploy_multicall(
+        web3=web3, transaction_options=transaction_options, private_key=private_key
+    )
+    click.echo("Multicall: {}".format(to_checksum_address(multicall_contract.address)))
+
+
 @cli.command(short_help="Deploy an identity implementation contract.")
 @jsonrpc_option
 @gas_option
@@ -428,29 +494,32 @@ def test(
     transaction_options = build_transaction_options(
         gas=gas, gas_price=gas_price, nonce=nonce
     )
-    networks, exchange, unw_eth = deploy_networks(
-        web3,
-        network_settings,
-        currency_network_contract_name=currency_network_contract_name,
-        transaction_options=transaction_options,
-        private_key=private_key,
-    )
-    identity_implementation = deploy_identity_implementation(
-        web3=web3, transaction_options=transaction_options, private_key=private_key
-    )
-    second_identity_implementation = deploy_identity_implementation(
-        web3=web3, transaction_options=transaction_options, private_key=private_key
-    )
-    identity_proxy_factory = deploy_identity_proxy_factory(
-        web3=web3, transaction_options=transaction_options, private_key=private_key
-    )
-
-    gnosis_safe = deploy_gnosis_safe(
-        web3=web3, transaction_options=transaction_options, private_key=private_key
-    )
-    gnosis_safe_proxy_factory = deploy_gnosis_safe_proxy_factory(
-        web3=web3, transaction_options=transaction_options, private_key=private_key
-    )
+    # All contracts are deployed back to back, so that the deployment only takes a few blocks
+    with TransactionPipeline(
+        web3, transaction_options=transaction_options, private_key=private_key
+    ) as pipeline:
+        identity_implementation_futures = [
+            pipeline.deploy("Identity"),
+            pipeline.deploy("Identity"),
+        ]
+        identity_proxy_factory_future = pipeline.deploy(
+            "IdentityProxyFactory", constructor_args=(get_chain_id(web3),)
+        )
+        gnosis_safe_future = pipeline.deploy("GnosisSafeL2")
+        gnosis_safe_proxy_factory_future = pipeline.deploy("GnosisSafeProxyFactory")
+
+        networks, exchange, unw_eth = deploy_networks(
+            web3,
+            network_settings,
+            currency_network_contract_name=currency_network_contract_name,
+            transaction_pipeline=pipeline,
+        )
+        identity_implementation, second_identity_implementation = [
+            future.result() for future in identity_implementation_futures
+        ]
+        identity_proxy_factory = identity_proxy_factory_future.result()
+        gnosis_safe = gnosis_safe_future.result()
+        gnosis_safe_proxy_factory = gnosis_safe_proxy_factory_future.result()
 
     addresses = dict()
     network_addresses = [network.address for network in networks]
@@ -564,6 +633,17 @@ def test(
     default=None,
 )
 @keystore_option
+@read_workers_option
+@batch_gas_budget_option
+@parallel_option
+@safe_address_cache_option
+@click.option(
+    "--journal-file",
+    "journal_file_path",
+    help="Path to a journal of the migration, used to resume an interrupted migration without resending transactions",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+)
 def migration(
     old_addresses_file_path: str,
     new_addresses_file_path: str,
@@ -575,6 +655,11 @@ def migration(
     nonce_source: int,
     nonce_dest: int,
     keystore: str,
+    read_workers: int,
+    journal_file_path: str,
+    batch_gas_budget: int,
+    parallel: int,
+    safe_address_cache_file_path: str,
 ):
     """Used to migrate old currency networks to new ones
     It will fetch information about users in the old contract and set them in the one
@@ -605,6 +690,11 @@ def migration(
         transaction_options_source=transaction_options_source,
         transaction_options_dest=transaction_options_dest,
         private_key=private_key,
+        read_workers=read_workers,
+        journal_file_path=journal_file_path,
+        batch_gas_budget=batch_gas_budget,
+        safe_address_cache_file_path=safe_address_cache_file_path,
+        parallel=parallel,
     )
 
 
@@ -671,6 +761,23 @@ def migration(
     type=str,
     callback=validate_address,
 )
+@click.option(
+    "--source-multicall",
+    "multicall_source_address",
+    help="Address of a multicall contract on the source chain used to read the old networks in bulk",
+    type=str,
+    default=None,
+    callback=validate_optional_address,
+)
+@click.option(
+    "--dest-multicall",
+    "multicall_dest_address",
+    help="Address of a multicall contract on the destination chain used to read the new networks in bulk",
+    type=str,
+    default=None,
+    callback=validate_optional_address,
+)
+@safe_address_cache_option
 def verify_migration(
     old_addresses_file_path: str,
     new_addresses_file_path: str,
@@ -678,6 +785,9 @@ def verify_migration(
     dest_rpc: str,
     master_copy_address: str,
     proxy_factory_address: str,
+    multicall_source_address: str,
+    multicall_dest_address: str,
+    safe_address_cache_file_path: str,
 ):
     """Used to verify migration of old currency networks to new ones
     The address files should contain currency network addresses with
@@ -693,6 +803,9 @@ def verify_migration(
         new_addresses_file_path,
         master_copy_address,
         proxy_factory_address,
+        multicall_source_address=multicall_source_address,
+        multicall_dest_address=multicall_dest_address,
+        safe_address_cache_file_path=safe_address_cache_file_path,
     )
 
 
@@ -812,6 +925,9 @@ def beacon(
     default=None,
 )
 @keystore_option
+@read_workers_option
+@batch_gas_budget_option
+@parallel_option
 def deploy_and_migrate(
     addresses_file_path: str,
     output_file_path: str,
@@ -825,6 +941,9 @@ def deploy_and_migrate(
     nonce_source: int,
     nonce_dest: int,
     keystore: str,
+    read_workers: int,
+    batch_gas_budget: int,
+    parallel: int,
 ):
     web3_source = connect_to_json_rpc(source_rpc)
     web3_dest = connect_to_json_rpc(dest_rpc)
@@ -852,6 +971,9 @@ def deploy_and_migrate(
         transaction_options_source=transaction_options_source,
         transaction_options_dest=transaction_options_dest,
         output_file_path=output_file_path,
+        read_workers=read_workers,
+        batch_gas_budget=batch_gas_budget,
+        parallel=parallel,
     )
 
 
@@ -1054,3 +1176,68 @@ def unfreeze_and_remove_owner(
         private_key=private_key,
         currency_network_address=currency_network_address,
     )
+
+
+@cli.command(
+    short_help="Report the interests applied to the trustlines of currency networks."
+)
+@click.option(
+    "--address",
+    "currency_network_addresses",
+    help="Address of a currency network to report, can be given multiple times",
+    required=True,
+    multiple=True,
+    type=str,
+    callback=validate_addresses,
+)
+@click.option(
+    "--from-date",
+    help="Report interests applied from this date on (e.g. '2020-09-01'). Per default from the start.",
+    type=str,
+    required=False,
+    metavar="DATE",
+    callback=validate_date,
+)
+@click.option(
+    "--to-date",
+    help="Report interests applied before this date (e.g. '2020-10-01'). Per default until the latest block.",
+    type=str,
+    required=False,
+    metavar="DATE",
+    callback=validate_date,
+)
+@click.option(
+    "--output",
+    "output_file_path",
+    help="Path to the csv file to write the report to",
+    required=True,
+    type=click.Path(dir_okay=False, writable=True),
+)
+@jsonrpc_option
+def interest_report(
+    currency_network_addresses,
+    from_date: pendulum.DateTime,
+    to_date: pendulum.DateTime,
+    output_file_path: str,
+    jsonrpc: str,
+):
+    """Write the interests applied per user and counterparty as csv"""
+    web3 = connect_to_json_rpc(jsonrpc)
+    currency_network_abi = get_contract_interface("CurrencyNetwork")["abi"]
+    currency_networks = [
+        web3.eth.contract(address=address, abi=currency_network_abi)
+        for address in currency_network_addresses
+    ]
+
+    with open(output_file_path, "w", newline="") as output_file:
+        number_of_rows = write_interest_report_csv(
+            output_file,
+            generate_interest_report(
+                currency_networks,
+                from_timestamp=int(from_date.timestamp()) if from_date else 0,
+                to_timestamp=int(to_date.timestamp()) if to_date else None,
+            ),
+        )
+    click.secho(
+        f"Reported {number_of_rows} interest accruals to {output_file_path}", fg="green"
+    )
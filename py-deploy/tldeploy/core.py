@@ -2,7 +2,8 @@
 # We like to get rid of the populus dependency and we don't want to compile the
 # contracts when running tests in this project.
 import json
-from typing import Dict
+import weakref
+from typing import Dict, Optional, Union
 
 import attr
 import click
@@ -14,8 +15,14 @@ from deploy_tools.transact import (
 from deploy_tools.files import read_addresses_in_csv
 from tldeploy.migration import (
     NetworkMigrater,
-    get_safe_address,
+    SafeAddressMapper,
+    SharedTransactionOptions,
+    as_shared_transaction_options,
+    concurrent_map,
+    report_failed_migration,
 )
+from tldeploy.journal import MigrationJournal, CONFIRMED
+from tldeploy.pipeline import TransactionPipeline
 from web3 import Web3
 from tldeploy.load_contracts import contracts, get_contract_interface
 
@@ -72,6 +79,22 @@ def deploy_exchange(
     return exchange
 
 
+def deploy_multicall(
+    *, web3: Web3, transaction_options: Dict = None, private_key: bytes = None
+):
+    if transaction_options is None:
+        transaction_options = {}
+
+    multicall = deploy(
+        "Multicall",
+        web3=web3,
+        transaction_options=transaction_options,
+        private_key=private_key,
+    )
+    increase_transaction_options_nonce(transaction_options)
+    return multicall
+
+
 def deploy_unw_eth(
     *,
     web3: Web3,
@@ -153,28 +176,55 @@ def deploy_networks(
     currency_network_contract_name=None,
     transaction_options: Dict = None,
     private_key=None,
+    transaction_pipeline: TransactionPipeline = None,
 ):
-    exchange = deploy_exchange(
-        web3=web3, transaction_options=transaction_options, private_key=private_key
-    )
-    unw_eth = deploy_unw_eth(
-        web3=web3,
-        exchange_address=exchange.address,
-        transaction_options=transaction_options,
-        private_key=private_key,
-    )
+    """Deploy an exchange, an unwrapping ether contract and currency networks for `network_settings`
+    The transactions are sent back to back via `transaction_pipeline`, or a new pipeline using
+    `transaction_options` and `private_key`, whose nonce is updated at the end."""
+    if transaction_options is None:
+        transaction_options = {}
+    if currency_network_contract_name is None:
+        currency_network_contract_name = "CurrencyNetwork"
 
-    networks = [
-        deploy_network(
-            web3,
-            exchange_address=exchange.address,
-            currency_network_contract_name=currency_network_contract_name,
-            transaction_options=transaction_options,
-            network_settings=network_setting,
-            private_key=private_key,
+    pipeline = transaction_pipeline
+    if pipeline is None:
+        pipeline = TransactionPipeline(
+            web3, transaction_options=transaction_options, private_key=private_key
         )
-        for network_setting in network_settings
-    ]
+
+    try:
+        exchange_future = pipeline.deploy("Exchange")
+        unw_eth_future = pipeline.deploy("UnwEth")
+        network_futures = [
+            pipeline.deploy(currency_network_contract_name) for _ in network_settings
+        ]
+
+        exchange = exchange_future.result()
+        unw_eth = unw_eth_future.result()
+        receipt_futures = [
+            pipeline.send_function_call(
+                unw_eth.functions.addAuthorizedAddress(exchange.address)
+            )
+        ]
+        networks = [network_future.result() for network_future in network_futures]
+        for network, network_setting in zip(networks, network_settings):
+            receipt_futures.append(
+                pipeline.send_function_call(
+                    build_init_currency_network_call(
+                        currency_network=network,
+                        network_settings=network_setting,
+                        exchange_address=exchange.address,
+                    )
+                )
+            )
+        for receipt_future in receipt_futures:
+            receipt_future.result()
+    finally:
+        if transaction_pipeline is None:
+            # Waits for the transactions in flight, also if one of them failed
+            pipeline.close()
+            if "nonce" in transaction_options:
+                transaction_options["nonce"] = pipeline.next_nonce
 
     return networks, exchange, unw_eth
 
@@ -237,6 +287,27 @@ def get_chain_id(web3):
     return int(web3.eth.chain_id)
 
 
+# The chain ids per web3 instance, dropped with the web3 instance
+_chain_ids: "weakref.WeakKeyDictionary[Web3, int]" = weakref.WeakKeyDictionary()
+
+
+def get_cached_chain_id(web3) -> int:
+    """Returns the chain id like `get_chain_id`, but fetches it only once per web3 instance
+    until `invalidate_chain_id_cache` is called, e.g. after switching the provider of `web3`"""
+    chain_id = _chain_ids.get(web3)
+    if chain_id is None:
+        chain_id = _chain_ids[web3] = get_chain_id(web3)
+    return chain_id
+
+
+def invalidate_chain_id_cache(web3=None) -> None:
+    """Drops the cached chain id of `web3`, or of all web3 instances if not given"""
+    if web3 is None:
+        _chain_ids.clear()
+    else:
+        _chain_ids.pop(web3, None)
+
+
 def deploy_beacon(
     web3,
     implementation_address,
@@ -345,12 +416,35 @@ def init_currency_network(
 ):
     if transaction_options is None:
         transaction_options = {}
+
+    init_call = build_init_currency_network_call(
+        currency_network=currency_network,
+        network_settings=network_settings,
+        exchange_address=exchange_address,
+        authorized_addresses=authorized_addresses,
+    )
+
+    wait_for_successful_function_call(
+        init_call,
+        web3=web3,
+        transaction_options=transaction_options,
+        private_key=private_key,
+    )
+
+
+def build_init_currency_network_call(
+    *,
+    currency_network,
+    network_settings: NetworkSettings,
+    exchange_address=None,
+    authorized_addresses=None,
+):
     if authorized_addresses is None:
         authorized_addresses = []
     if exchange_address is not None:
         authorized_addresses.append(exchange_address)
 
-    init_call = currency_network.functions.init(
+    return currency_network.functions.init(
         network_settings.name,
         network_settings.symbol,
         network_settings.decimals,
@@ -362,13 +456,6 @@ def init_currency_network(
         authorized_addresses,
     )
 
-    wait_for_successful_function_call(
-        init_call,
-        web3=web3,
-        transaction_options=transaction_options,
-        private_key=private_key,
-    )
-
 
 def deploy_and_migrate_networks_from_file(
     *,
@@ -383,22 +470,37 @@ def deploy_and_migrate_networks_from_file(
     transaction_options_source: Dict = None,
     transaction_options_dest: Dict = None,
     output_file_path: str,
+    read_workers: int = 1,
+    batch_gas_budget: Optional[int] = None,
+    parallel: int = 1,
 ):
-    """Deploy new owned currency network proxies and migrate old networks to it"""
-    if transaction_options_source is None:
-        transaction_options_source = {}
-    if transaction_options_dest is None:
-        transaction_options_dest = {}
+    """Deploy new owned currency network proxies and migrate old networks to it
+    The progress is journaled next to the output file, so that a failed run can be restarted
+    without deploying the networks again or resending the transactions that were already sent.
+    The gnosis safe addresses of users are cached next to the output file as well.
+    With `parallel` greater than 1, up to `parallel` networks are deployed and migrated at the same time."""
+    shared_transaction_options_source = SharedTransactionOptions(
+        transaction_options_source
+    )
+    shared_transaction_options_dest = SharedTransactionOptions(transaction_options_dest)
 
     verify_owner_not_deployer(web3_dest, owner_address, private_key)
     currency_network_interface = get_contract_interface("CurrencyNetwork")
     network_addresses_mapping = {}
+    journal = MigrationJournal(output_file_path + ".journal.jsonl")
+    safe_address_mapper = SafeAddressMapper(
+        web3_source,
+        master_copy_address,
+        proxy_factory_address,
+        cache_file_path=output_file_path + ".safe_addresses.jsonl",
+        max_workers=read_workers,
+    )
 
-    for old_address in read_addresses_in_csv(addresses_file_path):
+    def deploy_and_migrate(old_address):
         old_network = web3_source.eth.contract(
             abi=currency_network_interface["abi"], address=old_address
         )
-        new_network = deploy_and_migrate_network(
+        return deploy_and_migrate_network(
             web3_source=web3_source,
             web3_dest=web3_dest,
             beacon_address=beacon_address,
@@ -407,10 +509,21 @@ def deploy_and_migrate_networks_from_file(
             proxy_factory_address=proxy_factory_address,
             old_network=old_network,
             private_key=private_key,
-            transaction_options_source=transaction_options_source,
-            transaction_options_dest=transaction_options_dest,
+            transaction_options_source=shared_transaction_options_source,
+            transaction_options_dest=shared_transaction_options_dest,
+            read_workers=read_workers,
+            journal=journal,
+            batch_gas_budget=batch_gas_budget,
+            safe_address_mapper=safe_address_mapper,
+            progress_prefix=f"{old_network.address}: " if parallel > 1 else "",
         )
-        network_addresses_mapping[old_network.address] = new_network.address
+
+    old_addresses = read_addresses_in_csv(addresses_file_path)
+    new_networks = concurrent_map(
+        deploy_and_migrate, old_addresses, max_workers=parallel
+    )
+    for old_address, new_network in zip(old_addresses, new_networks):
+        network_addresses_mapping[old_address] = new_network.address
 
     with open(output_file_path, "w") as file:
         json.dump(network_addresses_mapping, file)
@@ -429,48 +542,93 @@ def deploy_and_migrate_network(
     proxy_factory_address: str,
     old_network: Contract,
     private_key: bytes = None,
-    transaction_options_source: Dict = None,
-    transaction_options_dest: Dict = None,
+    transaction_options_source: Union[Dict, SharedTransactionOptions] = None,
+    transaction_options_dest: Union[Dict, SharedTransactionOptions] = None,
+    read_workers: int = 1,
+    journal: MigrationJournal = None,
+    batch_gas_budget: Optional[int] = None,
+    safe_address_mapper: SafeAddressMapper = None,
+    progress_prefix: str = "",
 ):
-    """Deploy a new owned currency network proxy and migrate the old networks to it"""
-    if transaction_options_source is None:
-        transaction_options_source = {}
-    if transaction_options_dest is None:
-        transaction_options_dest = {}
+    """Deploy a new owned currency network proxy and migrate the old networks to it
+    If a `journal` is given, a network already deployed or migrated according to it is not deployed
+    or migrated again."""
+    transaction_options_source = as_shared_transaction_options(
+        transaction_options_source
+    )
+    transaction_options_dest = as_shared_transaction_options(transaction_options_dest)
 
-    network_settings = get_network_settings(old_network)
-    network_settings.expiration_time = 0
+    deployment_record = None
+    if journal is not None:
+        deployment_record = journal.get_record(old_network.address, "deployment", "")
 
-    new_network = deploy_currency_network_proxy(
-        web3=web3_dest,
-        network_settings=network_settings,
-        beacon_address=beacon_address,
-        owner_address=owner_address,
-        private_key=private_key,
-        transaction_options=transaction_options_dest,
-    )
-    new_address = new_network.address
-    click.secho(
-        message=f"Successfully deployed new proxy for currency network at {new_address}"
-    )
+    if journal is not None and deployment_record is not None:
+        interface = get_contract_interface("CurrencyNetwork")
+        new_network = web3_dest.eth.contract(
+            abi=interface["abi"], address=deployment_record["new_network"]
+        )
+        new_address = new_network.address
+        click.secho(f"Using proxy for currency network at {new_address} from journal")
+        if journal.get_status(old_network.address, "migration", "") == CONFIRMED:
+            click.secho(
+                f"Migration of {old_network.address} to {new_address} found in journal",
+                fg="green",
+            )
+            return new_network
+    else:
+        network_settings = get_network_settings(old_network)
+        network_settings.expiration_time = 0
+
+        with transaction_options_dest.use() as transaction_options:
+            new_network = deploy_currency_network_proxy(
+                web3=web3_dest,
+                network_settings=network_settings,
+                beacon_address=beacon_address,
+                owner_address=owner_address,
+                private_key=private_key,
+                transaction_options=transaction_options,
+            )
+        new_address = new_network.address
+        click.secho(
+            message=f"Successfully deployed new proxy for currency network at {new_address}"
+        )
+        if journal is not None:
+            journal.record(
+                old_network.address,
+                "deployment",
+                "",
+                CONFIRMED,
+                new_network=new_address,
+            )
 
     click.secho(f"Migrating {old_network.address} to {new_address}", fg="green")
 
-    def get_migrated_user_address(user_address):
-        return get_safe_address(
-            user_address, master_copy_address, proxy_factory_address, web3_source
+    if safe_address_mapper is None:
+        safe_address_mapper = SafeAddressMapper(
+            web3_source,
+            master_copy_address,
+            proxy_factory_address,
+            max_workers=read_workers,
         )
-
-    NetworkMigrater(
-        web3_source,
-        web3_dest,
-        old_network.address,
-        new_network.address,
-        get_migrated_user_address,
-        transaction_options_source,
-        transaction_options_dest,
-        private_key,
-    ).migrate_network()
+    safe_address_mapper.get_safe_addresses(old_network.functions.getUsers().call())
+
+    with report_failed_migration(old_network.address, new_address):
+        NetworkMigrater(
+            web3_source,
+            web3_dest,
+            old_network.address,
+            new_network.address,
+            safe_address_mapper,
+            transaction_options_source,
+            transaction_options_dest,
+            private_key,
+            read_workers=read_workers,
+            journal=journal,
+            batch_gas_budget=batch_gas_budget,
+            progress_prefix=progress_prefix,
+        ).migrate_network()
+    if journal is not None:
+        journal.record(old_network.address, "migration", "", CONFIRMED)
     click.secho(
         f"Migration of {old_network.address} to {new_address} complete", fg="green"
     )
@@ -0,0 +1,447 @@
+# This file provides a local SQLite store of the events of contracts,
+# to answer questions about the history of currency networks without querying logs again
+import json
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from hexbytes import HexBytes
+from web3.exceptions import BlockNotFound
+
+from tldeploy.events import (
+    EventStream,
+    find_balance_updates_of_transfer,
+    get_delta_balances,
+    get_transfer_path,
+    ordered_users,
+)
+from tldeploy.interests import calculate_balance_with_interests
+
+DEFAULT_MAX_REORG_DEPTH = 128
+
+# The argument names of the two users of trustline related events of currency networks
+TRUSTLINE_EVENT_USERS = {
+    "BalanceUpdate": ("_from", "_to"),
+    "Transfer": ("_from", "_to"),
+    "TrustlineUpdate": ("_creditor", "_debtor"),
+    "TrustlineUpdateRequest": ("_creditor", "_debtor"),
+    "TrustlineUpdateCancel": ("_initiator", "_counterparty"),
+    "DebtUpdate": ("_debtor", "_creditor"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    address TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    block_hash TEXT NOT NULL,
+    transaction_hash TEXT NOT NULL,
+    log_index INTEGER NOT NULL,
+    event_name TEXT NOT NULL,
+    -- The users of trustline related events ordered by address, NULL for other events
+    user_a TEXT,
+    user_b TEXT,
+    args TEXT NOT NULL,
+    PRIMARY KEY (block_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_by_trustline ON events (address, user_a, user_b, block_number, log_index);
+CREATE INDEX IF NOT EXISTS events_by_transaction ON events (transaction_hash, log_index);
+CREATE INDEX IF NOT EXISTS events_by_block ON events (block_number);
+CREATE TABLE IF NOT EXISTS blocks (
+    number INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL,
+    timestamp INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    address TEXT PRIMARY KEY,
+    next_block INTEGER NOT NULL
+);
+"""
+
+_EVENT_COLUMNS = (
+    "event_name, address, block_number, block_hash, transaction_hash, log_index, args"
+)
+
+
+class EventStore:
+    """Store of all events of a set of contracts in an indexed SQLite database.
+
+    `ingest` adds the events of the blocks that were not ingested yet for every contract.
+    The hashes of the blocks with events and of the last ingested block are kept, if one of them changed
+    because of a chain reorganisation, the events from the first changed block on are removed and ingested again.
+    Events are returned like the decoded logs of web3, with hex strings instead of bytes.
+    The helpers for currency networks answer with queries on the indexes of the users of trustlines,
+    transactions and blocks."""
+
+    def __init__(
+        self, database_path: str, *, max_reorg_depth: int = DEFAULT_MAX_REORG_DEPTH
+    ):
+        self.max_reorg_depth = max_reorg_depth
+        self._connection = sqlite3.connect(database_path)
+        self._connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def ingest(
+        self, contracts: Iterable, *, to_block="latest", **event_stream_kwargs
+    ) -> int:
+        """Ingest the events of `contracts` up to `to_block` and return the number of new events.
+        `event_stream_kwargs` are passed to `EventStream`."""
+        contracts = list(contracts)
+        if not contracts:
+            return 0
+        web3 = contracts[0].web3
+        if to_block == "latest":
+            to_block = web3.eth.blockNumber
+
+        self.roll_back_reorganized_blocks(web3)
+
+        number_of_events = 0
+        for contract in contracts:
+            contract_events = _get_contract_events(contract)
+            from_block = self.get_next_block(contract.address)
+            if not contract_events or from_block > to_block:
+                continue
+            events = list(
+                EventStream(
+                    contract_events,
+                    from_block=from_block,
+                    to_block=to_block,
+                    **event_stream_kwargs,
+                )
+            )
+            with self._connection:
+                self._insert_blocks(
+                    web3, {event["blockNumber"]: event["blockHash"] for event in events}
+                )
+                self._connection.executemany(
+                    "INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [_event_to_row(event) for event in events],
+                )
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO cursors VALUES (?, ?)",
+                    (contract.address, to_block + 1),
+                )
+            number_of_events += len(events)
+
+        # Remember the hash of the last block to detect reorganisations of blocks without events
+        with self._connection:
+            self._insert_blocks(web3, {to_block: None})
+        return number_of_events
+
+    def roll_back_reorganized_blocks(self, web3) -> Optional[int]:
+        """Remove everything ingested from the first block whose hash changed on, if any,
+        and return the number of this block"""
+        first_changed_block = None
+        for number, block_hash in self._connection.execute(
+            "SELECT number, hash FROM blocks ORDER BY number DESC LIMIT ?",
+            (self.max_reorg_depth,),
+        ):
+            chain_block_hash: Optional[str]
+            try:
+                chain_block_hash = _to_hex(web3.eth.getBlock(number)["hash"])
+            except BlockNotFound:
+                chain_block_hash = None
+            if chain_block_hash == block_hash:
+                break
+            first_changed_block = number
+        if first_changed_block is not None:
+            self.roll_back(first_changed_block)
+        return first_changed_block
+
+    def roll_back(self, block_number: int) -> None:
+        """Remove everything ingested from `block_number` on, the next `ingest` ingests these blocks again"""
+        with self._connection:
+            self._connection.execute(
+                "DELETE FROM events WHERE block_number >= ?", (block_number,)
+            )
+            self._connection.execute(
+                "DELETE FROM blocks WHERE number >= ?", (block_number,)
+            )
+            self._connection.execute(
+                "UPDATE cursors SET next_block = ? WHERE next_block > ?",
+                (block_number, block_number),
+            )
+
+    def get_next_block(self, address: str) -> int:
+        """Return the first block whose events of `address` were not ingested yet"""
+        row = self._connection.execute(
+            "SELECT next_block FROM cursors WHERE address = ?", (address,)
+        ).fetchone()
+        if row is None:
+            return 0
+        return row[0]
+
+    def get_block_timestamp(self, block_number: int) -> int:
+        """Return the timestamp of a block with ingested events"""
+        row = self._connection.execute(
+            "SELECT timestamp FROM blocks WHERE number = ?", (block_number,)
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Block {block_number} not ingested.")
+        return row[0]
+
+    def get_events(
+        self,
+        address: str,
+        event_name: Optional[str] = None,
+        *,
+        from_block: int = 0,
+        to_block: Optional[int] = None,
+    ) -> List[Dict]:
+        query = f"SELECT {_EVENT_COLUMNS} FROM events WHERE address = ? AND block_number >= ?"
+        parameters: List[Any] = [address, from_block]
+        if to_block is not None:
+            query += " AND block_number <= ?"
+            parameters.append(to_block)
+        if event_name is not None:
+            query += " AND event_name = ?"
+            parameters.append(event_name)
+        query += " ORDER BY block_number, log_index"
+        return self._query_events(query, parameters)
+
+    def get_events_of_transaction(self, transaction_hash) -> List[Dict]:
+        return self._query_events(
+            f"SELECT {_EVENT_COLUMNS} FROM events WHERE transaction_hash = ? ORDER BY log_index",
+            (_to_hex(transaction_hash),),
+        )
+
+    def get_trustline_events(
+        self, network_address: str, a: str, b: str, event_name: Optional[str] = None
+    ) -> List[Dict]:
+        """Return the events between `a` and `b` in order, see `TRUSTLINE_EVENT_USERS`"""
+        query = f"SELECT {_EVENT_COLUMNS} FROM events WHERE address = ? AND user_a = ? AND user_b = ?"
+        parameters = [network_address, *ordered_users(a, b)]
+        if event_name is not None:
+            query += " AND event_name = ?"
+            parameters.append(event_name)
+        query += " ORDER BY block_number, log_index"
+        return self._query_events(query, parameters)
+
+    def get_balances_of_trustline(
+        self, network_address: str, a: str, b: str
+    ) -> List[int]:
+        """Return all balances of the trustline between `a` and `b` in order from the view of `a`"""
+        return [
+            _balance_from_view(event, a)
+            for event in self.get_trustline_events(
+                network_address, a, b, "BalanceUpdate"
+            )
+        ]
+
+    def get_previous_balance(self, balance_update_event) -> int:
+        """Return the balance before `balance_update_event` from the view of its sender"""
+        previous_event = self._get_previous_trustline_event(
+            balance_update_event, "BalanceUpdate"
+        )
+        if previous_event is None:
+            return 0
+        return _balance_from_view(previous_event, balance_update_event["args"]["_from"])
+
+    def get_interests_at(self, balance_update_event) -> int:
+        """Return the interests applied at `balance_update_event` from the view of its sender,
+        with the interest rates of the last `TrustlineUpdate` before. Trustlines without any
+        `TrustlineUpdate`, e.g. set in tests without events, are treated as without interests."""
+        previous_event = self._get_previous_trustline_event(
+            balance_update_event, "BalanceUpdate"
+        )
+        if previous_event is None:
+            return 0
+        a = balance_update_event["args"]["_from"]
+        previous_balance = _balance_from_view(previous_event, a)
+        interest_rate_given, interest_rate_received = self._get_interest_rates(
+            balance_update_event, a
+        )
+        return (
+            calculate_balance_with_interests(
+                previous_balance,
+                self.get_block_timestamp(previous_event["blockNumber"]),
+                self.get_block_timestamp(balance_update_event["blockNumber"]),
+                interest_rate_given,
+                interest_rate_received,
+            )
+            - previous_balance
+        )
+
+    def get_interests_of_trustline(
+        self, network_address: str, a: str, b: str
+    ) -> List[int]:
+        """Return the interests applied at every balance update of the trustline but the first from the view of `a`"""
+        interests: List[int] = []
+        previous_balance = None
+        previous_timestamp = None
+        interest_rates = (0, 0)
+        for event in self.get_trustline_events(network_address, a, b):
+            if event["event"] == "TrustlineUpdate":
+                interest_rates = _interest_rates_from_view(event, a)
+            elif event["event"] == "BalanceUpdate":
+                timestamp = self.get_block_timestamp(event["blockNumber"])
+                if previous_balance is not None:
+                    interests.append(
+                        calculate_balance_with_interests(
+                            previous_balance,
+                            previous_timestamp,
+                            timestamp,
+                            *interest_rates,
+                        )
+                        - previous_balance
+                    )
+                previous_balance = _balance_from_view(event, a)
+                previous_timestamp = timestamp
+        return interests
+
+    def get_balance_updates_of_transfer(self, transfer_event) -> List[Dict]:
+        """Return the balance update events of the transfer in the order of its path from the sender"""
+        # The balance updates of the transfer are emitted right before it
+        balance_update_events = self._query_events(
+            f"SELECT {_EVENT_COLUMNS} FROM events WHERE transaction_hash = ? AND address = ? "
+            "AND event_name = 'BalanceUpdate' AND log_index < ? ORDER BY log_index DESC",
+            (
+                _to_hex(transfer_event["transactionHash"]),
+                transfer_event["address"],
+                transfer_event["logIndex"],
+            ),
+        )
+
+        return find_balance_updates_of_transfer(transfer_event, balance_update_events)
+
+    def get_transfer_path(self, transfer_event) -> List[str]:
+        return get_transfer_path(self.get_balance_updates_of_transfer(transfer_event))
+
+    def get_delta_balances_of_transfer(self, transfer_event) -> List[int]:
+        """Return the changes of the balances of all users in the path because of the transfer,
+        without the interests applied at the same time"""
+        balance_changes = [
+            event["args"]["_value"]
+            - self.get_previous_balance(event)
+            - self.get_interests_at(event)
+            for event in self.get_balance_updates_of_transfer(transfer_event)
+        ]
+        return get_delta_balances(balance_changes)
+
+    def _get_previous_trustline_event(self, event, event_name: str) -> Optional[Dict]:
+        events = self._query_events(
+            f"SELECT {_EVENT_COLUMNS} FROM events WHERE address = ? AND user_a = ? AND user_b = ? "
+            "AND (block_number < ? OR (block_number = ? AND log_index < ?)) AND event_name = ? "
+            "ORDER BY block_number DESC, log_index DESC LIMIT 1",
+            (
+                event["address"],
+                *ordered_users(*_get_trustline_users(event)),
+                event["blockNumber"],
+                event["blockNumber"],
+                event["logIndex"],
+                event_name,
+            ),
+        )
+        if not events:
+            return None
+        return events[0]
+
+    def _get_interest_rates(self, event, a: str) -> Tuple[int, int]:
+        trustline_update_event = self._get_previous_trustline_event(
+            event, "TrustlineUpdate"
+        )
+        if trustline_update_event is None:
+            return 0, 0
+        return _interest_rates_from_view(trustline_update_event, a)
+
+    def _insert_blocks(self, web3, block_hashes: Dict[int, Any]) -> None:
+        rows = []
+        for number, block_hash in block_hashes.items():
+            block = web3.eth.getBlock(block_hash if block_hash is not None else number)
+            rows.append((number, _to_hex(block["hash"]), block["timestamp"]))
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO blocks VALUES (?, ?, ?)", rows
+        )
+
+    def _query_events(self, query: str, parameters) -> List[Dict]:
+        return [
+            {
+                "event": event_name,
+                "address": address,
+                "blockNumber": block_number,
+                "blockHash": block_hash,
+                "transactionHash": transaction_hash,
+                "logIndex": log_index,
+                "args": json.loads(args),
+            }
+            for (
+                event_name,
+                address,
+                block_number,
+                block_hash,
+                transaction_hash,
+                log_index,
+                args,
+            ) in self._connection.execute(query, parameters)
+        ]
+
+
+class EventStoreConsumer:
+    """Consumer of a `BlockTracker` which ingests the events of `contracts` into `event_store`"""
+
+    def __init__(self, event_store: EventStore, contracts: Iterable):
+        self.event_store = event_store
+        self.contracts = list(contracts)
+
+    def apply_blocks(self, from_block: int, to_block: int) -> None:
+        self.event_store.ingest(self.contracts, to_block=to_block)
+
+    def roll_back(self, block_number: int) -> None:
+        self.event_store.roll_back(block_number)
+
+
+def _get_contract_events(contract) -> List:
+    return [
+        contract.events[entry["name"]]
+        for entry in contract.abi
+        if entry.get("type") == "event"
+    ]
+
+
+def _event_to_row(event) -> Tuple:
+    args = {name: _to_json_value(value) for name, value in event["args"].items()}
+    user_a, user_b = None, None
+    if event["event"] in TRUSTLINE_EVENT_USERS:
+        user_a, user_b = ordered_users(*_get_trustline_users(event))
+    return (
+        event["address"],
+        event["blockNumber"],
+        _to_hex(event["blockHash"]),
+        _to_hex(event["transactionHash"]),
+        event["logIndex"],
+        event["event"],
+        user_a,
+        user_b,
+        json.dumps(args),
+    )
+
+
+def _to_hex(value) -> str:
+    """Convert hashes and bytes given as bytes or hex strings to lower case hex strings"""
+    return HexBytes(value).hex()
+
+
+def _to_json_value(value):
+    if isinstance(value, bytes):
+        return _to_hex(value)
+    if isinstance(value, (list, tuple)):
+        return [_to_json_value(item) for item in value]
+    return value
+
+
+def _get_trustline_users(event) -> Tuple[str, str]:
+    first_user, second_user = TRUSTLINE_EVENT_USERS[event["event"]]
+    return event["args"][first_user], event["args"][second_user]
+
+
+def _balance_from_view(balance_update_event, a: str) -> int:
+    if balance_update_event["args"]["_from"] == a:
+        return balance_update_event["args"]["_value"]
+    return -balance_update_event["args"]["_value"]
+
+
+def _interest_rates_from_view(trustline_update_event, a: str) -> Tuple[int, int]:
+    args = trustline_update_event["args"]
+    if args["_creditor"] == a:
+        return args["_interestRateGiven"], args["_interestRateReceived"]
+    return args["_interestRateReceived"], args["_interestRateGiven"]
@@ -0,0 +1,179 @@
+import math
+import socket
+import time
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple, Union
+
+import requests
+
+DEFAULT_INITIAL_BLOCK_RANGE = 10_000
+DEFAULT_MAX_BLOCK_RANGE = 1_000_000
+DEFAULT_FAST_RESPONSE_SECONDS = 2.0
+
+# Messages used by various node implementations and providers when a log query covers too many blocks or results
+_RANGE_TOO_LARGE_MESSAGES = (
+    "more than",
+    "too many",
+    "limit exceeded",
+    "response size",
+    "range too large",
+    "block range",
+    "timeout",
+    "timed out",
+)
+
+
+def sorted_events(events, reverse=False):
+    def log_index_key(event):
+        if event.get("logIndex") is None:
+            raise RuntimeError("No log index, events cannot be ordered truthfully.")
+        return event.get("logIndex")
+
+    def block_number_key(event):
+        if event.get("blockNumber") is None:
+            return math.inf
+        return event.get("blockNumber")
+
+    return sorted(
+        events,
+        key=lambda event: (block_number_key(event), log_index_key(event)),
+        reverse=reverse,
+    )
+
+
+def ordered_users(a: str, b: str) -> Tuple[str, str]:
+    """Return the two users of a trustline in a fixed order, to key the trustline independent of the direction"""
+    if a < b:
+        return a, b
+    return b, a
+
+
+def find_balance_updates_of_transfer(
+    transfer_event, balance_update_events: Iterable[Dict]
+) -> List[Dict]:
+    """Return the balance update events of the transfer of `transfer_event` in the order of its path from the sender,
+    given the balance update events emitted before it in the same transaction, the latest first"""
+    sender = transfer_event["args"]["_from"]
+    receiver = transfer_event["args"]["_to"]
+    transfer_balance_update_events = []
+    saw_sender_event = False
+    saw_receiver_event = False
+    for event in balance_update_events:
+        transfer_balance_update_events.append(event)
+        saw_sender_event = saw_sender_event or event["args"]["_from"] == sender
+        saw_receiver_event = saw_receiver_event or event["args"]["_to"] == receiver
+        if saw_sender_event and saw_receiver_event:
+            break
+    else:
+        raise RuntimeError(
+            f"Could not find all BalanceUpdate events of transfer {transfer_event}."
+        )
+
+    if transfer_balance_update_events[0]["args"]["_from"] != sender:
+        # For the sender pays case, they are reverse
+        transfer_balance_update_events.reverse()
+    return transfer_balance_update_events
+
+
+def get_transfer_path(balance_update_events: Sequence[Dict]) -> List[str]:
+    """Return the path of a transfer from the sender to the receiver given its balance update events in path order"""
+    return [balance_update_events[0]["args"]["_from"]] + [
+        event["args"]["_to"] for event in balance_update_events
+    ]
+
+
+def get_delta_balances(balance_changes: Sequence[int]) -> List[int]:
+    """Return the changes of the balances of all users in the path of a transfer, given the changes of the balances
+    of its trustlines from the view of the sender to the receiver in path order"""
+    delta_balances = [balance_changes[0]]
+    for previous_change, next_change in zip(balance_changes[:-1], balance_changes[1:]):
+        delta_balances.append(next_change - previous_change)
+    delta_balances.append(-balance_changes[-1])
+    return delta_balances
+
+
+def is_range_too_large_error(exception: Exception) -> bool:
+    """Return whether `exception` raised by a log query suggests to retry with a smaller block range"""
+    if isinstance(
+        exception, (requests.exceptions.Timeout, socket.timeout, TimeoutError)
+    ):
+        return True
+    if isinstance(exception, ValueError):
+        message = str(exception).lower()
+        return any(part in message for part in _RANGE_TOO_LARGE_MESSAGES)
+    return False
+
+
+class EventStream:
+    """Iterate over the decoded logs of the events `contract_events` in `sorted_events` order.
+
+    Logs are queried in windows of blocks, so that the whole history does not need to be held in memory
+    and no single query spans the full history.
+    The window doubles after a response faster than `fast_response_seconds` and is halved when the node
+    complains about too many results or times out.
+    After iteration stopped, `next_block` is the first block whose events were not all yielded,
+    so that a new stream starting at `next_block` resumes where this one stopped."""
+
+    def __init__(
+        self,
+        contract_events: Iterable,
+        *,
+        from_block: int = 0,
+        to_block: Optional[Union[int, str]] = None,
+        argument_filters: Optional[Dict[str, Any]] = None,
+        initial_block_range: int = DEFAULT_INITIAL_BLOCK_RANGE,
+        max_block_range: int = DEFAULT_MAX_BLOCK_RANGE,
+        fast_response_seconds: float = DEFAULT_FAST_RESPONSE_SECONDS,
+    ):
+        self.contract_events = list(contract_events)
+        if not self.contract_events:
+            raise ValueError("Need at least one event to stream.")
+        if initial_block_range < 1 or max_block_range < initial_block_range:
+            raise ValueError(
+                f"Invalid block ranges: initial {initial_block_range}, max {max_block_range}"
+            )
+        self.next_block = from_block
+        self.to_block = to_block
+        self.argument_filters = argument_filters
+        self.block_range = initial_block_range
+        self.max_block_range = max_block_range
+        self.fast_response_seconds = fast_response_seconds
+
+    def __iter__(self):
+        to_block = self.to_block
+        if to_block is None or to_block == "latest":
+            to_block = self.contract_events[0].web3.eth.blockNumber
+
+        while self.next_block <= to_block:
+            window_end = min(self.next_block + self.block_range - 1, to_block)
+            window_events, window_end = self._get_logs_in_window(
+                self.next_block, window_end
+            )
+            for event in window_events:
+                yield event
+            self.next_block = window_end + 1
+
+    def _get_logs_in_window(self, from_block: int, to_block: int):
+        """Return the sorted logs and the last block of the window starting at `from_block`,
+        the window may end before `to_block` if the node could not answer for the whole range"""
+        while True:
+            start_time = time.monotonic()
+            try:
+                events = []
+                for contract_event in self.contract_events:
+                    events.extend(
+                        contract_event.getLogs(
+                            fromBlock=from_block,
+                            toBlock=to_block,
+                            argument_filters=self.argument_filters,
+                        )
+                    )
+            except Exception as e:
+                if not is_range_too_large_error(e) or from_block == to_block:
+                    raise
+                self.block_range = max(1, (to_block - from_block + 1) // 2)
+                to_block = from_block + self.block_range - 1
+                continue
+
+            if time.monotonic() - start_time < self.fast_response_seconds:
+                self.block_range = min(2 * self.block_range, self.max_block_range)
+            return sorted_events(events), to_block
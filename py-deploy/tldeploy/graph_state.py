@@ -0,0 +1,356 @@
+# This file provides a model of the trustlines of a currency network which is kept current by applying its events
+import collections
+import json
+import os
+from typing import Deque, Dict, List, Optional, Tuple
+
+import attr
+
+from tldeploy.events import EventStream, ordered_users
+from tldeploy.migration import CurrencyNetworkEventIndex
+from tldeploy.simulation import Account, CurrencyNetworkSimulator
+
+SNAPSHOT_VERSION = 1
+DEFAULT_CHECKPOINT_INTERVAL = 100
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class TrustlineRequest:
+    initiator: str
+    counterparty: str
+    creditline_given: int
+    creditline_received: int
+    interest_rate_given: int
+    interest_rate_received: int
+    is_frozen: bool
+    # Only requests of `CurrencyNetworkV2` carry a transfer
+    transfer: Optional[int] = None
+
+    @classmethod
+    def from_event(cls, event):
+        args = event["args"]
+        return cls(
+            args["_creditor"],
+            args["_debtor"],
+            args["_creditlineGiven"],
+            args["_creditlineReceived"],
+            args["_interestRateGiven"],
+            args["_interestRateReceived"],
+            args["_isFrozen"],
+            args.get("_transfer"),
+        )
+
+
+class TrustlineGraphState:
+    """State of the trustlines of a currency network, bootstrapped once and then kept current via its events.
+
+    The trustlines are held by a `CurrencyNetworkSimulator` to evaluate transfers or find paths,
+    pending trustline update requests and debts are held next to them.
+    `sync` applies the events of the blocks from `next_block` on, each one with constant work.
+    All events carry the new absolute values and not the changes, so that applying events which are already
+    reflected in the state is harmless as long as they are applied in order.
+    `BalanceUpdate` events take the timestamp of their block as the new mtime of the trustline.
+    The contract emits the same `TrustlineUpdate` event when closing a trustline and when reducing
+    all creditlines and interest rates of a trustline to zero, if its balance is zero as well,
+    both are treated as closing the trustline.
+    As consumer of a `BlockTracker`, the state keeps a checkpoint every `checkpoint_interval` blocks
+    to roll back to when blocks get reorganized."""
+
+    event_names = [
+        "TrustlineUpdate",
+        "TrustlineUpdateRequest",
+        "TrustlineUpdateCancel",
+        "BalanceUpdate",
+        "DebtUpdate",
+        "NetworkFreeze",
+        "NetworkUnfreeze",
+    ]
+    checkpoint_interval = DEFAULT_CHECKPOINT_INTERVAL
+
+    def __init__(
+        self,
+        currency_network,
+        simulator: CurrencyNetworkSimulator,
+        *,
+        next_block: int,
+        trustline_requests: Dict[Tuple[str, str], TrustlineRequest] = None,
+        debts: Dict[Tuple[str, str], int] = None,
+    ):
+        self.currency_network = currency_network
+        self.simulator = simulator
+        self.next_block = next_block
+        # Keyed by the ordered pair of users, see `ordered_users`
+        self._trustline_requests: Dict[Tuple[str, str], TrustlineRequest] = (
+            trustline_requests or {}
+        )
+        # Debt of the first to the second user of the ordered pair
+        self._debts: Dict[Tuple[str, str], int] = debts or {}
+        # Only read once `_last_block_hash` is set to the hash of a fetched block
+        self._last_block_hash = None
+        self._last_block_timestamp = 0
+        # Snapshots of the state to roll back to, see `apply_blocks`
+        self._checkpoints: Deque[Dict] = collections.deque()
+
+    @classmethod
+    def bootstrap(cls, currency_network, *, multicall=None, **event_stream_kwargs):
+        """Load the current state of `currency_network`, the trustlines via calls, optionally in bulk via `multicall`,
+        the pending trustline update requests and debts via their events.
+        `event_stream_kwargs` are passed to `EventStream`."""
+        block_number = currency_network.web3.eth.blockNumber
+        event_index = CurrencyNetworkEventIndex(
+            currency_network, to_block=block_number, **event_stream_kwargs
+        )
+        # Read after `block_number`, the events of later blocks are applied again by the first sync
+        simulator = CurrencyNetworkSimulator.from_currency_network(
+            currency_network, multicall=multicall
+        )
+
+        trustline_requests = {}
+        for event in event_index.pending_trustline_update_requests():
+            trustline_request = TrustlineRequest.from_event(event)
+            trustline_requests[
+                ordered_users(
+                    trustline_request.initiator, trustline_request.counterparty
+                )
+            ] = trustline_request
+        debts = {}
+        for debtor, debts_of_debtor in event_index.debts.items():
+            for creditor, debt in debts_of_debtor.items():
+                if debt != 0:
+                    debts[ordered_users(debtor, creditor)] = _ordered_debt(
+                        debtor, creditor, debt
+                    )
+
+        return cls(
+            currency_network,
+            simulator,
+            next_block=block_number + 1,
+            trustline_requests=trustline_requests,
+            debts=debts,
+        )
+
+    def sync(self, to_block="latest", **event_stream_kwargs) -> int:
+        """Apply all events up to `to_block` that were not applied yet and return their number.
+        `event_stream_kwargs` are passed to `EventStream`."""
+        events = EventStream(
+            self._contract_events(),
+            from_block=self.next_block,
+            to_block=to_block,
+            **event_stream_kwargs,
+        )
+        number_of_events = 0
+        for event in events:
+            self.apply_event(event)
+            number_of_events += 1
+        self.next_block = max(self.next_block, events.next_block)
+        return number_of_events
+
+    def apply_event(self, event) -> None:
+        """Apply a single event, events have to be applied in the order they were emitted"""
+        event_name = event["event"]
+        args = event["args"]
+        simulator = self.simulator
+        if event_name == "TrustlineUpdate":
+            creditor, debtor = args["_creditor"], args["_debtor"]
+            self._trustline_requests.pop(ordered_users(creditor, debtor), None)
+            agreement = (
+                args["_creditlineGiven"],
+                args["_creditlineReceived"],
+                args["_interestRateGiven"],
+                args["_interestRateReceived"],
+                args["_isFrozen"],
+            )
+            account = simulator.get_account(creditor, debtor)
+            if agreement == (0, 0, 0, 0, False) and account.balance == 0:
+                simulator.remove_trustline(creditor, debtor)
+            else:
+                simulator.set_account(
+                    creditor, debtor, *agreement, account.mtime, account.balance
+                )
+        elif event_name == "BalanceUpdate":
+            simulator.set_balance(
+                args["_from"],
+                args["_to"],
+                args["_value"],
+                # Fine until 2106
+                self._get_block_timestamp(event) & 0xFFFFFFFF,
+            )
+        elif event_name == "TrustlineUpdateRequest":
+            trustline_request = TrustlineRequest.from_event(event)
+            self._trustline_requests[
+                ordered_users(
+                    trustline_request.initiator, trustline_request.counterparty
+                )
+            ] = trustline_request
+        elif event_name == "TrustlineUpdateCancel":
+            self._trustline_requests.pop(
+                ordered_users(args["_initiator"], args["_counterparty"]), None
+            )
+        elif event_name == "DebtUpdate":
+            debtor, creditor = args["_debtor"], args["_creditor"]
+            debt = _ordered_debt(debtor, creditor, args["_newDebt"])
+            if debt == 0:
+                self._debts.pop(ordered_users(debtor, creditor), None)
+            else:
+                self._debts[ordered_users(debtor, creditor)] = debt
+        elif event_name == "NetworkFreeze":
+            simulator.is_network_frozen = True
+        elif event_name == "NetworkUnfreeze":
+            simulator.is_network_frozen = False
+        else:
+            raise RuntimeError(
+                f"Expected event of type {', '.join(self.event_names)}, got: {event}"
+            )
+
+    def get_trustline_request(self, a: str, b: str) -> Optional[TrustlineRequest]:
+        return self._trustline_requests.get(ordered_users(a, b))
+
+    def get_trustline_requests(self) -> List[TrustlineRequest]:
+        return list(self._trustline_requests.values())
+
+    def get_debt(self, debtor: str, creditor: str) -> int:
+        """Return what `debtor` owes to `creditor`, like `getDebt` of the contract"""
+        return _ordered_debt(
+            debtor, creditor, self._debts.get(ordered_users(debtor, creditor), 0)
+        )
+
+    def apply_blocks(self, from_block: int, to_block: int) -> None:
+        """Apply the blocks up to `to_block` as consumer of a `BlockTracker`,
+        keeping checkpoints to roll back to, see `roll_back`"""
+        if (
+            not self._checkpoints
+            or self._checkpoints[-1]["next_block"] + self.checkpoint_interval
+            <= self.next_block
+        ):
+            self._checkpoints.append(self._to_snapshot())
+        self.sync(to_block=to_block)
+
+    def roll_back(self, block_number: int) -> None:
+        """Discard the state derived from the blocks from `block_number` on by restoring the last checkpoint
+        before them, `sync` or `apply_blocks` apply the blocks after the checkpoint again"""
+        if self.next_block <= block_number:
+            return
+        while self._checkpoints and self._checkpoints[-1]["next_block"] > block_number:
+            self._checkpoints.pop()
+        if not self._checkpoints:
+            raise RuntimeError(
+                f"Cannot roll back to block {block_number}, there is no checkpoint before it."
+            )
+        self._restore(self._checkpoints[-1])
+
+    def finalize(self, block_number: int) -> None:
+        """Drop the checkpoints that are not needed anymore,
+        because the blocks before `block_number` will not be rolled back"""
+        while (
+            len(self._checkpoints) > 1
+            and self._checkpoints[1]["next_block"] <= block_number
+        ):
+            self._checkpoints.popleft()
+
+    def save_snapshot(self, file_path: str) -> None:
+        """Write the state to `file_path`, replacing an existing snapshot only once the new one is complete"""
+        temporary_file_path = file_path + ".tmp"
+        with open(temporary_file_path, "w") as file:
+            json.dump(self._to_snapshot(), file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_file_path, file_path)
+
+    @classmethod
+    def load_snapshot(cls, currency_network, file_path: str):
+        """Load the state written by `save_snapshot`, `sync` continues after the last block of the snapshot"""
+        with open(file_path) as file:
+            snapshot = json.load(file)
+        if snapshot["version"] != SNAPSHOT_VERSION:
+            raise ValueError(
+                f"Unsupported snapshot version {snapshot['version']}, expected {SNAPSHOT_VERSION}"
+            )
+        if snapshot["currency_network"] != currency_network.address:
+            raise ValueError(
+                f"Snapshot of currency network {snapshot['currency_network']} "
+                f"cannot be used for {currency_network.address}"
+            )
+        state = cls(currency_network, CurrencyNetworkSimulator(), next_block=0)
+        state._restore(snapshot)
+        return state
+
+    def _to_snapshot(self) -> Dict:
+        simulator = self.simulator
+        users = simulator.get_users()
+        return {
+            "version": SNAPSHOT_VERSION,
+            "currency_network": self.currency_network.address,
+            "next_block": self.next_block,
+            "capacity_imbalance_fee_divisor": simulator.capacity_imbalance_fee_divisor,
+            "prevent_mediator_interests": simulator.prevent_mediator_interests,
+            "is_network_frozen": simulator.is_network_frozen,
+            "users": users,
+            "friends": [simulator.get_friends(user) for user in users],
+            "trustlines": [
+                [a, b, list(attr.astuple(account))]
+                for a, b, account in simulator.get_trustlines()
+            ],
+            "trustline_requests": [
+                list(attr.astuple(trustline_request))
+                for trustline_request in self._trustline_requests.values()
+            ],
+            "debts": [
+                [debtor, creditor, debt]
+                for (debtor, creditor), debt in self._debts.items()
+            ],
+        }
+
+    def _restore(self, snapshot: Dict) -> None:
+        """Replace the state with the one of `snapshot`, which is left unchanged"""
+        self.simulator = CurrencyNetworkSimulator.from_trustlines(
+            snapshot["users"],
+            snapshot["friends"],
+            [
+                (user, friend, Account(*account))
+                for user, friend, account in snapshot["trustlines"]
+            ],
+            capacity_imbalance_fee_divisor=snapshot["capacity_imbalance_fee_divisor"],
+            prevent_mediator_interests=snapshot["prevent_mediator_interests"],
+            is_network_frozen=snapshot["is_network_frozen"],
+        )
+        trustline_requests = {}
+        for values in snapshot["trustline_requests"]:
+            trustline_request = TrustlineRequest(*values)
+            trustline_requests[
+                ordered_users(
+                    trustline_request.initiator, trustline_request.counterparty
+                )
+            ] = trustline_request
+        self._trustline_requests = trustline_requests
+        self._debts = {
+            (debtor, creditor): debt for debtor, creditor, debt in snapshot["debts"]
+        }
+        self.next_block = snapshot["next_block"]
+
+    def _contract_events(self):
+        """The indexed events of the contract, `NetworkUnfreeze` is only part of owned currency networks"""
+        abi_event_names = {
+            entry["name"]
+            for entry in self.currency_network.abi
+            if entry.get("type") == "event"
+        }
+        return [
+            self.currency_network.events[event_name]
+            for event_name in self.event_names
+            if event_name in abi_event_names
+        ]
+
+    def _get_block_timestamp(self, event) -> int:
+        # Events are applied in order, so that consecutive events mostly share their block
+        if event["blockHash"] != self._last_block_hash:
+            block = self.currency_network.web3.eth.getBlock(event["blockHash"])
+            self._last_block_hash = event["blockHash"]
+            self._last_block_timestamp = block["timestamp"]
+        return self._last_block_timestamp
+
+
+def _ordered_debt(debtor: str, creditor: str, debt: int) -> int:
+    """Convert between the debt of `debtor` to `creditor` and the debt in the order of `ordered_users`"""
+    if debtor < creditor:
+        return debt
+    return -debt
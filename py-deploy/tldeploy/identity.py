@@ -1,6 +1,20 @@
+import collections
+import functools
 import json
+import time
+from concurrent.futures import Future
 from enum import Enum
-from typing import Dict, Optional, Any, MutableMapping
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Set,
+    Union,
+)
 
 import attr
 import pkg_resources
@@ -10,16 +24,33 @@ from deploy_tools.transact import (
     wait_for_successful_function_call,
 )
 from eth_keys.datatypes import PrivateKey
-from eth_utils import to_checksum_address
+from eth_utils import keccak, to_checksum_address
 from web3 import Web3
 from web3._utils.events import EventLogErrorFlags
 from web3.exceptions import BadFunctionCallOutput
 from hexbytes import HexBytes
 
-from tldeploy.core import deploy, get_contract_interface, get_chain_id
-from tldeploy.signing import sign_msg_hash, solidity_keccak
+from tldeploy.batch_request import estimate_gas_batch
+from tldeploy.core import (
+    deploy,
+    get_cached_chain_id,
+    get_contract_interface,
+    get_chain_id,
+    invalidate_chain_id_cache,
+)
+from tldeploy.events import EventStream, is_range_too_large_error
+from tldeploy.pipeline import TransactionPipeline
+from tldeploy.signing import (
+    recover_msg_hash_signer,
+    recover_msg_hash_signers,
+    sign_msg_hash,
+    sign_msg_hashes,
+)
 
 MAX_GAS = 1_000_000
+# Nonces from `maxNonce` of the identity contract on are not sequential, like 0
+MAX_NONCE = 2**255
+DEFAULT_CONTRACT_CACHE_SIZE = 1024
 ZERO_ADDRESS = "0x" + "0" * 40
 
 
@@ -33,6 +64,58 @@ def validate_and_checksum_addresses(addresses):
     return formatted_addresses
 
 
+# Length of `abi.encodePacked` of the 16 fields hashed by the identity contract:
+# two bytes1, four addresses, nine uint256 and one uint8
+_PACKED_META_TRANSACTION_LENGTH = 2 + 4 * 20 + 9 * 32 + 1
+
+
+@functools.lru_cache(maxsize=1024)
+def _address_to_bytes(address: Optional[str]) -> bytes:
+    """Validate an address like `validate_and_checksum_addresses` and return its 20 bytes"""
+    if address is None or not Web3.isAddress(address):
+        raise ValueError(f"Given input {address} is not a valid address.")
+    return bytes(HexBytes(address))
+
+
+def _write_uint256(buffer: bytearray, offset: int, value: Optional[int]) -> int:
+    if not isinstance(value, int):
+        raise TypeError(f"Expected an integer for uint256, got: {value!r}")
+    end = offset + 32
+    buffer[offset:end] = value.to_bytes(32, byteorder="big")
+    return end
+
+
+def _write_address(buffer: bytearray, offset: int, address: Optional[str]) -> int:
+    end = offset + 20
+    buffer[offset:end] = _address_to_bytes(address)
+    return end
+
+
+def _pack_meta_transaction(meta_transaction: "MetaTransaction") -> bytes:
+    """Encode the fields hashed by the identity contract like `abi.encodePacked`,
+    same as `solidity_keccak` would before hashing, without parsing the abi types on every call"""
+    buffer = bytearray(_PACKED_META_TRANSACTION_LENGTH)
+    buffer[0] = 0x19
+    buffer[1] = 0x00
+    offset = _write_address(buffer, 2, meta_transaction.from_)
+    offset = _write_uint256(buffer, offset, meta_transaction.chain_id)
+    offset = _write_uint256(buffer, offset, meta_transaction.version)
+    offset = _write_address(buffer, offset, meta_transaction.to)
+    offset = _write_uint256(buffer, offset, meta_transaction.value)
+    end = offset + 32
+    buffer[offset:end] = keccak(HexBytes(meta_transaction.data))
+    offset = end
+    offset = _write_uint256(buffer, offset, meta_transaction.base_fee)
+    offset = _write_uint256(buffer, offset, meta_transaction.gas_price)
+    offset = _write_uint256(buffer, offset, meta_transaction.gas_limit)
+    offset = _write_address(buffer, offset, meta_transaction.fee_recipient)
+    offset = _write_address(buffer, offset, meta_transaction.currency_network_of_fees)
+    offset = _write_uint256(buffer, offset, meta_transaction.nonce)
+    offset = _write_uint256(buffer, offset, meta_transaction.time_limit)
+    buffer[offset] = meta_transaction.operation_type.value
+    return bytes(buffer)
+
+
 class MetaTransactionStatus(Enum):
     SUCCESS = "success"
     FAILURE = "failure"
@@ -92,7 +175,7 @@ class MetaTransaction:
         data = function_call.buildTransaction(transaction={"gas": MAX_GAS})["data"]
 
         if chain_id is None:
-            chain_id = get_chain_id(function_call.web3)
+            chain_id = get_cached_chain_id(function_call.web3)
 
         optional_meta_transaction_args = {}
 
@@ -118,47 +201,14 @@ class MetaTransaction:
 
     @property
     def hash(self) -> bytes:
-        (from_, to, currency_network_of_fees) = validate_and_checksum_addresses(
-            [self.from_, self.to, self.currency_network_of_fees]
-        )
-        return solidity_keccak(
-            [
-                "bytes1",
-                "bytes1",
-                "address",
-                "uint256",
-                "uint256",
-                "address",
-                "uint256",
-                "bytes32",
-                "uint256",
-                "uint256",
-                "uint256",
-                "address",
-                "address",
-                "uint256",
-                "uint256",
-                "uint8",
-            ],
-            [
-                "0x19",
-                "0x00",
-                from_,
-                self.chain_id,
-                self.version,
-                to,
-                self.value,
-                solidity_keccak(["bytes"], [self.data]),
-                self.base_fee,
-                self.gas_price,
-                self.gas_limit,
-                self.fee_recipient,
-                currency_network_of_fees,
-                self.nonce,
-                self.time_limit,
-                self.operation_type.value,
-            ],
-        )
+        """The hash signed by the owner of the identity, like `transactionHash` of the identity contract.
+        It is calculated once per meta transaction, as the meta transaction is immutable."""
+        cached_hash = self.__dict__.get("_hash")
+        if cached_hash is None:
+            cached_hash = keccak(_pack_meta_transaction(self))
+            # Bypass the frozen attributes, the cached hash is not an attribute of the meta transaction
+            object.__setattr__(self, "_hash", cached_hash)
+        return cached_hash
 
     def signed(self, key: PrivateKey) -> "MetaTransaction":
         return attr.evolve(self, signature=sign_msg_hash(self.hash, key=key))
@@ -188,14 +238,67 @@ class ImplementationAddressNotFound(UnexpectedIdentityContractException):
     pass
 
 
+@attr.s(auto_attribs=True)
+class IdentityState:
+    """The state of an identity contract needed to validate meta transactions without calls"""
+
+    owner: str
+    last_nonce: int
+    # Hashes of executed and cancelled meta transactions
+    used_hashes: Set[bytes] = attr.Factory(set)
+    # First block whose events are not applied yet
+    next_block: int = 0
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class RelayResult:
+    """The result of relaying a meta transaction in a bundle"""
+
+    meta_transaction: MetaTransaction
+    # The estimated gas of the envelope transaction, None if the estimation failed.
+    # The envelope transaction is sent with the default gas of the delegate, which covers its gas limit
+    gas: Optional[int] = None
+    # The error of the estimation, if the meta transaction was not sent
+    error: Optional[Exception] = None
+    # Resolves to the `MetaTransactionStatus` once the envelope transaction is mined, if it was sent
+    status: Optional[Future] = None
+
+
 class Delegate:
+    """Sends meta transactions of identities and validates them.
+
+    With `local_validation`, meta transactions are validated without calls against a cached `IdentityState`
+    of the identity, loaded on first use and kept current via `sync_identity_states`.
+    As the cached state may lag behind the chain until the next sync, meta transactions found invalid locally
+    are validated on chain again if `on_chain_fallback` is set. Meta transactions found valid locally are not,
+    so meta transactions sent by the delegate are marked as used in the cached state right away,
+    while the ones sent by others are only seen after the next sync.
+
+    The contract objects of the last `contract_cache_size` identities and the chain id are cached,
+    see `invalidate_caches`."""
+
+    identity_event_names = ["TransactionExecution", "TransactionCancellation"]
+
     def __init__(
-        self, delegate_address: str, *, web3, identity_contract_abi, default_gas=MAX_GAS
+        self,
+        delegate_address: str,
+        *,
+        web3,
+        identity_contract_abi,
+        default_gas=MAX_GAS,
+        local_validation: bool = False,
+        on_chain_fallback: bool = True,
+        contract_cache_size: int = DEFAULT_CONTRACT_CACHE_SIZE,
     ):
         self.delegate_address = delegate_address
         self._web3 = web3
         self._identity_contract_abi = identity_contract_abi
         self.default_gas = default_gas
+        self.local_validation = local_validation
+        self.on_chain_fallback = on_chain_fallback
+        self._identity_states: Dict[str, IdentityState] = {}
+        self.contract_cache_size = contract_cache_size
+        self._identity_contracts: collections.OrderedDict = collections.OrderedDict()
 
     def estimate_gas_signed_meta_transaction(
         self, signed_meta_transaction: MetaTransaction
@@ -228,12 +331,130 @@ class Delegate:
         if "gas" not in transaction_options and self.default_gas is not None:
             transaction_options["gas"] = self.default_gas
 
-        return self._meta_transaction_function_call(signed_meta_transaction).transact(
-            transaction_options
+        transaction_hash = self._meta_transaction_function_call(
+            signed_meta_transaction
+        ).transact(transaction_options)
+        self._mark_meta_transaction_used(signed_meta_transaction)
+        return transaction_hash
+
+    def estimate_gas_signed_meta_transactions(
+        self, signed_meta_transactions: Sequence[MetaTransaction]
+    ) -> List[Union[int, Exception]]:
+        """Estimates the gas of the envelope transactions of multiple meta transactions,
+        in a single batch request with an `HTTPProvider`, see `estimate_gas_batch`.
+        Returns the estimated gas or the error of the estimation per meta transaction.
+
+        All meta transactions are estimated against the current state, so meta transactions depending on
+        earlier ones of the same batch, e.g. with consecutive nonces of the same identity, fail the estimation.
+        """
+        return estimate_gas_batch(
+            self._web3,
+            [
+                {
+                    "from": self.delegate_address,
+                    "to": signed_meta_transaction.from_,
+                    "data": self._meta_transaction_function_call(
+                        signed_meta_transaction
+                    )._encode_transaction_data(),
+                }
+                for signed_meta_transaction in signed_meta_transactions
+            ],
+        )
+
+    def relay_signed_meta_transactions(
+        self,
+        signed_meta_transactions: Sequence[MetaTransaction],
+        *,
+        pipeline: TransactionPipeline = None,
+    ) -> List[RelayResult]:
+        """Relays a bundle of meta transactions: estimates their gas in one batch via
+        `estimate_gas_signed_meta_transactions` and sends the ones with a successful estimation
+        back to back with consecutive nonces of the delegate via `pipeline`, with the default gas of the delegate.
+
+        Returns a `RelayResult` per meta transaction, in the order of `signed_meta_transactions`.
+        Without a `pipeline`, one is created for the delegate address and all sent meta transactions
+        are mined when this returns. The `pipeline` has to send from the delegate address.
+        """
+        if pipeline is None:
+            with TransactionPipeline(
+                self._web3, transaction_options={"from": self.delegate_address}
+            ) as pipeline:
+                return self.relay_signed_meta_transactions(
+                    signed_meta_transactions, pipeline=pipeline
+                )
+        if pipeline.sender != self.delegate_address:
+            raise ValueError(
+                f"The pipeline sends from {pipeline.sender} instead of the delegate address {self.delegate_address}"
+            )
+
+        gas_estimates = self.estimate_gas_signed_meta_transactions(
+            signed_meta_transactions
+        )
+        relay_results = []
+        for signed_meta_transaction, gas in zip(
+            signed_meta_transactions, gas_estimates
+        ):
+            if isinstance(gas, Exception):
+                relay_results.append(
+                    RelayResult(meta_transaction=signed_meta_transaction, error=gas)
+                )
+                continue
+            from_ = signed_meta_transaction.from_
+            if from_ is None:
+                raise ValueError("From has to be set")
+            # Get the contract before sending, the status is decoded in the thread of the pipeline
+            contract = self._get_identity_contract(from_)
+            receipt = pipeline.send_function_call(
+                self._meta_transaction_function_call(signed_meta_transaction),
+                gas=self._get_relay_gas(signed_meta_transaction, gas),
+            )
+            self._mark_meta_transaction_used(signed_meta_transaction)
+            relay_results.append(
+                RelayResult(
+                    meta_transaction=signed_meta_transaction,
+                    gas=gas,
+                    status=_map_future(
+                        receipt,
+                        functools.partial(
+                            _get_meta_transaction_status_of_receipt,
+                            contract,
+                            signed_meta_transaction.hash,
+                        ),
+                    ),
+                )
+            )
+        return relay_results
+
+    def _get_relay_gas(
+        self, signed_meta_transaction: MetaTransaction, gas_estimate: int
+    ) -> int:
+        """Returns the gas to send the envelope transaction of a meta transaction with a successful estimation.
+
+        The envelope transaction does not revert if the call of the meta transaction fails, so that the estimation
+        also passes with too little gas for the call, which only gets 63/64 of the remaining gas.
+        The estimate thus only filters out failing meta transactions and the envelope is sent with
+        the default gas, or `MAX_GAS` without one, but at least with enough gas for the gas limit of the call."""
+        default_gas = self.default_gas if self.default_gas is not None else MAX_GAS
+        return max(
+            default_gas, gas_estimate + signed_meta_transaction.gas_limit * 64 // 63
         )
 
     def validate_meta_transaction(
         self, signed_meta_transaction: MetaTransaction
+    ) -> bool:
+        """Validates the fields of the meta transaction against the state of
+        the identity contract, locally first if `local_validation` is set,
+        see `validate_meta_transaction_locally` and `validate_meta_transaction_on_chain`.
+        """
+        if self.local_validation:
+            if self.validate_meta_transaction_locally(signed_meta_transaction):
+                return True
+            if not self.on_chain_fallback:
+                return False
+        return self.validate_meta_transaction_on_chain(signed_meta_transaction)
+
+    def validate_meta_transaction_on_chain(
+        self, signed_meta_transaction: MetaTransaction
     ) -> bool:
         """Validates the fields of the meta transaction against the state of
         the identity contract.
@@ -256,6 +477,63 @@ class Delegate:
             and self.validate_time_limit(signed_meta_transaction)
         )
 
+    def validate_meta_transaction_locally(
+        self, signed_meta_transaction: MetaTransaction
+    ) -> bool:
+        """Validates the fields of the meta transaction like `validate_meta_transaction_on_chain`,
+        but against the cached state of the identity and the local time, without calls.
+
+        Signatures for which the contract reverts are invalid as well.
+        Will raise UnexpectedIdentityContractException, if it could not load the state of the identity.
+        """
+        from_ = signed_meta_transaction.from_
+        if from_ is None:
+            raise ValueError("From has to be set")
+        nonce = signed_meta_transaction.nonce
+        if nonce is None:
+            raise ValueError("Nonce has to be set")
+        identity_state = self.get_identity_state(from_)
+
+        hash = signed_meta_transaction.hash
+        time_limit = signed_meta_transaction.time_limit
+        if hash in identity_state.used_hashes:
+            nonce_valid = False
+        elif nonce == 0 or nonce >= MAX_NONCE:
+            nonce_valid = True
+        else:
+            nonce_valid = identity_state.last_nonce + 1 == nonce
+        return (
+            signed_meta_transaction.chain_id == get_cached_chain_id(self._web3)
+            and nonce_valid
+            and recover_msg_hash_signer(hash, signed_meta_transaction.signature)
+            == identity_state.owner
+            and (time_limit == 0 or time_limit >= time.time())
+        )
+
+    def get_identity_state(self, identity_address: str) -> IdentityState:
+        """Returns the cached state of the identity, loaded on first use.
+
+        Will raise UnexpectedIdentityContractException, if it could not find the
+        necessary functions in the contract.
+        """
+        identity_state = self._identity_states.get(identity_address)
+        if identity_state is None:
+            identity_state = self._load_identity_state(identity_address)
+            self._identity_states[identity_address] = identity_state
+        return identity_state
+
+    def sync_identity_states(self, to_block="latest") -> None:
+        """Applies the events up to `to_block` to the cached states of all identities,
+        the last nonce is fetched again for identities that executed meta transactions"""
+        if to_block == "latest":
+            to_block = self._web3.eth.blockNumber
+        for identity_address, identity_state in self._identity_states.items():
+            if self._apply_identity_events(identity_address, identity_state, to_block):
+                contract = self._get_identity_contract(identity_address)
+                identity_state.last_nonce = contract.functions.lastNonce().call(
+                    block_identifier=to_block
+                )
+
     def validate_nonce(self, signed_meta_transaction: MetaTransaction):
         """Validates the nonce by using the provided check by the identity
         contract.
@@ -323,7 +601,7 @@ class Delegate:
 
         Returns: True, if the chain id was correct
         """
-        return meta_transaction.chain_id == get_chain_id(self._web3)
+        return meta_transaction.chain_id == get_cached_chain_id(self._web3)
 
     def get_next_nonce(self, identity_address: str):
         """Returns the next usable nonce.
@@ -345,8 +623,92 @@ class Delegate:
         except BadFunctionCallOutput:
             raise ImplementationAddressNotFound
 
+    def _load_identity_state(self, identity_address: str) -> IdentityState:
+        contract = self._get_identity_contract(identity_address)
+        block_number = self._web3.eth.blockNumber
+        try:
+            identity_state = IdentityState(
+                owner=contract.functions.owner().call(block_identifier=block_number),
+                last_nonce=contract.functions.lastNonce().call(
+                    block_identifier=block_number
+                ),
+            )
+        except BadFunctionCallOutput:
+            raise UnexpectedIdentityContractException(
+                f"Could not load the state of identity {identity_address}."
+            )
+        self._apply_identity_events(identity_address, identity_state, block_number)
+        return identity_state
+
+    def _apply_identity_events(
+        self, identity_address: str, identity_state: IdentityState, to_block: int
+    ) -> bool:
+        """Applies the events of the identity up to `to_block` and returns whether it executed meta transactions.
+        The events of executions do not tell the nonce, so that the last nonce has to be fetched again."""
+        if identity_state.next_block > to_block:
+            return False
+        contract = self._get_identity_contract(identity_address)
+        abi_event_names = {
+            entry["name"]
+            for entry in self._identity_contract_abi
+            if entry.get("type") == "event"
+        }
+        executed = False
+        for event in EventStream(
+            [
+                contract.events[event_name]
+                for event_name in self.identity_event_names
+                if event_name in abi_event_names
+            ],
+            from_block=identity_state.next_block,
+            to_block=to_block,
+        ):
+            # Meta transactions with sequential nonces do not mark their hash as used,
+            # but they cannot be executed again either
+            identity_state.used_hashes.add(bytes(event["args"]["hash"]))
+            executed = executed or event["event"] == "TransactionExecution"
+        identity_state.next_block = to_block + 1
+        return executed
+
+    def _mark_meta_transaction_used(
+        self, signed_meta_transaction: MetaTransaction
+    ) -> None:
+        """Marks a sent meta transaction as used in the cached state of its identity, if loaded.
+        If its envelope transaction fails, it is found invalid locally and validated on chain again."""
+        from_ = signed_meta_transaction.from_
+        nonce = signed_meta_transaction.nonce
+        # Sent meta transactions have both set, as their hash could not be computed otherwise
+        if not self.local_validation or from_ is None or nonce is None:
+            return
+        identity_state = self._identity_states.get(from_)
+        if identity_state is None:
+            return
+        identity_state.used_hashes.add(signed_meta_transaction.hash)
+        if 0 < nonce < MAX_NONCE:
+            identity_state.last_nonce = max(identity_state.last_nonce, nonce)
+
+    def invalidate_caches(self) -> None:
+        """Drops the cached contract objects and the cached chain id of the web3 instance,
+        e.g. after switching its provider. The states of the identities are kept current by
+        `sync_identity_states` instead."""
+        self._identity_contracts.clear()
+        invalidate_chain_id_cache(self._web3)
+
     def _get_identity_contract(self, address: str):
-        return self._web3.eth.contract(abi=self._identity_contract_abi, address=address)
+        # Building a contract object builds the tables of all functions and events of the abi,
+        # so the ones of the last used identities are kept
+        contract = self._identity_contracts.get(address)
+        if contract is not None:
+            self._identity_contracts.move_to_end(address)
+            return contract
+        contract = self._web3.eth.contract(
+            abi=self._identity_contract_abi, address=address
+        )
+        if self.contract_cache_size > 0:
+            self._identity_contracts[address] = contract
+            if len(self._identity_contracts) > self.contract_cache_size:
+                self._identity_contracts.popitem(last=False)
+        return contract
 
     def _meta_transaction_function_call(self, signed_meta_transaction: MetaTransaction):
         from_ = signed_meta_transaction.from_
@@ -375,11 +737,27 @@ class Delegate:
         identity_contract = self._get_identity_contract(identity_address)
 
         # the filter cannot handle bytes32 values as hex strings, use HexBytes()
-        meta_tx_execution_logs = identity_contract.events.TransactionExecution.getLogs(
-            fromBlock=from_block,
-            toBlock=to_block,
-            argument_filters={"hash": HexBytes(hash)},
-        )
+        argument_filters = {"hash": HexBytes(hash)}
+        # The logs are filtered by the indexed hash, so a single query is enough unless the node refuses the range
+        try:
+            meta_tx_execution_logs = (
+                identity_contract.events.TransactionExecution.getLogs(
+                    fromBlock=from_block,
+                    toBlock=to_block,
+                    argument_filters=argument_filters,
+                )
+            )
+        except Exception as e:
+            if not is_range_too_large_error(e):
+                raise
+            meta_tx_execution_logs = list(
+                EventStream(
+                    [identity_contract.events.TransactionExecution],
+                    from_block=from_block,
+                    to_block=to_block,
+                    argument_filters=argument_filters,
+                )
+            )
         assert len(meta_tx_execution_logs) <= 1
         if len(meta_tx_execution_logs) == 1:
             meta_tx_status = meta_tx_execution_logs[0]["args"]["status"]
@@ -390,6 +768,37 @@ class Delegate:
         return MetaTransactionStatus.NOT_FOUND
 
 
+def _get_meta_transaction_status_of_receipt(
+    identity_contract, hash: bytes, receipt
+) -> MetaTransactionStatus:
+    # Other contracts might emit events with the same signature, so the address is checked as well
+    for event in identity_contract.events.TransactionExecution().processReceipt(
+        receipt, errors=EventLogErrorFlags.Discard
+    ):
+        if (
+            event["address"] == identity_contract.address
+            and bytes(event["args"]["hash"]) == hash
+        ):
+            if event["args"]["status"]:
+                return MetaTransactionStatus.SUCCESS
+            return MetaTransactionStatus.FAILURE
+    return MetaTransactionStatus.NOT_FOUND
+
+
+def _map_future(future: Future, function: Callable) -> Future:
+    """Returns a future resolving to `function` applied to the result of `future`"""
+    mapped_future: Future = Future()
+
+    def set_result(done_future: Future) -> None:
+        try:
+            mapped_future.set_result(function(done_future.result()))
+        except BaseException as exception:
+            mapped_future.set_exception(exception)
+
+    future.add_done_callback(set_result)
+    return mapped_future
+
+
 class Identity:
     def __init__(self, *, contract, owner_private_key: PrivateKey):
         self.contract = contract
@@ -412,7 +821,7 @@ class Identity:
             )
         if meta_transaction.chain_id is None:
             meta_transaction = attr.evolve(
-                meta_transaction, chain_id=get_chain_id(self.contract.web3)
+                meta_transaction, chain_id=get_cached_chain_id(self.contract.web3)
             )
 
         return meta_transaction
@@ -429,6 +838,64 @@ class Identity:
         meta_transaction = self.signed_meta_transaction(meta_transaction)
         return meta_transaction
 
+    def defaults_filled_batch(
+        self, meta_transactions: Sequence[MetaTransaction]
+    ) -> List[MetaTransaction]:
+        """Returns the meta transactions filled like `defaults_filled`, the ones without a nonce get
+        consecutive nonces from the next nonce on, fetched only once for all of them"""
+        nonce = None
+        chain_id = None
+        filled_meta_transactions = []
+        for meta_transaction in meta_transactions:
+            meta_transaction = attr.evolve(meta_transaction, from_=self.address)
+            if meta_transaction.nonce is None:
+                if nonce is None:
+                    nonce = self.get_next_nonce()
+                meta_transaction = attr.evolve(meta_transaction, nonce=nonce)
+                nonce += 1
+            if meta_transaction.chain_id is None:
+                if chain_id is None:
+                    chain_id = get_cached_chain_id(self.contract.web3)
+                meta_transaction = attr.evolve(meta_transaction, chain_id=chain_id)
+            filled_meta_transactions.append(meta_transaction)
+        return filled_meta_transactions
+
+    def signed_meta_transactions(
+        self, meta_transactions: Sequence[MetaTransaction], *, max_workers: int = 1
+    ) -> List[MetaTransaction]:
+        """Sign multiple meta transactions, with `max_workers` processes if more than one"""
+        signatures = sign_msg_hashes(
+            [meta_transaction.hash for meta_transaction in meta_transactions],
+            self._owner_private_key,
+            max_workers=max_workers,
+        )
+        return [
+            attr.evolve(meta_transaction, signature=signature)
+            for meta_transaction, signature in zip(meta_transactions, signatures)
+        ]
+
+    def filled_and_signed_meta_transactions(
+        self, meta_transactions: Sequence[MetaTransaction], *, max_workers: int = 1
+    ) -> List[MetaTransaction]:
+        meta_transactions = self.defaults_filled_batch(meta_transactions)
+        return self.signed_meta_transactions(meta_transactions, max_workers=max_workers)
+
+    def validate_signatures(
+        self, meta_transactions: Sequence[MetaTransaction], *, max_workers: int = 1
+    ) -> List[bool]:
+        """Validate the signatures of multiple meta transactions like `validateSignature` of the identity contract,
+        but locally after fetching the owner once, with `max_workers` processes if more than one"""
+        owner = self.contract.functions.owner().call()
+        signers = recover_msg_hash_signers(
+            [meta_transaction.hash for meta_transaction in meta_transactions],
+            [
+                meta_transaction.signature or b""
+                for meta_transaction in meta_transactions
+            ],
+            max_workers=max_workers,
+        )
+        return [signer == owner for signer in signers]
+
     def get_next_nonce(self):
         return self.contract.functions.lastNonce().call() + 1
 
@@ -0,0 +1,108 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Set
+
+import pkg_resources
+from hexbytes import HexBytes
+from web3 import HTTPProvider
+from web3.exceptions import BadFunctionCallOutput, ContractLogicError
+
+from tldeploy.batch_request import get_code_batch
+from tldeploy.load_contracts import get_contract_interface
+
+EOA = "eoa"
+IDENTITY = "identity"
+OTHER_CONTRACT = "other_contract"
+
+
+def get_identity_runtime_codes() -> Set[HexBytes]:
+    """Return the runtime codes of the identity contracts and identity proxies we know of"""
+    # Same as `tldeploy.identity.get_pinned_proxy_interface`, which cannot be imported here without import cycle
+    with open(pkg_resources.resource_filename(__name__, "identity-proxy.json")) as file:
+        pinned_proxy_interface = json.load(file)["Proxy"]
+    return {
+        HexBytes(pinned_proxy_interface["deployedBytecode"]),
+        HexBytes(get_contract_interface("Proxy")["deployedBytecode"]),
+        HexBytes(get_contract_interface("Identity")["deployedBytecode"]),
+    }
+
+
+class IdentityOwnerResolver:
+    """Resolve addresses of users to the owners of their identities.
+
+    The code of all users is fetched once to classify them as `EOA`, `IDENTITY` or `OTHER_CONTRACT`,
+    in a single batch request with an `HTTPProvider`, see `get_code_batch`.
+    `owner()` is then only called on identities. The classification and owners are cached.
+    Contracts with unknown code are probed once with `owner()`, so that identities deployed
+    with other compiler versions are still resolved, and are classified according to the result.
+    The owner of anything that is not an identity is the address itself."""
+
+    def __init__(self, web3, *, max_workers: int = 1, identity_runtime_codes=None):
+        self.web3 = web3
+        self.max_workers = max_workers
+        if identity_runtime_codes is None:
+            identity_runtime_codes = get_identity_runtime_codes()
+        self.identity_runtime_codes = set(identity_runtime_codes)
+        self.identity_abi = get_contract_interface("Identity")["abi"]
+        self._kinds: Dict[str, str] = {}
+        self._owners: Dict[str, str] = {}
+
+    def get_owner(self, user_address: str) -> str:
+        return self.get_owners([user_address])[0]
+
+    def get_owners(self, user_addresses: Iterable[str]) -> List[str]:
+        user_addresses = list(user_addresses)
+        kinds = self.classify(user_addresses)
+        missing_identities = list(
+            dict.fromkeys(
+                user
+                for user, kind in zip(user_addresses, kinds)
+                if kind == IDENTITY and user not in self._owners
+            )
+        )
+        for user, owner in zip(
+            missing_identities, self._map(self._call_owner, missing_identities)
+        ):
+            self._owners[user] = owner
+
+        return [self._owners.get(user, user) for user in user_addresses]
+
+    def classify(self, user_addresses: Iterable[str]) -> List[str]:
+        """Return the kinds of `user_addresses`, fetching the code of the ones not yet classified"""
+        user_addresses = list(user_addresses)
+        missing_users = list(
+            dict.fromkeys(user for user in user_addresses if user not in self._kinds)
+        )
+        if missing_users:
+            if isinstance(self.web3.provider, HTTPProvider):
+                codes = get_code_batch(self.web3, missing_users)
+            else:
+                codes = self._map(self.web3.eth.getCode, missing_users)
+            for user, code in zip(missing_users, codes):
+                self._kinds[user] = self._classify_code(user, HexBytes(code))
+        return [self._kinds[user] for user in user_addresses]
+
+    def _classify_code(self, user_address: str, code: HexBytes) -> str:
+        if len(code) == 0:
+            return EOA
+        if code in self.identity_runtime_codes:
+            return IDENTITY
+
+        try:
+            owner = self._call_owner(user_address)
+        except (BadFunctionCallOutput, ContractLogicError):
+            return OTHER_CONTRACT
+        self._owners[user_address] = owner
+        return IDENTITY
+
+    def _call_owner(self, user_address: str) -> str:
+        identity_contract = self.web3.eth.contract(
+            address=user_address, abi=self.identity_abi
+        )
+        return identity_contract.functions.owner().call()
+
+    def _map(self, function, iterable):
+        if self.max_workers == 1:
+            return map(function, iterable)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(function, iterable))
@@ -0,0 +1,181 @@
+# This file provides reports of the interests applied to the trustlines of currency networks,
+# calculated in a single pass over their events
+import csv
+import itertools
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import attr
+
+from tldeploy.events import EventStream, ordered_users
+from tldeploy.interests import calculate_balance_with_interests
+
+REPORT_COLUMNS = ["currency_network", "user", "counterparty", "interests"]
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class InterestAccrual:
+    currency_network: str
+    user: str
+    counterparty: str
+    # Positive if the counterparty owes more to the user because of interests
+    interests: int
+
+
+@attr.s(auto_attribs=True, slots=True)
+class _TrustlineHistory:
+    """What is needed of the history of a trustline to calculate the interests of its next balance update,
+    from the view of the user with the lower address"""
+
+    balance: int = 0
+    timestamp: int = 0
+    interest_rate_given: int = 0
+    interest_rate_received: int = 0
+
+
+class TrustlineHistories:
+    """The balances, their timestamps and the interest rates of the open trustlines of a currency network,
+    kept current by applying its `BalanceUpdate` and `TrustlineUpdate` events in order.
+
+    Only the open trustlines are kept, so that the memory is bounded by the number of active trustlines
+    and not the number of events. Like the contract, interests are calculated with the interest rates
+    of the last `TrustlineUpdate` before."""
+
+    def __init__(self):
+        self._trustlines: Dict[Tuple[str, str], _TrustlineHistory] = {}
+
+    def apply_trustline_update(self, trustline_update_event) -> None:
+        args = trustline_update_event["args"]
+        a, b = ordered_users(args["_creditor"], args["_debtor"])
+        trustline = self._get_trustline(a, b)
+        if args["_creditor"] == a:
+            interest_rates = args["_interestRateGiven"], args["_interestRateReceived"]
+        else:
+            interest_rates = args["_interestRateReceived"], args["_interestRateGiven"]
+        trustline.interest_rate_given, trustline.interest_rate_received = interest_rates
+        is_closed = (
+            args["_creditlineGiven"] == 0
+            and args["_creditlineReceived"] == 0
+            and interest_rates == (0, 0)
+            and not args["_isFrozen"]
+            and trustline.balance == 0
+        )
+        if is_closed:
+            # A zero balance cannot accrue interests, so the history of closed trustlines can be dropped
+            del self._trustlines[(a, b)]
+
+    def apply_balance_update(
+        self, balance_update_event, timestamp: int
+    ) -> Tuple[int, int]:
+        """Apply a balance update of a block with `timestamp` and return the previous balance
+        and the interests applied at the balance update, both from the view of its sender"""
+        args = balance_update_event["args"]
+        a, b = ordered_users(args["_from"], args["_to"])
+        trustline = self._get_trustline(a, b)
+        interests = (
+            calculate_balance_with_interests(
+                trustline.balance,
+                trustline.timestamp,
+                timestamp,
+                trustline.interest_rate_given,
+                trustline.interest_rate_received,
+            )
+            - trustline.balance
+        )
+        previous_balance = trustline.balance
+        trustline.balance = args["_value"] if args["_from"] == a else -args["_value"]
+        trustline.timestamp = timestamp
+        if args["_from"] == a:
+            return previous_balance, interests
+        return -previous_balance, -interests
+
+    def _get_trustline(self, a: str, b: str) -> _TrustlineHistory:
+        trustline = self._trustlines.get((a, b))
+        if trustline is None:
+            trustline = self._trustlines[(a, b)] = _TrustlineHistory()
+        return trustline
+
+
+def calculate_interest_accruals(
+    currency_network,
+    *,
+    from_timestamp: int = 0,
+    to_timestamp: Optional[int] = None,
+    to_block="latest",
+    **event_stream_kwargs,
+) -> Iterator[InterestAccrual]:
+    """Calculate the interests applied at the balance updates of all trustlines of `currency_network`
+    with a block timestamp from `from_timestamp` on and before `to_timestamp`, per user and counterparty.
+
+    The `BalanceUpdate` and `TrustlineUpdate` events are read once from the first block on
+    and applied to `TrustlineHistories`. `event_stream_kwargs` are passed to `EventStream`."""
+    web3 = currency_network.web3
+    events = EventStream(
+        [
+            currency_network.events.BalanceUpdate,
+            currency_network.events.TrustlineUpdate,
+        ],
+        from_block=0,
+        to_block=to_block,
+        **event_stream_kwargs,
+    )
+    trustline_histories = TrustlineHistories()
+    interests: Dict[Tuple[str, str], int] = {}
+    last_block_hash = None
+    timestamp = 0
+
+    for event in events:
+        if event["event"] == "TrustlineUpdate":
+            trustline_histories.apply_trustline_update(event)
+        elif event["event"] == "BalanceUpdate":
+            if event["blockHash"] != last_block_hash:
+                last_block_hash = event["blockHash"]
+                timestamp = web3.eth.getBlock(last_block_hash)["timestamp"]
+            if to_timestamp is not None and timestamp >= to_timestamp:
+                break
+            _, applied_interests = trustline_histories.apply_balance_update(
+                event, timestamp
+            )
+            if timestamp >= from_timestamp and applied_interests != 0:
+                a, b = event["args"]["_from"], event["args"]["_to"]
+                if b < a:
+                    a, b, applied_interests = b, a, -applied_interests
+                interests[(a, b)] = interests.get((a, b), 0) + applied_interests
+
+    for (a, b), applied_interests in interests.items():
+        yield InterestAccrual(currency_network.address, a, b, applied_interests)
+        yield InterestAccrual(currency_network.address, b, a, -applied_interests)
+
+
+def generate_interest_report(
+    currency_networks: Iterable, **kwargs
+) -> Iterator[InterestAccrual]:
+    """Calculate the interest accruals of multiple currency networks one after the other,
+    `kwargs` are passed to `calculate_interest_accruals`"""
+    return itertools.chain.from_iterable(
+        calculate_interest_accruals(currency_network, **kwargs)
+        for currency_network in currency_networks
+    )
+
+
+def write_interest_report_csv(
+    file: TextIO, interest_accruals: Iterable[InterestAccrual]
+) -> int:
+    """Write the interest accruals as csv with a header of `REPORT_COLUMNS` and return the number of rows"""
+    writer = csv.writer(file)
+    writer.writerow(REPORT_COLUMNS)
+    number_of_rows = 0
+    for interest_accrual in interest_accruals:
+        writer.writerow(attr.astuple(interest_accrual))
+        number_of_rows += 1
+    return number_of_rows
+
+
+def interest_report_to_columns(
+    interest_accruals: Iterable[InterestAccrual],
+) -> Dict[str, List]:
+    """Return the interest accruals as columns of `REPORT_COLUMNS`, e.g. to be written to a columnar format"""
+    columns: Dict[str, List] = {column: [] for column in REPORT_COLUMNS}
+    for interest_accrual in interest_accruals:
+        for column, value in zip(REPORT_COLUMNS, attr.astuple(interest_accrual)):
+            columns[column].append(value)
+    return columns
@@ -1,8 +1,32 @@
 # This file provides functions to calculate the interests on a trustline off-chain
+# The calculations are done on integers only and give the same results as
+# `CurrencyNetworkBasic.calculateBalanceWithInterests`
+import functools
+from typing import List, Sequence
 
 SECONDS_PER_YEAR = 60 * 60 * 24 * 365
 INTERESTS_DECIMALS = 2
 DELTA_TIME_MINIMAL_ALLOWED_VALUE = -60
+TAYLOR_HIGHEST_ORDER = 15
+
+MAX_BALANCE = 2**64 - 1
+MIN_BALANCE = -MAX_BALANCE
+MAX_INTEREST_RATE = 2**15 - 1
+MIN_INTEREST_RATE = -(2**15)
+MAX_INT256 = 2**255 - 1
+MIN_INT256 = -(2**255)
+MAX_UINT256 = 2**256 - 1
+
+_INTERESTS_DIVISOR = SECONDS_PER_YEAR * 100 * 10**INTERESTS_DECIMALS
+
+
+@functools.lru_cache(maxsize=None)
+def _get_order_divisors(highest_order: int):
+    """Return the divisors of the orders of the taylor approximation up to `highest_order`"""
+    return tuple(_INTERESTS_DIVISOR * order for order in range(1, highest_order + 1))
+
+
+_ORDER_DIVISORS = _get_order_divisors(TAYLOR_HIGHEST_ORDER)
 
 
 def _ensure_non_negative_delta_time(delta_time):
@@ -17,29 +41,157 @@ def _ensure_non_negative_delta_time(delta_time):
     return max(delta_time, 0)
 
 
+def _div_toward_zero(numerator: int, denominator: int) -> int:
+    """Integer division rounding toward zero like solidity, in contrast to `//` rounding toward negative infinity"""
+    quotient = abs(numerator) // abs(denominator)
+    if (numerator < 0) != (denominator < 0):
+        return -quotient
+    return quotient
+
+
+def _checked_int256(value: int) -> int:
+    """Mirror the checked arithmetic of solidity 0.8, which reverts on int256 overflows"""
+    if not MIN_INT256 <= value <= MAX_INT256:
+        raise ValueError("Interest calculation overflows int256 and would revert")
+    return value
+
+
+def _to_int72(value: int) -> int:
+    """Mirror the explicit conversion `int72(value)` of solidity, which drops the higher bits"""
+    value &= 2**72 - 1
+    if value >= 2**71:
+        value -= 2**72
+    return value
+
+
 def calculate_interests(
     balance: int,
     internal_interest_rate: int,
     delta_time_in_seconds: int,
-    highest_order: int = 15,
+    highest_order: int = TAYLOR_HIGHEST_ORDER,
 ) -> int:
+    """Calculate the interests on `balance` with the taylor approximation used by the currency network,
+    without the clamping of the result to the balance bounds done by `calculate_balance_with_interests`"""
     delta_time_in_seconds = _ensure_non_negative_delta_time(delta_time_in_seconds)
-    intermediate_order = balance
+    return _calculate_taylor_interests(
+        balance,
+        internal_interest_rate * delta_time_in_seconds,
+        _get_order_divisors(highest_order),
+    )
+
+
+def _calculate_taylor_interests(
+    balance: int, rate_times_time: int, order_divisors
+) -> int:
+    """Calculate the interests of the taylor approximation without overflow checks
+
+    Division toward zero is done on the magnitudes of the orders, only their sign alternates with a negative rate."""
+    if balance < 0:
+        magnitude = -balance
+        sign = -1
+    else:
+        magnitude = balance
+        sign = 1
+    alternate_sign = rate_times_time < 0
+    if alternate_sign:
+        rate_times_time = -rate_times_time
+
+    # Every order is at most the previous one times `rate_times_time` divided by the divisor of the order,
+    # if the first order rounds to zero there are no interests
+    if not order_divisors or magnitude * rate_times_time < order_divisors[0]:
+        return 0
+
     interests = 0
-    # Calculate compound interests using taylor approximation
-    for order in range(1, highest_order + 1):
-        intermediate_order = int(
-            intermediate_order
-            * internal_interest_rate
-            * delta_time_in_seconds
-            / (SECONDS_PER_YEAR * 100 * 10**INTERESTS_DECIMALS * order)
+    for divisor in order_divisors:
+        magnitude = magnitude * rate_times_time // divisor
+        if magnitude == 0:
+            break
+        if alternate_sign:
+            sign = -sign
+        interests += sign * magnitude
+    return interests
+
+
+def _calculate_checked_taylor_balance(balance: int, rate: int, delta_time: int) -> int:
+    """Calculate the balance with the interests of the taylor approximation with the checked arithmetic of solidity"""
+    intermediate_order = balance
+    new_balance = balance
+    for divisor in _ORDER_DIVISORS:
+        # The overflow adjustment of the contract can not be hit, as the checked arithmetic reverts before,
+        # the same holds for the overflow checks of the new balance
+        new_intermediate_order = _checked_int256(
+            _checked_int256(intermediate_order * rate) * delta_time
         )
 
+        intermediate_order = _div_toward_zero(new_intermediate_order, divisor)
         if intermediate_order == 0:
             break
-        interests += intermediate_order
 
-    return interests
+        new_balance = _checked_int256(new_balance + intermediate_order)
+
+    return new_balance
+
+
+def calculate_balance_with_interests(
+    balance: int,
+    start_time: int,
+    end_time: int,
+    interest_rate_given: int,
+    interest_rate_received: int,
+) -> int:
+    """Calculate the balance with interests exactly like `CurrencyNetworkBasic.calculateBalanceWithInterests`
+
+    Raises a `ValueError` for all inputs for which the contract function reverts,
+    or which cannot be passed to the contract function."""
+    if not MIN_BALANCE <= balance <= MAX_BALANCE:
+        raise ValueError(f"Balance has to fit into a 64 bit value, got: {balance}")
+    for interest_rate in (interest_rate_given, interest_rate_received):
+        if not MIN_INTEREST_RATE <= interest_rate <= MAX_INTEREST_RATE:
+            raise ValueError(
+                f"Interest rate has to fit into a 16 bit value, got: {interest_rate}"
+            )
+    if not 0 <= start_time <= end_time <= MAX_UINT256:
+        raise ValueError(
+            f"Times have to be ordered unsigned 256 bit values, got: {start_time}, {end_time}"
+        )
+
+    if balance > 0:
+        rate = interest_rate_given
+    elif balance < 0:
+        rate = interest_rate_received
+    else:
+        rate = 0
+
+    if rate == 0:
+        return balance
+
+    delta_time = end_time - start_time
+    if delta_time > MAX_INT256:
+        # The conversion to int256 results in a negative value and fails the assert in the contract
+        raise ValueError(f"Time difference does not fit into int256: {delta_time}")
+
+    rate_times_time = rate * delta_time
+    if -_INTERESTS_DIVISOR <= rate_times_time <= _INTERESTS_DIVISOR:
+        # The orders decrease in magnitude, so that nothing can overflow
+        new_balance = balance + _calculate_taylor_interests(
+            balance, rate_times_time, _ORDER_DIVISORS
+        )
+    else:
+        new_balance = _calculate_checked_taylor_balance(balance, rate, delta_time)
+
+    # Restrict balance within MAX / MIN balance
+    # If rate is negative, we assume that the balance was eventually going to be 0
+    if rate > 0:
+        new_balance = min(max(new_balance, MIN_BALANCE), MAX_BALANCE)
+    if rate < 0:
+        if balance > 0 and new_balance > balance:
+            new_balance = 0
+        if balance < 0 and new_balance < balance:
+            new_balance = 0
+    if _checked_int256(new_balance * balance) < 0:
+        new_balance = 0
+
+    return _to_int72(new_balance)
 
 
 def balance_with_interests(
@@ -49,14 +201,96 @@ def balance_with_interests(
     delta_time_in_seconds: int,
 ) -> int:
     delta_time_in_seconds = _ensure_non_negative_delta_time(delta_time_in_seconds)
-    if balance > 0:
-        interest = calculate_interests(
-            balance, internal_interest_rate_positive_balance, delta_time_in_seconds
-        )
-    else:
-        interest = calculate_interests(
-            balance, internal_interest_rate_negative_balance, delta_time_in_seconds
+    return calculate_balance_with_interests(
+        balance,
+        0,
+        delta_time_in_seconds,
+        internal_interest_rate_positive_balance,
+        internal_interest_rate_negative_balance,
+    )
+
+
+def calculate_balances_with_interests(
+    balances: Sequence[int],
+    internal_interest_rates_positive_balance: Sequence[int],
+    internal_interest_rates_negative_balance: Sequence[int],
+    delta_times_in_seconds: Sequence[int],
+) -> List[int]:
+    """Calculate the balances with interests of many trustlines at once
+
+    The arguments are columns of equal length, the result is the same as calling `balance_with_interests`
+    for every row. The inputs are validated once for all rows. Rows whose interests are rounded down to zero
+    are returned directly and rows with a rate times duration of at most 100% per year are calculated
+    without the overflow checks, which cannot be hit for them. All other rows use `balance_with_interests`."""
+    number_of_rows = len(balances)
+    if not (
+        len(internal_interest_rates_positive_balance)
+        == len(internal_interest_rates_negative_balance)
+        == len(delta_times_in_seconds)
+        == number_of_rows
+    ):
+        raise ValueError("All columns need to have the same length")
+    if number_of_rows == 0:
+        return []
+
+    if min(balances) < MIN_BALANCE or max(balances) > MAX_BALANCE:
+        raise ValueError("Balances have to fit into a 64 bit value")
+    for interest_rates in (
+        internal_interest_rates_positive_balance,
+        internal_interest_rates_negative_balance,
+    ):
+        if (
+            min(interest_rates) < MIN_INTEREST_RATE
+            or max(interest_rates) > MAX_INTEREST_RATE
+        ):
+            raise ValueError("Interest rates have to fit into a 16 bit value")
+    if min(delta_times_in_seconds) < DELTA_TIME_MINIMAL_ALLOWED_VALUE:
+        raise ValueError("delta_time out of bounds")
+
+    new_balances = []
+    for balance, rate_positive_balance, rate_negative_balance, delta_time in zip(
+        balances,
+        internal_interest_rates_positive_balance,
+        internal_interest_rates_negative_balance,
+        delta_times_in_seconds,
+    ):
+        if balance > 0:
+            rate = rate_positive_balance
+            magnitude = balance
+        else:
+            rate = rate_negative_balance
+            magnitude = -balance
+        if rate < 0:
+            rate_times_time = -rate * delta_time
+        else:
+            rate_times_time = rate * delta_time
+
+        if rate_times_time <= 0 or magnitude * rate_times_time < _INTERESTS_DIVISOR:
+            # No interests, the first order of the taylor approximation is already zero
+            new_balances.append(balance)
+            continue
+        if rate_times_time > _INTERESTS_DIVISOR:
+            new_balances.append(
+                balance_with_interests(
+                    balance, rate_positive_balance, rate_negative_balance, delta_time
+                )
+            )
+            continue
+
+        # The orders decrease in magnitude, so that nothing can overflow
+        interests = _calculate_taylor_interests(
+            balance, rate * delta_time, _ORDER_DIVISORS
         )
-    total = balance + interest
-    assert isinstance(total, int)
-    return total
+        new_balance = balance + interests
+
+        if rate > 0:
+            new_balance = min(max(new_balance, MIN_BALANCE), MAX_BALANCE)
+        elif balance > 0 and new_balance > balance:
+            new_balance = 0
+        elif balance < 0 and new_balance < balance:
+            new_balance = 0
+        if new_balance * balance < 0:
+            new_balance = 0
+        new_balances.append(new_balance)
+
+    return new_balances
@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SENT = "sent"
+CONFIRMED = "confirmed"
+FAILED = "failed"
+
+
+def read_json_lines(file_path: str) -> List[Dict]:
+    """Read the entries of a JSON lines file written by `append_json_lines`, empty and malformed lines are skipped.
+
+    A last line without line break was cut off by a crash while writing it. It is terminated if it is
+    a complete entry and removed otherwise, so that the next appended entry starts on a new line."""
+    entries = []
+    with open(file_path, "rb+") as file:
+        content = file.read()
+        *lines, last_line = content.split(b"\n")
+        for line in lines:
+            entry = _parse_json_line(line)
+            if entry is not None:
+                entries.append(entry)
+        if last_line:
+            entry = _parse_json_line(last_line)
+            if entry is None:
+                file.truncate(len(content) - len(last_line))
+            else:
+                file.write(b"\n")
+                entries.append(entry)
+    return entries
+
+
+def append_json_lines(
+    file_path: str, entries: Iterable[Dict], *, sync: bool = False
+) -> None:
+    """Append `entries` to a JSON lines file, with `sync` they are flushed to disk before returning"""
+    with open(file_path, "a") as file:
+        for entry in entries:
+            file.write(json.dumps(entry) + "\n")
+        if sync:
+            file.flush()
+            os.fsync(file.fileno())
+
+
+def _parse_json_line(line: bytes) -> Optional[Dict]:
+    if not line.strip():
+        return None
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+
+class MigrationJournal:
+    """Append-only JSON lines journal of the work done while migrating currency networks.
+
+    Every line is a record of the form
+    `{"network": old_network_address, "kind": kind, "key": key, "status": status, ...}`,
+    a later record for the same `(network, kind, key)` supersedes the earlier ones.
+    A migration restarted with the same journal skips the items that were already sent or confirmed
+    and only has to poll the receipts of the transactions that were in flight."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._records: Dict[Tuple[str, str, str], Dict] = {}
+        self._lock = threading.Lock()
+        if os.path.isfile(file_path):
+            self._load()
+
+    def _load(self):
+        for record in read_json_lines(self.file_path):
+            self._records[(record["network"], record["kind"], record["key"])] = record
+
+    def record(self, network: str, kind: str, key: str, status: str, **data):
+        record = {"network": network, "kind": kind, "key": key, "status": status}
+        record.update(data)
+        with self._lock:
+            append_json_lines(self.file_path, [record], sync=True)
+            self._records[(network, kind, key)] = record
+
+    def get_record(self, network: str, kind: str, key: str) -> Optional[Dict]:
+        return self._records.get((network, kind, key))
+
+    def get_status(self, network: str, kind: str, key: str) -> Optional[str]:
+        record = self.get_record(network, kind, key)
+        if record is None:
+            return None
+        return record["status"]
+
+    def is_done(self, network: str, kind: str, key: str) -> bool:
+        """Return whether the item was sent or confirmed and should not be sent again"""
+        return self.get_status(network, kind, key) in (SENT, CONFIRMED)
+
+    def in_flight_records(self, network: str) -> List[Dict]:
+        with self._lock:
+            return [
+                record
+                for (record_network, _, _), record in self._records.items()
+                if record_network == network and record["status"] == SENT
+            ]
@@ -1,7 +1,11 @@
 import collections
-import math
+import contextlib
+import functools
+import itertools
 import os
-from typing import Dict, Set, Callable
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Set, Callable, Iterable, List, Optional, Tuple, Union
 
 import click
 from deploy_tools.files import read_addresses_in_csv
@@ -11,35 +15,164 @@ from deploy_tools.transact import (
     wait_for_successful_transaction_receipts,
 )
 from eth_abi.packed import encode_abi_packed
+from hexbytes import HexBytes
 from web3 import Web3
-from web3.exceptions import BadFunctionCallOutput
+from web3.exceptions import BadFunctionCallOutput, TimeExhausted, TransactionNotFound
 
+from tldeploy.events import EventStream, sorted_events
+from tldeploy.identity_owners import IdentityOwnerResolver
 from tldeploy.interests import balance_with_interests
+from tldeploy.journal import (
+    MigrationJournal,
+    CONFIRMED,
+    FAILED,
+    SENT,
+    append_json_lines,
+    read_json_lines,
+)
 from tldeploy.load_contracts import get_contract_interface
+from tldeploy.multicall import Multicall, call_all
 
 ADDRESS_0 = "0x0000000000000000000000000000000000000000"
 
+# Upper bounds of the gas used per migrated item in batch calls, used to size the batches.
+# Derived from the gas costs of the single setters in tests/gas_values.csv (SET_ACCOUNT, SET_DEBT, SET_ONBOARDER)
+# without the base cost of a transaction, plus 5% for the loop and the decoding of the arrays of the batch setters,
+# rounded up to the thousands. They are checked against the batch entries of tests/gas_values.csv.
+TRANSACTION_BASE_GAS = 21_000
+SET_ACCOUNT_GAS_PER_ITEM = 322_000
+SET_DEBT_GAS_PER_ITEM = 288_000
+SET_ON_BOARDER_GAS_PER_ITEM = 29_000
+
 
 def get_safe_address(
     user_address, master_copy_address, proxy_factory_address, web3_source
 ):
+    identity_owner = get_identity_owner(user_address, web3_source)
+
+    safe_address = gnosis_safe_user_address(
+        master_copy_address=master_copy_address,
+        proxy_factory_address=proxy_factory_address,
+        user_address=identity_owner,
+    )
+
+    return safe_address
+
+
+def get_identity_owner(user_address, web3_source):
+    """Return the owner of `user_address` if it is an identity, otherwise `user_address`"""
     identity_interface = get_contract_interface("Identity")
 
     try:
         identity_contract = web3_source.eth.contract(
             address=user_address, abi=identity_interface["abi"]
         )
-        identity_owner = identity_contract.functions.owner().call()
+        return identity_contract.functions.owner().call()
     except BadFunctionCallOutput:
-        identity_owner = user_address
+        return user_address
 
-    safe_address = gnosis_safe_user_address(
-        master_copy_address=master_copy_address,
-        proxy_factory_address=proxy_factory_address,
-        user_address=identity_owner,
-    )
 
-    return safe_address
+class UnresolvedTransactionError(Exception):
+    """Raised when a journaled transaction is neither mined nor replaced, so that it might still be mined"""
+
+    pass
+
+
+class SafeAddressMapper:
+    """Map addresses of users to the addresses of their gnosis safes like `get_safe_address`.
+
+    Resolved addresses are cached in memory keyed by `(user, master copy, proxy factory)`.
+    If `cache_file_path` is given, they are also appended to this JSON lines file and loaded from it,
+    so that the owners of identities do not need to be queried again in subsequent runs.
+    An instance can be used as `get_migrated_user_address` of `NetworkMigrater` and `NetworkMigrationVerifier`.
+    """
+
+    def __init__(
+        self,
+        web3_source,
+        master_copy_address: str,
+        proxy_factory_address: str,
+        *,
+        cache_file_path: Optional[str] = None,
+        max_workers: int = 1,
+    ):
+        self.web3_source = web3_source
+        self.master_copy_address = master_copy_address
+        self.proxy_factory_address = proxy_factory_address
+        self.cache_file_path = cache_file_path
+        self.identity_owner_resolver = IdentityOwnerResolver(
+            web3_source, max_workers=max_workers
+        )
+        self._cache: Dict[Tuple[str, str, str], str] = {}
+        self._cache_file_lock = threading.Lock()
+        if cache_file_path is not None and os.path.isfile(cache_file_path):
+            self._load()
+
+    def __call__(self, user_address: str) -> str:
+        return self.get_safe_address(user_address)
+
+    def get_safe_address(self, user_address: str) -> str:
+        return self.get_safe_addresses([user_address])[0]
+
+    def get_safe_addresses(self, user_addresses: Iterable[str]) -> List[str]:
+        """Return the safe addresses of `user_addresses`,
+        the users not in the cache are resolved together via `IdentityOwnerResolver`"""
+        user_addresses = list(user_addresses)
+        missing_users = list(
+            dict.fromkeys(
+                user
+                for user in user_addresses
+                if self._cache_key(user) not in self._cache
+            )
+        )
+        if missing_users:
+            identity_owners = self.identity_owner_resolver.get_owners(missing_users)
+            resolved = {
+                user: gnosis_safe_user_address(
+                    master_copy_address=self.master_copy_address,
+                    proxy_factory_address=self.proxy_factory_address,
+                    user_address=identity_owner,
+                )
+                for user, identity_owner in zip(missing_users, identity_owners)
+            }
+            for user, safe_address in resolved.items():
+                self._cache[self._cache_key(user)] = safe_address
+            self._append_to_cache_file(resolved)
+        return [self._cache[self._cache_key(user)] for user in user_addresses]
+
+    def _cache_key(self, user_address: str) -> Tuple[str, str, str]:
+        return (user_address, self.master_copy_address, self.proxy_factory_address)
+
+    def _load(self):
+        for entry in read_json_lines(self.cache_file_path):
+            self._cache[
+                (entry["user"], entry["master_copy"], entry["proxy_factory"])
+            ] = entry["safe"]
+
+    def _append_to_cache_file(self, safe_addresses: Dict[str, str]):
+        if self.cache_file_path is None:
+            return
+        with self._cache_file_lock:
+            append_json_lines(
+                self.cache_file_path,
+                (
+                    {
+                        "user": user,
+                        "master_copy": self.master_copy_address,
+                        "proxy_factory": self.proxy_factory_address,
+                        "safe": safe_address,
+                    }
+                    for user, safe_address in safe_addresses.items()
+                ),
+            )
+
+
+def get_users_of_currency_network(web3, currency_network_address: str) -> List[str]:
+    currency_network = web3.eth.contract(
+        address=currency_network_address,
+        abi=get_contract_interface("CurrencyNetwork")["abi"],
+    )
+    return currency_network.functions.getUsers().call()
 
 
 def migrate_networks(
@@ -53,28 +186,73 @@ def migrate_networks(
     transaction_options_source: Dict = None,
     transaction_options_dest: Dict = None,
     private_key: bytes = None,
+    read_workers: int = 1,
+    journal_file_path: Optional[str] = None,
+    batch_gas_budget: Optional[int] = None,
+    safe_address_cache_file_path: Optional[str] = None,
+    parallel: int = 1,
 ):
-    def get_migrated_user_address(user_address):
-        return get_safe_address(
-            user_address, master_copy_address, proxy_factory_address, web3_source
-        )
+    """Migrate the old networks to the new ones read from the address files
+    With `parallel` greater than 1, up to `parallel` networks are migrated at the same time,
+    their transactions get their nonces from the same shared transaction options."""
+    journal = None
+    if journal_file_path is not None:
+        journal = MigrationJournal(journal_file_path)
+
+    safe_address_mapper = SafeAddressMapper(
+        web3_source,
+        master_copy_address,
+        proxy_factory_address,
+        cache_file_path=safe_address_cache_file_path,
+        max_workers=read_workers,
+    )
 
-    for [old_address, new_address] in read_addresses_to_migrate(
-        old_addresses_file_path, new_addresses_file_path
-    ):
+    shared_transaction_options_source = SharedTransactionOptions(
+        transaction_options_source
+    )
+    shared_transaction_options_dest = SharedTransactionOptions(transaction_options_dest)
+
+    def migrate_network(addresses):
+        old_address, new_address = addresses
         click.secho(f"Migrating {old_address} to {new_address}", fg="green")
-        NetworkMigrater(
-            web3_source,
-            web3_dest,
-            old_address,
-            new_address,
-            get_migrated_user_address,
-            transaction_options_source,
-            transaction_options_dest,
-            private_key,
-        ).migrate_network()
+        safe_address_mapper.get_safe_addresses(
+            get_users_of_currency_network(web3_source, old_address)
+        )
+        with report_failed_migration(old_address, new_address):
+            NetworkMigrater(
+                web3_source,
+                web3_dest,
+                old_address,
+                new_address,
+                safe_address_mapper,
+                shared_transaction_options_source,
+                shared_transaction_options_dest,
+                private_key,
+                read_workers=read_workers,
+                journal=journal,
+                batch_gas_budget=batch_gas_budget,
+                progress_prefix=f"{old_address}: " if parallel > 1 else "",
+            ).migrate_network()
         click.secho(f"Migration of {old_address} to {new_address} complete", fg="green")
 
+    for _ in concurrent_map(
+        migrate_network,
+        read_addresses_to_migrate(old_addresses_file_path, new_addresses_file_path),
+        max_workers=parallel,
+    ):
+        pass
+
+
+@contextlib.contextmanager
+def report_failed_migration(old_address, new_address):
+    try:
+        yield
+    except Exception as e:
+        click.secho(
+            f"Migration of {old_address} to {new_address} failed: {e!r}", fg="red"
+        )
+        raise
+
 
 def verify_networks_migrations(
     web3_source,
@@ -83,21 +261,40 @@ def verify_networks_migrations(
     new_addresses_file_path: str,
     master_copy_address: str,
     proxy_factory_address: str,
+    multicall_source_address: Optional[str] = None,
+    multicall_dest_address: Optional[str] = None,
+    safe_address_cache_file_path: Optional[str] = None,
 ):
+    safe_address_mapper = SafeAddressMapper(
+        web3_source,
+        master_copy_address,
+        proxy_factory_address,
+        cache_file_path=safe_address_cache_file_path,
+    )
+    multicall_source = None
+    if multicall_source_address is not None:
+        multicall_source = Multicall(web3_source, multicall_source_address)
+    multicall_dest = None
+    if multicall_dest_address is not None:
+        multicall_dest = Multicall(web3_dest, multicall_dest_address)
+
     for [old_address, new_address] in read_addresses_to_migrate(
         old_addresses_file_path, new_addresses_file_path
     ):
         click.secho(
             f"Verifying migration from {old_address} to {new_address}", fg="green"
         )
-
-        def get_migrated_user_address(user_address):
-            return get_safe_address(
-                user_address, master_copy_address, proxy_factory_address, web3_source
-            )
-
+        safe_address_mapper.get_safe_addresses(
+            get_users_of_currency_network(web3_source, old_address)
+        )
         NetworkMigrationVerifier(
-            web3_source, web3_dest, old_address, new_address, get_migrated_user_address
+            web3_source,
+            web3_dest,
+            old_address,
+            new_address,
+            safe_address_mapper,
+            multicall_source=multicall_source,
+            multicall_dest=multicall_dest,
         ).verify_migration()
         click.secho(
             f"Verification of migration from {old_address} to {new_address} complete",
@@ -123,6 +320,53 @@ def read_addresses_to_migrate(old_addresses_file_path, new_addresses_file_path):
     return zip(old_currency_network_addresses, new_currency_network_addresses)
 
 
+def concurrent_map(function: Callable, iterable: Iterable, *, max_workers: int):
+    """Like `map`, but calls `function` in a pool of `max_workers` threads.
+    Results are yielded in the order of `iterable`. At most `2 * max_workers` calls
+    are in flight, so a slow consumer will not have results piling up in memory.
+    With `max_workers <= 1`, this is the plain sequential `map`."""
+    if max_workers <= 1:
+        yield from map(function, iterable)
+        return
+
+    max_pending = 2 * max_workers
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: collections.deque = collections.deque()
+        for item in iterable:
+            pending.append(executor.submit(function, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class SharedTransactionOptions:
+    """Transaction options of one sender, shared by threads sending transactions at the same time.
+
+    `use()` locks the options for the calling thread and yields them. The nonce has to be increased
+    for every transaction sent while using them, e.g. via `increase_transaction_options_nonce`.
+    This way, the transactions of all threads get consecutive nonces and are sent in the order of their nonces."""
+
+    def __init__(self, transaction_options: Dict = None):
+        if transaction_options is None:
+            transaction_options = {}
+        self.transaction_options = transaction_options
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def use(self):
+        with self._lock:
+            yield self.transaction_options
+
+
+def as_shared_transaction_options(
+    transaction_options: Union[Dict, SharedTransactionOptions, None]
+) -> SharedTransactionOptions:
+    if isinstance(transaction_options, SharedTransactionOptions):
+        return transaction_options
+    return SharedTransactionOptions(transaction_options)
+
+
 class NetworkMigrationVerifier:
     def __init__(
         self,
@@ -131,7 +375,14 @@ class NetworkMigrationVerifier:
         old_currency_network_address: str,
         new_currency_network_address: str,
         get_migrated_user_address: Callable,
+        *,
+        multicall_source: Multicall = None,
+        multicall_dest: Multicall = None,
     ):
+        """
+        If `multicall_source` or `multicall_dest` are given, the state of the old or new network
+        is read in aggregated calls instead of one call per account, on boarder and debt.
+        """
         old_network_interface = get_contract_interface("CurrencyNetwork")
         self.old_network = web3_source.eth.contract(
             address=old_currency_network_address, abi=old_network_interface["abi"]
@@ -144,7 +395,10 @@ class NetworkMigrationVerifier:
         click.secho(
             f"Found {len(self.old_users)} users in the old currency network", fg="blue"
         )
+        self.old_network_events = CurrencyNetworkEventIndex(self.old_network)
         self.get_migrated_user_address = get_migrated_user_address
+        self.multicall_source = multicall_source
+        self.multicall_dest = multicall_dest
 
     def verify_migration(self):
         assert (
@@ -162,67 +416,69 @@ class NetworkMigrationVerifier:
         self.verify_owner_removed()
 
     def verify_accounts_migrated(self):
-        for user in self.old_users:
-            friends = set(self.old_network.functions.getFriends(user).call())
-            for friend in friends:
-                if not self.is_account_migrated(user, friend):
-                    self.warn_account_verification_failed(user, friend)
+        users = list(self.old_users)
+        friends_of_users = call_all(
+            [self.old_network.functions.getFriends(user) for user in users],
+            self.multicall_source,
+        )
+        account_pairs = [
+            (user, friend)
+            for user, friends in zip(users, friends_of_users)
+            for friend in set(friends)
+        ]
+        old_accounts = call_all(
+            [
+                self.old_network.functions.getAccount(user, friend)
+                for user, friend in account_pairs
+            ],
+            self.multicall_source,
+        )
+        new_accounts = call_all(
+            [
+                self.new_network.functions.getAccount(
+                    self.get_migrated_user_address(user),
+                    self.get_migrated_user_address(friend),
+                )
+                for user, friend in account_pairs
+            ],
+            self.multicall_dest,
+        )
+        for (user, friend), old_account, new_account in zip(
+            account_pairs, old_accounts, new_accounts
+        ):
+            if not is_account_state_migrated(old_account, new_account):
+                self.warn_account_verification_failed(user, friend)
         click.secho("Accounts migration verified")
 
     def is_account_migrated(self, user, friend):
-        (
-            old_credit_given,
-            old_credit_received,
-            old_interest_given,
-            old_interest_received,
-            old_is_frozen,
-            old_mtime,
-            old_balance,
-        ) = self.old_network.functions.getAccount(user, friend).call()
-        (
-            new_credit_given,
-            new_credit_received,
-            new_interest_given,
-            new_interest_received,
-            new_is_frozen,
-            new_mtime,
-            new_balance,
-        ) = self.new_network.functions.getAccount(
+        old_account = self.old_network.functions.getAccount(user, friend).call()
+        new_account = self.new_network.functions.getAccount(
             self.get_migrated_user_address(user), self.get_migrated_user_address(friend)
         ).call()
-
-        if new_mtime < old_mtime:
-            # The account was not migrated at all or modified on old network after migration
-            return False
-
-        old_balance_with_interests = balance_with_interests(
-            old_balance,
-            old_interest_given,
-            old_interest_received,
-            new_mtime - old_mtime,
-        )
-
-        # We do not verify is_frozen because old network was necessarily frozen and new network will not be
-        if (
-            old_credit_given,
-            old_credit_received,
-            old_interest_given,
-            old_interest_received,
-        ) != (
-            new_credit_given,
-            new_credit_received,
-            new_interest_given,
-            new_interest_received,
-        ) or old_balance_with_interests != new_balance:
-            return False
-        return True
+        return is_account_state_migrated(old_account, new_account)
 
     def warn_account_verification_failed(self, user, friend):
         click.secho(f"Account verification failed for {user} - {friend}", fg="red")
 
     def verify_on_boarders_migrated(self):
-        for user in self.old_users:
-            if not self.is_on_boarder_migrated(user):
+        users = list(self.old_users)
+        old_on_boarders = call_all(
+            [self.old_network.functions.onboarder(user) for user in users],
+            self.multicall_source,
+        )
+        new_on_boarders = call_all(
+            [
+                self.new_network.functions.onboarder(
+                    self.get_migrated_user_address(user)
+                )
+                for user in users
+            ],
+            self.multicall_dest,
+        )
+        for user, old_on_boarder, new_on_boarder in zip(
+            users, old_on_boarders, new_on_boarders
+        ):
+            if self.get_migrated_user_address(old_on_boarder) != new_on_boarder:
                 click.secho(f"On boarder verification failed for {user}", fg="red")
         click.secho("On boarder migration verified")
 
@@ -234,14 +490,28 @@ class NetworkMigrationVerifier:
         return self.get_migrated_user_address(old_on_boarder) == new_on_boarder
 
     def verify_debts_migrated(self):
-        debts = get_all_debts_of_currency_network(self.old_network)
-        for debtor in debts.keys():
-            for creditor in debts[debtor].keys():
-                if not self.is_debt_migrated(debts, debtor, creditor):
-                    click.secho(
-                        f"Debt verification failed for debtor {debtor} to creditor {creditor}",
-                        fg="red",
-                    )
+        debts = self.old_network_events.debts
+        debt_pairs = [
+            (debtor, creditor)
+            for debtor in debts.keys()
+            for creditor in debts[debtor].keys()
+        ]
+        new_debts = call_all(
+            [
+                self.new_network.functions.getDebt(
+                    self.get_migrated_user_address(debtor),
+                    self.get_migrated_user_address(creditor),
+                )
+                for debtor, creditor in debt_pairs
+            ],
+            self.multicall_dest,
+        )
+        for (debtor, creditor), new_debt in zip(debt_pairs, new_debts):
+            if debts[debtor][creditor] != new_debt:
+                click.secho(
+                    f"Debt verification failed for debtor {debtor} to creditor {creditor}",
+                    fg="red",
+                )
         click.secho("Debts migration verified")
 
     def is_debt_migrated(self, debts, debtor, creditor):
@@ -274,11 +544,32 @@ class NetworkMigrater(NetworkMigrationVerifier):
         old_currency_network_address: str,
         new_currency_network_address: str,
         get_migrated_user_address: Callable,
-        transaction_options_source: Dict = None,
-        transaction_options_dest: Dict = None,
+        transaction_options_source: Union[Dict, SharedTransactionOptions] = None,
+        transaction_options_dest: Union[Dict, SharedTransactionOptions] = None,
         private_key: bytes = None,
         max_tx_queue_size=10,
+        read_workers=1,
+        journal: MigrationJournal = None,
+        receipt_timeout=120,
+        batch_gas_budget: Optional[int] = None,
+        progress_prefix: str = "",
     ):
+        """
+        The transaction options can be `SharedTransactionOptions` to migrate multiple networks
+        at the same time with the same sender.
+
+        `read_workers` is the number of threads used to read accounts from the source chain
+        while the transactions setting them are sent on the destination chain.
+        The transactions are still sent one after the other from the calling thread.
+
+        If a `journal` is given, every sent transaction and its confirmation is recorded in it.
+        Items found in the journal are not migrated again, and transactions that were in flight
+        are waited for up to `receipt_timeout` seconds and sent again if they failed or did not get mined.
+
+        If a `batch_gas_budget` is given, accounts, on boarders and debts are migrated with the batch functions
+        `setAccounts`, `setOnboarders` and `setDebts` of the new network, with as many items per transaction
+        as fit in the budget.
+        """
         super().__init__(
             web3_source,
             web3_dest,
@@ -295,21 +586,38 @@ class NetworkMigrater(NetworkMigrationVerifier):
                     private_key=private_key
                 ).address
 
-        self.transaction_options_source = transaction_options_source
-        self.transaction_options_dest = transaction_options_dest
-        if transaction_options_source is None:
-            self.transaction_options_source = {}
-        if transaction_options_dest is None:
-            self.transaction_options_dest = {}
+        self.shared_transaction_options_source = as_shared_transaction_options(
+            transaction_options_source
+        )
+        self.shared_transaction_options_dest = as_shared_transaction_options(
+            transaction_options_dest
+        )
+        self.transaction_options_source = (
+            self.shared_transaction_options_source.transaction_options
+        )
+        self.transaction_options_dest = (
+            self.shared_transaction_options_dest.transaction_options
+        )
 
         self.private_key = private_key
         self.max_tx_queue_size = max_tx_queue_size
+        self.read_workers = read_workers
         self.tx_queue_source: Set[str] = set()
         self.tx_queue_dest: Set[str] = set()
+        self.journal = journal
+        self.receipt_timeout = receipt_timeout
+        self.batch_gas_budget = batch_gas_budget
+        self.tx_journal_entries: Dict[str, List[Tuple[str, str, str]]] = {}
+        self.progress_prefix = progress_prefix
+
+    def report_progress(self, message: str):
+        click.secho(self.progress_prefix + message)
 
     def migrate_network(self):
+        self.resume_in_flight_transactions()
         assert (
-            self.new_network.functions.isNetworkFrozen().call()
+            self.is_journaled("unfreeze")
+            or self.new_network.functions.isNetworkFrozen().call()
         ), "New contract not frozen"
         assert (
             self.old_network.functions.name().call()
@@ -324,64 +632,121 @@ class NetworkMigrater(NetworkMigrationVerifier):
         self.remove_owner()
 
     def migrate_accounts(self):
-        click.secho("Accounts migration")
-        for user in self.old_users:
-            friends = set(self.old_network.functions.getFriends(user).call())
-            for friend in friends:
-                if user < friend:
-                    # For each (user, friend) pair we only need to migrate the account once
-                    # We arbitrarily decide not to migrate in the case user < friend
-                    continue
-                if self.is_account_migrated(user, friend):
-                    continue
-                (
-                    creditline_ab,
-                    creditline_ba,
-                    interest_ab,
-                    interest_ba,
-                    is_frozen,
-                    mtime,
-                    balance_ab,
-                ) = self.old_network.functions.getAccount(user, friend).call()
-
-                # the value of is_frozen we get from `getAccount` on a frozen network is always true, so not correct.
-                is_frozen = get_last_frozen_status_of_account(
-                    self.old_network, user, friend
-                )
-
-                set_account_call = self.new_network.functions.setAccount(
-                    self.get_migrated_user_address(user),
-                    self.get_migrated_user_address(friend),
-                    creditline_ab,
-                    creditline_ba,
-                    interest_ab,
-                    interest_ba,
-                    is_frozen,
-                    mtime,
-                    balance_ab,
-                )
-                self.call_contract_function_with_tx(set_account_call)
+        self.report_progress("Accounts migration")
+        account_pairs = itertools.chain.from_iterable(
+            concurrent_map(
+                self.get_account_pairs_of_user,
+                self.old_users,
+                max_workers=self.read_workers,
+            )
+        )
+        account_pairs = (
+            account_pair
+            for account_pair in account_pairs
+            if not self.is_journaled("account", account_journal_key(*account_pair))
+        )
+        set_account_calls = concurrent_map(
+            lambda account_pair: (
+                account_pair,
+                self.prepare_set_account_call(account_pair),
+            ),
+            account_pairs,
+            max_workers=self.read_workers,
+        )
+        self.call_contract_functions_batched(
+            (
+                (set_account_call, ("account", account_journal_key(*account_pair)))
+                for account_pair, set_account_call in set_account_calls
+                if set_account_call is not None
+            ),
+            make_batch_call=lambda args: self.new_network.functions.setAccounts(args),
+            gas_per_item=SET_ACCOUNT_GAS_PER_ITEM,
+        )
         self.wait_for_successfull_txs_in_queue()
-        click.secho("Accounts migration complete")
+        self.report_progress("Accounts migration complete")
+
+    def get_account_pairs_of_user(self, user):
+        friends = set(self.old_network.functions.getFriends(user).call())
+        # For each (user, friend) pair we only need to migrate the account once
+        # We arbitrarily decide not to migrate in the case user < friend
+        return [(user, friend) for friend in friends if user >= friend]
+
+    def prepare_set_account_call(self, account_pair):
+        """Read everything needed to migrate the account from the source chain
+        Returns the `setAccount` function call, or None if the account is already migrated"""
+        user, friend = account_pair
+        if self.is_account_migrated(user, friend):
+            return None
+        (
+            creditline_ab,
+            creditline_ba,
+            interest_ab,
+            interest_ba,
+            is_frozen,
+            mtime,
+            balance_ab,
+        ) = self.old_network.functions.getAccount(user, friend).call()
+
+        # the value of is_frozen we get from `getAccount` on a frozen network is always true, so not correct.
+        is_frozen = self.old_network_events.get_last_frozen_status_of_account(
+            user, friend
+        )
+
+        return self.new_network.functions.setAccount(
+            self.get_migrated_user_address(user),
+            self.get_migrated_user_address(friend),
+            creditline_ab,
+            creditline_ba,
+            interest_ab,
+            interest_ba,
+            is_frozen,
+            mtime,
+            balance_ab,
+        )
 
     def migrate_on_boarders(self):
-        click.secho("On boarders migration")
+        self.report_progress("On boarders migration")
+        self.call_contract_functions_batched(
+            self.get_set_on_boarder_calls(),
+            make_batch_call=lambda args: self.new_network.functions.setOnboarders(
+                *transpose(args)
+            ),
+            gas_per_item=SET_ON_BOARDER_GAS_PER_ITEM,
+        )
+        self.wait_for_successfull_txs_in_queue()
+        self.report_progress("On boarders migration complete")
+
+    def get_set_on_boarder_calls(self):
         for user in self.old_users:
+            if self.is_journaled("onboarder", user):
+                continue
             if not self.is_on_boarder_migrated(user):
                 on_boarder = self.old_network.functions.onboarder(user).call()
                 set_on_boarder_call = self.new_network.functions.setOnboarder(
                     self.get_migrated_user_address(user),
                     self.get_migrated_user_address(on_boarder),
                 )
-                self.call_contract_function_with_tx(set_on_boarder_call)
-        self.wait_for_successfull_txs_in_queue()
-        click.secho("On boarders migration complete")
+                yield set_on_boarder_call, ("onboarder", user)
 
     def migrate_debts(self):
-        click.secho("Debts migration")
-        debts = get_all_debts_of_currency_network(self.old_network)
+        self.report_progress("Debts migration")
+        self.call_contract_functions_batched(
+            self.get_set_debt_calls(),
+            make_batch_call=lambda args: self.new_network.functions.setDebts(
+                *transpose(args)
+            ),
+            gas_per_item=SET_DEBT_GAS_PER_ITEM,
+        )
+        self.wait_for_successfull_txs_in_queue()
+        self.report_progress("Debts migration complete")
+
+    def get_set_debt_calls(self):
+        debts = self.old_network_events.debts
         for debtor in debts.keys():
             for creditor in debts[debtor].keys():
+                debt_journal_key = account_journal_key(debtor, creditor)
+                if self.is_journaled("debt", debt_journal_key):
+                    continue
                 # Migrating the debt via migrating the user address might not make sense
                 # if one debtor was a delegate and not an identity owner
                 set_debt_call = self.new_network.functions.setDebt(
@@ -389,15 +754,18 @@ class NetworkMigrater(NetworkMigrationVerifier):
                     self.get_migrated_user_address(creditor),
                     debts[debtor][creditor],
                 )
-                self.call_contract_function_with_tx(set_debt_call)
-        self.wait_for_successfull_txs_in_queue()
-        click.secho("Debts migration complete")
+                yield set_debt_call, ("debt", debt_journal_key)
 
     def migrate_trustline_update_requests(self):
-        click.secho("Trustline requests migration")
-        request_events = get_pending_trustline_update_requests(self.old_network)
+        self.report_progress("Trustline requests migration")
+        request_events = self.old_network_events.pending_trustline_update_requests()
         for request_event in request_events:
             event_args = request_event["args"]
+            request_journal_key = account_journal_key(
+                event_args["_creditor"], event_args["_debtor"]
+            )
+            if self.is_journaled("trustline_request", request_journal_key):
+                continue
             set_trustline_request_call = self.new_network.functions.setTrustlineRequest(
                 self.get_migrated_user_address(event_args["_creditor"]),
                 self.get_migrated_user_address(event_args["_debtor"]),
@@ -407,37 +775,168 @@ class NetworkMigrater(NetworkMigrationVerifier):
                 event_args["_interestRateReceived"],
                 event_args["_isFrozen"],
             )
-            self.call_contract_function_with_tx(set_trustline_request_call)
+            self.call_contract_function_with_tx(
+                set_trustline_request_call,
+                journal_entries=[("trustline_request", request_journal_key)],
+            )
 
         self.wait_for_successfull_txs_in_queue()
-        click.secho("Trustline requests migration complete")
+        self.report_progress("Trustline requests migration complete")
 
     def unfreeze_network(self):
+        if self.is_journaled("unfreeze"):
+            return
         unfreeze_call = self.new_network.functions.unfreezeNetwork()
-        self.call_contract_function_with_tx(unfreeze_call)
+        self.call_contract_function_with_tx(
+            unfreeze_call, journal_entries=[("unfreeze", "")]
+        )
         self.wait_for_successfull_txs_in_queue()
 
     def remove_owner(self):
+        if self.is_journaled("remove_owner"):
+            return
         remove_owner_call = self.new_network.functions.removeOwner()
-        self.call_contract_function_with_tx(remove_owner_call)
+        self.call_contract_function_with_tx(
+            remove_owner_call, journal_entries=[("remove_owner", "")]
+        )
         self.wait_for_successfull_txs_in_queue()
 
-    def call_contract_function_with_tx(self, function_call):
+    def is_journaled(self, kind: str, key: str = ""):
+        """Return whether the journal says the item was already sent and does not need to be migrated again"""
+        return self.journal is not None and self.journal.is_done(
+            self.old_network.address, kind, key
+        )
+
+    def resume_in_flight_transactions(self):
+        """Wait for the transactions the journal lists as sent but not yet confirmed,
+        items whose transaction failed or can no longer be mined will be migrated again.
+
+        A transaction that is not mined within `receipt_timeout` could still be mined later.
+        Setting debts adds to the existing debt, so its items must not be sent again. If its nonce was not
+        used up by another transaction, it stays sent in the journal and `UnresolvedTransactionError` is raised,
+        so that the migration can be resumed once the transaction is mined or replaced."""
+        if self.journal is None:
+            return
+        in_flight_records = self.journal.in_flight_records(self.old_network.address)
+        if in_flight_records:
+            self.report_progress(
+                f"Waiting for {len(in_flight_records)} transactions in flight from journal"
+            )
+        unresolved_tx_hashes = set()
+        for record in in_flight_records:
+            web3 = self.web3_dest if record["chain"] == "dest" else self.web3_source
+            try:
+                receipt = web3.eth.waitForTransactionReceipt(
+                    record["tx_hash"], timeout=self.receipt_timeout
+                )
+            except TimeExhausted:
+                if not _is_transaction_replaced(web3, record):
+                    unresolved_tx_hashes.add(record["tx_hash"])
+                    continue
+                status = FAILED
+            else:
+                status = CONFIRMED if receipt["status"] == 1 else FAILED
+            self.journal.record(
+                record["network"],
+                record["kind"],
+                record["key"],
+                status,
+                tx_hash=record["tx_hash"],
+                chain=record["chain"],
+                **_get_nonce_data(record),
+            )
+        if unresolved_tx_hashes:
+            raise UnresolvedTransactionError(
+                f"The transactions {', '.join(sorted(unresolved_tx_hashes))} are not mined yet but might still be, "
+                "resume the migration once they are mined or replaced."
+            )
+
+    def call_contract_functions_batched(
+        self,
+        function_calls_and_journal_entries: Iterable,
+        *,
+        make_batch_call: Callable,
+        gas_per_item: int,
+    ):
+        """Send the `(function_call, journal_entry)` pairs of `function_calls_and_journal_entries`
+        Without `batch_gas_budget` every function call is sent in its own transaction,
+        otherwise consecutive function calls are merged into one call made by `make_batch_call`
+        from the list of their arguments."""
+        batch_size = 1
+        if self.batch_gas_budget is not None:
+            batch_size = max(
+                1, (self.batch_gas_budget - TRANSACTION_BASE_GAS) // gas_per_item
+            )
+
+        batch: List = []
+        for function_call, journal_entry in function_calls_and_journal_entries:
+            batch.append((function_call, journal_entry))
+            if len(batch) >= batch_size:
+                self._call_batch_with_tx(batch, make_batch_call)
+                batch = []
+        self._call_batch_with_tx(batch, make_batch_call)
+
+    def _call_batch_with_tx(self, batch, make_batch_call):
+        if len(batch) == 0:
+            return
+        if len(batch) == 1:
+            function_call = batch[0][0]
+        else:
+            function_call = make_batch_call(
+                [function_call.args for function_call, _ in batch]
+            )
+        self.call_contract_function_with_tx(
+            function_call,
+            journal_entries=[journal_entry for _, journal_entry in batch],
+        )
+
+    def call_contract_function_with_tx(
+        self, function_call, journal_entries: Iterable[Tuple[str, str]] = ()
+    ):
         web3 = function_call.web3
-        tx_options = self.transaction_options_source
+        shared_tx_options = self.shared_transaction_options_source
         tx_queue = self.tx_queue_source
         if web3 == self.web3_dest:
-            tx_options = self.transaction_options_dest
+            shared_tx_options = self.shared_transaction_options_dest
             tx_queue = self.tx_queue_dest
 
-        tx_hash = send_function_call_transaction(
-            function_call,
-            web3=function_call.web3,
-            transaction_options=tx_options,
-            private_key=self.private_key,
-        )
-        increase_transaction_options_nonce(tx_options)
+        with shared_tx_options.use() as tx_options:
+            # The nonce is set explicitly, so that it can be journaled
+            # to tell whether the transaction was replaced when resuming, see `_is_transaction_replaced`
+            if self.private_key is not None:
+                sender = web3.eth.account.from_key(self.private_key).address
+            else:
+                sender = tx_options.setdefault(
+                    "from", web3.eth.default_account or web3.eth.accounts[0]
+                )
+            if "nonce" not in tx_options:
+                tx_options["nonce"] = web3.eth.getTransactionCount(sender, "pending")
+            nonce = tx_options["nonce"]
+            tx_hash = send_function_call_transaction(
+                function_call,
+                web3=function_call.web3,
+                transaction_options=tx_options,
+                private_key=self.private_key,
+            )
+            increase_transaction_options_nonce(tx_options)
         tx_queue.add(tx_hash)
+        if self.journal is not None:
+            chain = "dest" if web3 == self.web3_dest else "source"
+            tx_hash_hex = HexBytes(tx_hash).hex()
+            for kind, key in journal_entries:
+                self.journal.record(
+                    self.old_network.address,
+                    kind,
+                    key,
+                    SENT,
+                    tx_hash=tx_hash_hex,
+                    chain=chain,
+                    nonce=nonce,
+                    sender=sender,
+                )
+                self.tx_journal_entries.setdefault(tx_hash_hex, []).append(
+                    (kind, key, chain)
+                )
 
         if (
             len(self.tx_queue_source) + len(self.tx_queue_dest)
@@ -450,6 +949,66 @@ class NetworkMigrater(NetworkMigrationVerifier):
         wait_for_successful_transaction_receipts(self.web3_dest, self.tx_queue_dest)
         self.tx_queue_source = set()
         self.tx_queue_dest = set()
+        for tx_hash, journal_entries in self.tx_journal_entries.items():
+            for kind, key, chain in journal_entries:
+                self.journal.record(
+                    self.old_network.address,
+                    kind,
+                    key,
+                    CONFIRMED,
+                    tx_hash=tx_hash,
+                    chain=chain,
+                )
+        self.tx_journal_entries = {}
+
+
+def is_account_state_migrated(old_account, new_account):
+    """Return whether `new_account` is `old_account` migrated,
+    both as returned by `getAccount` of the old and the new currency network"""
+    (
+        old_credit_given,
+        old_credit_received,
+        old_interest_given,
+        old_interest_received,
+        old_is_frozen,
+        old_mtime,
+        old_balance,
+    ) = old_account
+    (
+        new_credit_given,
+        new_credit_received,
+        new_interest_given,
+        new_interest_received,
+        new_is_frozen,
+        new_mtime,
+        new_balance,
+    ) = new_account
+
+    if new_mtime < old_mtime:
+        # The account was not migrated at all or modified on old network after migration
+        return False
+
+    old_balance_with_interests = balance_with_interests(
+        old_balance,
+        old_interest_given,
+        old_interest_received,
+        new_mtime - old_mtime,
+    )
+
+    # We do not verify is_frozen because old network was necessarily frozen and new network will not be
+    if (
+        old_credit_given,
+        old_credit_received,
+        old_interest_given,
+        old_interest_received,
+    ) != (
+        new_credit_given,
+        new_credit_received,
+        new_interest_given,
+        new_interest_received,
+    ) or old_balance_with_interests != new_balance:
+        return False
+    return True
 
 
 def get_last_frozen_status_of_account(currency_network, user, friend):
@@ -463,13 +1022,16 @@ def get_last_frozen_status_of_account(currency_network, user, friend):
 
 
 def get_last_trustline_update_event(currency_network, user, friend):
-    trustline_updates_from_user = currency_network.events.TrustlineUpdate().getLogs(
-        fromBlock=0, argument_filters={"_creditor": user, "_debtor": friend}
+    trustline_update = currency_network.events.TrustlineUpdate
+    trustline_updates_from_user = EventStream(
+        [trustline_update], argument_filters={"_creditor": user, "_debtor": friend}
+    )
+    trustline_updates_from_friend = EventStream(
+        [trustline_update], argument_filters={"_creditor": friend, "_debtor": user}
     )
-    trustline_updates_from_friend = currency_network.events.TrustlineUpdate().getLogs(
-        fromBlock=0, argument_filters={"_creditor": friend, "_debtor": user}
+    all_trustline_updates = list(trustline_updates_from_user) + list(
+        trustline_updates_from_friend
     )
-    all_trustline_updates = trustline_updates_from_user + trustline_updates_from_friend
     sorted_trustline_updates = sorted_events(all_trustline_updates)
 
     assert (
@@ -479,73 +1041,98 @@ def get_last_trustline_update_event(currency_network, user, friend):
     return sorted_trustline_updates[len(sorted_trustline_updates) - 1]
 
 
-def sorted_events(events, reverse=False):
-    def log_index_key(event):
-        if event.get("logIndex") is None:
-            raise RuntimeError("No log index, events cannot be ordered truthfully.")
-        return event.get("logIndex")
-
-    def block_number_key(event):
-        if event.get("blockNumber") is None:
-            return math.inf
-        return event.get("blockNumber")
-
-    return sorted(
-        events,
-        key=lambda event: (block_number_key(event), log_index_key(event)),
-        reverse=reverse,
-    )
-
-
 def get_all_debts_of_currency_network(currency_network):
     # We have to use events to retrieve the debts
     # We cannot use `users` of the currency network as some non users could have set a debt
-    all_debt_updates = currency_network.events.DebtUpdate().getLogs(fromBlock=0)
-    debts = collections.defaultdict(lambda: {})
-
-    for debt_update in all_debt_updates:
-        creditor = debt_update["args"]["_creditor"]
-        debtor = debt_update["args"]["_debtor"]
-        value = debt_update["args"]["_newDebt"]
-
-        if creditor < debtor:
-            debts[debtor][creditor] = value
-        else:
-            debts[creditor][debtor] = -value
-
-    return debts
+    return CurrencyNetworkEventIndex(currency_network).debts
 
 
 def get_pending_trustline_update_requests(currency_network):
-    all_requests = currency_network.events.TrustlineUpdateRequest().getLogs(fromBlock=0)
-    # we need to delete trustline requests that have been canceled
-    all_cancel = currency_network.events.TrustlineUpdateCancel().getLogs(fromBlock=0)
-    # we need to delete trustline requests that have been accepted and resulted in a trustline update
-    all_updates = currency_network.events.TrustlineUpdate().getLogs(fromBlock=0)
-
-    all_events = all_requests + all_cancel + all_updates
-    all_events = sorted_events(all_events)
-
-    latest_trustline_updates = dict()
-
-    for event in all_events:
-        if event.get("event") == "TrustlineUpdateRequest":
-            uid = unique_id(event["args"]["_creditor"], event["args"]["_debtor"])
-            latest_trustline_updates[uid] = event
-        elif event.get("event") == "TrustlineUpdateCancel":
-            uid = unique_id(event["args"]["_initiator"], event["args"]["_counterparty"])
-            del latest_trustline_updates[uid]
-        elif event.get("event") == "TrustlineUpdate":
-            uid = unique_id(event["args"]["_creditor"], event["args"]["_debtor"])
-            if uid in latest_trustline_updates.keys():
-                del latest_trustline_updates[uid]
+    return CurrencyNetworkEventIndex(
+        currency_network
+    ).pending_trustline_update_requests()
+
+
+class CurrencyNetworkEventIndex:
+    """Index of the trustline and debt events of a currency network.
+    All `TrustlineUpdate`, `TrustlineUpdateRequest`, `TrustlineUpdateCancel` and `DebtUpdate` events
+    are streamed once via `EventStream` and replayed in order
+    so that questions about the state derived from events can be answered without further queries."""
+
+    indexed_event_names = [
+        "TrustlineUpdate",
+        "TrustlineUpdateRequest",
+        "TrustlineUpdateCancel",
+        "DebtUpdate",
+    ]
+
+    def __init__(self, currency_network, **event_stream_kwargs):
+        """`event_stream_kwargs` are passed to `EventStream`, e.g. to bound the indexed blocks"""
+        self.currency_network = currency_network
+
+        self.debts = collections.defaultdict(lambda: {})
+        self._last_trustline_updates: Dict[str, Any] = {}
+        self._pending_trustline_update_requests: Dict[str, Any] = {}
+
+        events = EventStream(
+            [
+                currency_network.events[event_name]
+                for event_name in self.indexed_event_names
+            ],
+            **event_stream_kwargs,
+        )
+        for event in events:
+            self._index_event(event)
+
+    def _index_event(self, event):
+        event_name = event.get("event")
+        args = event["args"]
+        if event_name == "TrustlineUpdate":
+            uid = unique_id(args["_creditor"], args["_debtor"])
+            self._last_trustline_updates[uid] = event
+            # we need to delete trustline requests that have been accepted and resulted in a trustline update
+            self._pending_trustline_update_requests.pop(uid, None)
+        elif event_name == "TrustlineUpdateRequest":
+            uid = unique_id(args["_creditor"], args["_debtor"])
+            self._pending_trustline_update_requests[uid] = event
+        elif event_name == "TrustlineUpdateCancel":
+            uid = unique_id(args["_initiator"], args["_counterparty"])
+            self._pending_trustline_update_requests.pop(uid, None)
+        elif event_name == "DebtUpdate":
+            creditor = args["_creditor"]
+            debtor = args["_debtor"]
+            value = args["_newDebt"]
+            if creditor < debtor:
+                self.debts[debtor][creditor] = value
+            else:
+                self.debts[creditor][debtor] = -value
         else:
             raise RuntimeError(
-                f"Expected event of type TrustlineUpdateRequest, TrustlineUpdateCancel, or TrustlineUpdate, "
-                f"got: {event}"
+                f"Expected event of type {', '.join(self.indexed_event_names)}, got: {event}"
             )
 
-    return list(latest_trustline_updates.values())
+    def get_last_trustline_update_event(self, user, friend):
+        last_event = self._last_trustline_updates.get(unique_id(user, friend))
+        assert (
+            last_event is not None
+        ), f"Did not find any trustline update in between {user} and {friend}"
+        return last_event
+
+    def get_last_frozen_status_of_account(self, user, friend):
+        """See `get_last_frozen_status_of_account`"""
+        return self.get_last_trustline_update_event(user, friend)["args"]["_isFrozen"]
+
+    def pending_trustline_update_requests(self):
+        return list(self._pending_trustline_update_requests.values())
+
+
+def transpose(rows):
+    """Turn a list of argument tuples into one list per argument, as taken by the batch functions"""
+    return [list(column) for column in zip(*rows)]
+
+
+def account_journal_key(user_1: str, user_2: str):
+    return f"{user_1}-{user_2}"
 
 
 def unique_id(user_1: str, user_2: str):
@@ -555,16 +1142,28 @@ def unique_id(user_1: str, user_2: str):
         return user_2 + user_1
 
 
+GNOSIS_SAFE_PROXY_CREATION_CODE = bytes.fromhex(
+    "608060405234801561001057600080fd5b506040516101e63803806101e68339818101604052602081101561003357600080fd5b8101908080519060200190929190505050600073ffffffffffffffffffffffffffffffffffffffff168173ffffffffffffffffffffffffffffffffffffffff1614156100ca576040517f08c379a00000000000000000000000000000000000000000000000000000000081526004018080602001828103825260228152602001806101c46022913960400191505060405180910390fd5b806000806101000a81548173ffffffffffffffffffffffffffffffffffffffff021916908373ffffffffffffffffffffffffffffffffffffffff1602179055505060ab806101196000396000f3fe608060405273ffffffffffffffffffffffffffffffffffffffff600054167fa619486e0000000000000000000000000000000000000000000000000000000060003514156050578060005260206000f35b3660008037600080366000845af43d6000803e60008114156070573d6000fd5b3d6000f3fea2646970667358221220d1429297349653a4918076d650332de1a1068c5f3e07c5c82360c277770b955264736f6c63430007060033496e76616c69642073696e676c65746f6e20616464726573732070726f7669646564"  # noqa: E501
+)
+
+
+@functools.lru_cache(maxsize=None)
+def hashed_safe_deployment_data(master_copy_address):
+    """Return the hash of the creation code of safe proxies for `master_copy_address`,
+    it is the same for all users"""
+    deployment_data = encode_abi_packed(
+        ["bytes", "uint256"],
+        [GNOSIS_SAFE_PROXY_CREATION_CODE, int(master_copy_address, 16)],
+    )
+    return Web3.solidityKeccak(["bytes"], [deployment_data])
+
+
 def gnosis_safe_user_address(
     master_copy_address,
     proxy_factory_address,
     user_address,
     salt_nonce=0,
 ):
-    proxy_creation_code = bytearray.fromhex(
-        "608060405234801561001057600080fd5b506040516101e63803806101e68339818101604052602081101561003357600080fd5b8101908080519060200190929190505050600073ffffffffffffffffffffffffffffffffffffffff168173ffffffffffffffffffffffffffffffffffffffff1614156100ca576040517f08c379a00000000000000000000000000000000000000000000000000000000081526004018080602001828103825260228152602001806101c46022913960400191505060405180910390fd5b806000806101000a81548173ffffffffffffffffffffffffffffffffffffffff021916908373ffffffffffffffffffffffffffffffffffffffff1602179055505060ab806101196000396000f3fe608060405273ffffffffffffffffffffffffffffffffffffffff600054167fa619486e0000000000000000000000000000000000000000000000000000000060003514156050578060005260206000f35b3660008037600080366000845af43d6000803e60008114156070573d6000fd5b3d6000f3fea2646970667358221220d1429297349653a4918076d650332de1a1068c5f3e07c5c82360c277770b955264736f6c63430007060033496e76616c69642073696e676c65746f6e20616464726573732070726f7669646564"  # noqa: E501
-    )
-
     # safe setup selector
     # owners offset = 9th element
     # threshold = 1
@@ -598,16 +1197,46 @@ def gnosis_safe_user_address(
     to_hash = [Web3.solidityKeccak(["bytes"], [safe_setup_data]), salt_nonce]
     salt = Web3.solidityKeccak(abi_types, to_hash)
 
-    deployment_data = encode_abi_packed(
-        ["bytes", "uint256"],
-        [proxy_creation_code, int(master_copy_address, 16)],
+    return build_create2_address_from_hashed_bytecode(
+        proxy_factory_address, hashed_safe_deployment_data(master_copy_address), salt
     )
-    return build_create2_address(proxy_factory_address, deployment_data, salt)
 
 
 def build_create2_address(deployer_address, bytecode, salt="0x" + "00" * 32):
     hashed_bytecode = Web3.solidityKeccak(["bytes"], [bytecode])
+    return build_create2_address_from_hashed_bytecode(
+        deployer_address, hashed_bytecode, salt
+    )
+
+
+def build_create2_address_from_hashed_bytecode(
+    deployer_address, hashed_bytecode, salt="0x" + "00" * 32
+):
     to_hash = ["0xff", deployer_address, salt, hashed_bytecode]
     abi_types = ["bytes1", "address", "bytes32", "bytes32"]
 
     return Web3.toChecksumAddress(Web3.solidityKeccak(abi_types, to_hash)[12:])
+
+
+def _get_nonce_data(journal_record: Dict) -> Dict:
+    return {
+        key: journal_record[key]
+        for key in ("nonce", "sender")
+        if journal_record.get(key) is not None
+    }
+
+
+def _is_transaction_replaced(web3, journal_record: Dict) -> bool:
+    """Return whether the journaled transaction without receipt can never be mined,
+    because another transaction of its sender with the same nonce was mined"""
+    try:
+        transaction = web3.eth.getTransaction(journal_record["tx_hash"])
+    except TransactionNotFound:
+        nonce_data = _get_nonce_data(journal_record)
+        if len(nonce_data) < 2:
+            # Without the nonce, we cannot tell whether another node might still mine it
+            return False
+        sender, nonce = nonce_data["sender"], nonce_data["nonce"]
+    else:
+        sender, nonce = transaction["from"], transaction["nonce"]
+    return web3.eth.getTransactionCount(sender, "latest") > nonce
@@ -0,0 +1,69 @@
+from typing import List, Sequence
+
+from eth_utils import to_checksum_address
+from web3 import Web3
+from web3._utils.abi import get_abi_output_types, map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+
+from tldeploy.load_contracts import get_contract_interface
+
+DEFAULT_MAX_CALLS_PER_REQUEST = 500
+
+
+class Multicall:
+    """Make many view calls in one `eth_call` via a deployed `Multicall` contract.
+    The results are decoded like the results of `function_call.call()`."""
+
+    def __init__(
+        self,
+        web3: Web3,
+        address: str,
+        *,
+        max_calls_per_request: int = DEFAULT_MAX_CALLS_PER_REQUEST,
+    ):
+        if max_calls_per_request < 1:
+            raise ValueError(
+                f"max_calls_per_request must be positive, got: {max_calls_per_request}"
+            )
+        self.web3 = web3
+        self.contract = web3.eth.contract(
+            address=to_checksum_address(address),
+            abi=get_contract_interface("Multicall")["abi"],
+        )
+        self.max_calls_per_request = max_calls_per_request
+
+    def call(self, function_calls: Sequence) -> List:
+        """Return the results of the contract function calls `function_calls`,
+        split into chunks of at most `max_calls_per_request` calls per `eth_call`"""
+        results: List = []
+        for start in range(0, len(function_calls), self.max_calls_per_request):
+            end = start + self.max_calls_per_request
+            chunk = function_calls[start:end]
+            _, return_data = self.contract.functions.aggregate(
+                [
+                    (function_call.address, function_call._encode_transaction_data())
+                    for function_call in chunk
+                ]
+            ).call()
+            results.extend(
+                decode_function_call_output(function_call, data)
+                for function_call, data in zip(chunk, return_data)
+            )
+        return results
+
+
+def decode_function_call_output(function_call, data: bytes):
+    output_types = get_abi_output_types(function_call.abi)
+    decoded = function_call.web3.codec.decode_abi(output_types, data)
+    normalized = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, decoded)
+    if len(normalized) == 1:
+        return normalized[0]
+    return normalized
+
+
+def call_all(function_calls: Sequence, multicall: Multicall = None) -> List:
+    """Return the results of `function_calls`, using `multicall` if given,
+    otherwise with one `eth_call` per function call"""
+    if multicall is None:
+        return [function_call.call() for function_call in function_calls]
+    return multicall.call(function_calls)
@@ -0,0 +1,390 @@
+# This file provides functions to find paths for transfers over the off-chain model of a currency network
+import heapq
+import itertools
+from array import array
+from typing import Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+import attr
+
+from tldeploy.interests import calculate_balance_with_interests
+from tldeploy.simulation import (
+    MAX_UINT_64,
+    CurrencyNetworkSimulator,
+    TransferFailed,
+    calculate_fees,
+    calculate_fees_reverse,
+    calculate_imbalance_generated,
+)
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class PaymentPath:
+    # The value received by the receiver if the sender pays, the value sent by the sender if the receiver pays
+    value: int
+    fees: int
+    path: List[str]
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class _Candidate:
+    payment_path: PaymentPath
+    # The slots of the trustlines of the path in the adjacency arrays of the path finder
+    slots: List[int]
+
+
+DEFAULT_MAX_CANDIDATE_PATHS = 20
+
+
+class PathFinder:
+    """Find the cheapest paths for transfers over the trustlines of a `CurrencyNetworkSimulator`.
+
+    The trustlines are loaded once into adjacency arrays with the balances including the interests at `timestamp`.
+    Paths respect the capacities given by the creditlines, the fees of the network and the maximal fees,
+    frozen trustlines are not used. The prevent mediator interests rule depends on the whole path and is not
+    part of the search. If the network uses it and the cheapest path breaks it, the next candidate paths are
+    searched, see `max_candidate_paths`, so that the cheapest path might be missed if there are many candidates.
+    The path finder does not see later changes of the simulator."""
+
+    def __init__(
+        self,
+        simulator: CurrencyNetworkSimulator,
+        timestamp: int,
+        *,
+        max_candidate_paths: int = DEFAULT_MAX_CANDIDATE_PATHS,
+    ):
+        self.simulator = simulator
+        self.timestamp = timestamp
+        self.max_candidate_paths = max_candidate_paths
+        self.capacity_imbalance_fee_divisor = simulator.capacity_imbalance_fee_divisor
+
+        self.users = simulator.get_users()
+        self._user_indices: Dict[str, int] = {
+            user: index for index, user in enumerate(self.users)
+        }
+        # The trustlines of user `i` from its view are at the indices `offsets[i]` to `offsets[i + 1]`
+        self._offsets = array("L", [0])
+        self._neighbors = array("L")
+        # Capacities and balances are not bounded by 64 bits and do not fit into an array
+        self._capacities_out: List[int] = []
+        self._capacities_in: List[int] = []
+        self._balances_out: List[int] = []
+
+        for user in self.users:
+            if not simulator.is_network_frozen:
+                for friend in simulator.get_friends(user):
+                    self._add_trustline(user, friend)
+            self._offsets.append(len(self._neighbors))
+
+    def _add_trustline(self, user: str, friend: str) -> None:
+        account = self.simulator.get_account(user, friend)
+        if account.is_frozen:
+            return
+        try:
+            balance = calculate_balance_with_interests(
+                account.balance,
+                account.mtime,
+                self.timestamp,
+                account.interest_rate_given,
+                account.interest_rate_received,
+            )
+        except ValueError:
+            # Transfers over the trustline would revert
+            return
+        self._neighbors.append(self._user_indices[friend])
+        # Negative if the balance already exceeds the creditline, so that not even zero can be transferred
+        self._capacities_out.append(account.creditline_received + balance)
+        self._capacities_in.append(account.creditline_given - balance)
+        self._balances_out.append(balance)
+
+    def find_path(
+        self, source: str, target: str, value: int, *, max_fee: int = MAX_UINT_64
+    ) -> Optional[PaymentPath]:
+        """Find the path with the lowest fees for `target` to receive `value` with the sender paying the fees"""
+        if (
+            source == target
+            or source not in self._user_indices
+            or target not in self._user_indices
+        ):
+            return None
+        source_index = self._user_indices[source]
+        target_index = self._user_indices[target]
+        return self._find_path_with_rules(
+            lambda excluded_slots: self._search_path_sender_pays(
+                source_index, target_index, value, max_fee, excluded_slots
+            ),
+            self.simulator.transfer_sender_pays,
+            max_fee,
+        )
+
+    def find_path_receiver_pays(
+        self, source: str, target: str, value: int, *, max_fee: int = MAX_UINT_64
+    ) -> Optional[PaymentPath]:
+        """Find the path with the lowest fees for `source` to send `value` with the receiver paying the fees"""
+        if (
+            source == target
+            or source not in self._user_indices
+            or target not in self._user_indices
+        ):
+            return None
+        source_index = self._user_indices[source]
+        target_index = self._user_indices[target]
+        return self._find_path_with_rules(
+            lambda excluded_slots: self._search_path_receiver_pays(
+                source_index, target_index, value, max_fee, excluded_slots
+            ),
+            self.simulator.transfer_receiver_pays,
+            max_fee,
+        )
+
+    def find_max_transferable_amount(
+        self, source: str, target: str
+    ) -> Optional[PaymentPath]:
+        """Find the path over which `source` can send the highest value to `target` with the sender paying the fees.
+
+        Returns None if the network prevents mediator interests: whether a value can be transferred
+        then depends on the whole path and is not monotonic in the value, so the search does not apply."""
+        if self.simulator.prevent_mediator_interests:
+            return None
+        upper_bound = self._find_max_capacity(source, target)
+        if upper_bound == 0:
+            return None
+
+        # Whether a value can be transferred is monotonic, as lower values need lower fees
+        best_path = None
+        lower_bound = 1
+        while lower_bound <= upper_bound:
+            value = (lower_bound + upper_bound) // 2
+            payment_path = self.find_path(source, target, value)
+            if payment_path is None:
+                upper_bound = value - 1
+            else:
+                best_path = payment_path
+                lower_bound = value + 1
+        return best_path
+
+    def _find_path_with_rules(
+        self,
+        search: Callable[[FrozenSet[int]], Optional[_Candidate]],
+        transfer,
+        max_fee: int,
+    ) -> Optional[PaymentPath]:
+        """Return the cheapest path found by `search` that does not break the prevent mediator interests rule.
+
+        If the cheapest path breaks it, the next candidates are searched without one of the trustlines
+        of a broken candidate each, cheapest candidate first, for at most `max_candidate_paths` searches."""
+        candidate = search(frozenset())
+        if candidate is None:
+            return None
+        if not self.simulator.prevent_mediator_interests:
+            return candidate.payment_path
+
+        order = itertools.count()
+        no_exclusions: FrozenSet[int] = frozenset()
+        heap: List[Tuple[int, int, _Candidate, FrozenSet[int]]] = [
+            (candidate.payment_path.fees, next(order), candidate, no_exclusions)
+        ]
+        searched_exclusions: Set[FrozenSet[int]] = {no_exclusions}
+        number_of_searches = 1
+        while heap:
+            _, _, candidate, excluded_slots = heapq.heappop(heap)
+            if self._is_possible(transfer, candidate.payment_path, max_fee):
+                return candidate.payment_path
+            for slot in candidate.slots:
+                if number_of_searches >= self.max_candidate_paths:
+                    break
+                next_excluded_slots = excluded_slots | {slot}
+                if next_excluded_slots in searched_exclusions:
+                    continue
+                searched_exclusions.add(next_excluded_slots)
+                next_candidate = search(next_excluded_slots)
+                number_of_searches += 1
+                if next_candidate is None:
+                    continue
+                # Excluding trustlines cannot make paths cheaper, so the heap yields the cheapest candidate first
+                heapq.heappush(
+                    heap,
+                    (
+                        next_candidate.payment_path.fees,
+                        next(order),
+                        next_candidate,
+                        next_excluded_slots,
+                    ),
+                )
+        return None
+
+    def _search_path_sender_pays(
+        self,
+        source_index: int,
+        target_index: int,
+        value: int,
+        max_fee: int,
+        excluded_slots: FrozenSet[int],
+    ) -> Optional[_Candidate]:
+        divisor = self.capacity_imbalance_fee_divisor
+        offsets, neighbors = self._offsets, self._neighbors
+        capacities_in, balances_out = self._capacities_in, self._balances_out
+        max_amount = min(value + max_fee, MAX_UINT_64)
+
+        # Search backwards from the target for the lowest amount a user has to send to the next one in the path
+        amounts = {target_index: value}
+        next_users: Dict[int, int] = {}
+        next_slots: Dict[int, int] = {}
+        heap = [(value, target_index)]
+        while heap:
+            amount, user_index = heapq.heappop(heap)
+            if amount > amounts[user_index]:
+                continue
+            if user_index == source_index:
+                break
+            for slot in range(offsets[user_index], offsets[user_index + 1]):
+                if slot in excluded_slots:
+                    continue
+                # The trustline from the previous user in the path to `user_index`
+                previous_index = neighbors[slot]
+                if user_index == target_index:
+                    sent_amount = amount
+                else:
+                    try:
+                        sent_amount = amount + calculate_fees_reverse(
+                            calculate_imbalance_generated(amount, -balances_out[slot]),
+                            divisor,
+                        )
+                    except TransferFailed:
+                        continue
+                if sent_amount > capacities_in[slot] or sent_amount > max_amount:
+                    continue
+                if sent_amount < amounts.get(previous_index, max_amount + 1):
+                    amounts[previous_index] = sent_amount
+                    next_users[previous_index] = user_index
+                    next_slots[previous_index] = slot
+                    heapq.heappush(heap, (sent_amount, previous_index))
+
+        if source_index not in next_users:
+            return None
+        path = self._build_path(source_index, target_index, next_users)
+        return _Candidate(
+            PaymentPath(value, amounts[source_index] - value, path),
+            self._build_path_slots(source_index, target_index, next_users, next_slots),
+        )
+
+    def _search_path_receiver_pays(
+        self,
+        source_index: int,
+        target_index: int,
+        value: int,
+        max_fee: int,
+        excluded_slots: FrozenSet[int],
+    ) -> Optional[_Candidate]:
+        divisor = self.capacity_imbalance_fee_divisor
+        offsets, neighbors = self._offsets, self._neighbors
+        capacities_out, balances_out = self._capacities_out, self._balances_out
+        min_amount = max(value - max_fee, 0)
+
+        # Search forwards from the source for the highest amount a user can send to the next one in the path
+        amounts = {source_index: value}
+        previous_users: Dict[int, int] = {}
+        previous_slots: Dict[int, int] = {}
+        heap = [(-value, source_index)]
+        while heap:
+            negative_amount, user_index = heapq.heappop(heap)
+            amount = -negative_amount
+            if amount < amounts[user_index]:
+                continue
+            if user_index == target_index:
+                break
+            for slot in range(offsets[user_index], offsets[user_index + 1]):
+                if slot in excluded_slots:
+                    continue
+                next_index = neighbors[slot]
+                if amount > capacities_out[slot]:
+                    continue
+                if next_index == target_index:
+                    received_amount = amount
+                else:
+                    received_amount = amount - calculate_fees(
+                        calculate_imbalance_generated(amount, balances_out[slot]),
+                        divisor,
+                    )
+                if received_amount < min_amount:
+                    continue
+                if received_amount > amounts.get(next_index, min_amount - 1):
+                    amounts[next_index] = received_amount
+                    previous_users[next_index] = user_index
+                    previous_slots[next_index] = slot
+                    heapq.heappush(heap, (-received_amount, next_index))
+
+        if target_index not in previous_users:
+            return None
+        path = self._build_path(target_index, source_index, previous_users)[::-1]
+        return _Candidate(
+            PaymentPath(value, value - amounts[target_index], path),
+            self._build_path_slots(
+                target_index, source_index, previous_users, previous_slots
+            ),
+        )
+
+    def _find_max_capacity(self, source: str, target: str) -> int:
+        """Return the highest capacity of any path between `source` and `target` without fees"""
+        source_index = self._user_indices.get(source)
+        target_index = self._user_indices.get(target)
+        if source_index is None or target_index is None or source == target:
+            return 0
+        offsets, neighbors, capacities_out = (
+            self._offsets,
+            self._neighbors,
+            self._capacities_out,
+        )
+
+        capacities = {source_index: MAX_UINT_64}
+        heap = [(-MAX_UINT_64, source_index)]
+        while heap:
+            negative_capacity, user_index = heapq.heappop(heap)
+            capacity = -negative_capacity
+            if capacity < capacities[user_index]:
+                continue
+            if user_index == target_index:
+                return capacity
+            for slot in range(offsets[user_index], offsets[user_index + 1]):
+                next_index = neighbors[slot]
+                next_capacity = min(capacity, capacities_out[slot])
+                if next_capacity > capacities.get(next_index, 0):
+                    capacities[next_index] = next_capacity
+                    heapq.heappush(heap, (-next_capacity, next_index))
+        return 0
+
+    def _build_path(
+        self, start_index: int, end_index: int, next_users: Dict[int, int]
+    ) -> List[str]:
+        path = [self.users[start_index]]
+        user_index = start_index
+        while user_index != end_index:
+            user_index = next_users[user_index]
+            path.append(self.users[user_index])
+        return path
+
+    def _build_path_slots(
+        self,
+        start_index: int,
+        end_index: int,
+        next_users: Dict[int, int],
+        next_slots: Dict[int, int],
+    ) -> List[int]:
+        slots = []
+        user_index = start_index
+        while user_index != end_index:
+            slots.append(next_slots[user_index])
+            user_index = next_users[user_index]
+        return slots
+
+    def _is_possible(self, transfer, payment_path: PaymentPath, max_fee: int) -> bool:
+        try:
+            transfer(
+                payment_path.value,
+                max_fee,
+                payment_path.path,
+                self.timestamp,
+                commit=False,
+            )
+        except TransferFailed:
+            return False
+        return True
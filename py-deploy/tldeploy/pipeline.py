@@ -0,0 +1,173 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from deploy_tools.transact import TransactionFailed
+from web3 import Web3
+from web3.exceptions import TimeExhausted, TransactionNotFound
+
+from tldeploy.load_contracts import contracts
+
+DEFAULT_MAX_IN_FLIGHT = 16
+DEFAULT_RECEIPT_TIMEOUT = 180
+DEFAULT_RESEND_AFTER = 30
+DEFAULT_POLL_INTERVAL = 0.1
+
+
+class TransactionPipeline:
+    """Send the transactions of one sender back to back, without waiting for every receipt.
+
+    The pipeline owns the nonce of the sender: it starts at the nonce of `transaction_options`,
+    or at the pending transaction count of the sender, and is increased for every sent transaction.
+    Every send returns a `Future` that resolves to the receipt, or to the deployed contract for deployments,
+    and fails with `TransactionFailed` if the transaction reverted.
+    At most `max_in_flight` transactions wait for their receipt at the same time, sending more blocks until
+    one of them is mined. A transaction that is still not mined after `resend_after` seconds and is not known
+    by the node anymore is sent again with the same nonce.
+
+    Transactions that depend on the effects of earlier ones, e.g. initializing a deployed contract,
+    have to be sent after waiting for the result of the earlier ones, as gas is estimated when sending."""
+
+    def __init__(
+        self,
+        web3: Web3,
+        *,
+        transaction_options: Dict = None,
+        private_key: bytes = None,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        receipt_timeout: float = DEFAULT_RECEIPT_TIMEOUT,
+        resend_after: float = DEFAULT_RESEND_AFTER,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight must be positive, got: {max_in_flight}")
+        if transaction_options is None:
+            transaction_options = {}
+
+        self.web3 = web3
+        self.private_key = private_key
+        self.transaction_options = dict(transaction_options)
+        if private_key is not None:
+            sender = web3.eth.account.from_key(private_key).address
+            if self.transaction_options.get("from", sender) != sender:
+                raise ValueError(
+                    "From can not be set in transaction_options if a private key is used"
+                )
+            self.transaction_options["from"] = sender
+        elif "from" not in self.transaction_options:
+            self.transaction_options["from"] = (
+                web3.eth.default_account or web3.eth.accounts[0]
+            )
+        self.sender = self.transaction_options["from"]
+
+        next_nonce = self.transaction_options.pop("nonce", None)
+        if next_nonce is None:
+            next_nonce = web3.eth.getTransactionCount(self.sender, "pending")
+        self.next_nonce = next_nonce
+
+        self.receipt_timeout = receipt_timeout
+        self.resend_after = resend_after
+        self.poll_interval = poll_interval
+        self._send_lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Wait for all transactions in flight and stop the pipeline"""
+        self._executor.shutdown(wait=True)
+
+    def send_function_call(self, function_call, *, gas: int = None) -> Future:
+        """Send a transaction for `function_call` and return a future resolving to its receipt.
+        The gas is estimated when sending, unless given via `gas` or `transaction_options`."""
+        return self._send(function_call, lambda receipt: receipt, gas=gas)
+
+    def deploy(self, contract_name: str, *, constructor_args=()) -> Future:
+        """Deploy the contract `contract_name` and return a future resolving to the deployed contract"""
+        contract_interface = contracts[contract_name]
+        contract = self.web3.eth.contract(
+            abi=contract_interface["abi"], bytecode=contract_interface["bytecode"]
+        )
+        return self._send(
+            contract.constructor(*constructor_args),
+            lambda receipt: contract(receipt["contractAddress"]),
+        )
+
+    def _send(self, function_call, make_result, *, gas: int = None) -> Future:
+        transaction_options = dict(self.transaction_options)
+        if gas is not None:
+            transaction_options["gas"] = gas
+        self._in_flight.acquire()
+        try:
+            with self._send_lock:
+                transaction = function_call.buildTransaction(
+                    dict(transaction_options, nonce=self.next_nonce)
+                )
+                send = self._make_send(transaction)
+                tx_hash = send()
+                self.next_nonce += 1
+        except BaseException:
+            self._in_flight.release()
+            raise
+
+        return self._executor.submit(self._wait_for_result, tx_hash, send, make_result)
+
+    def _make_send(self, transaction):
+        """Return a function sending `transaction`, which can be called again to resend it"""
+        if self.private_key is None:
+            return lambda: self.web3.eth.sendTransaction(transaction)
+
+        raw_transaction = self.web3.eth.account.sign_transaction(
+            transaction, self.private_key
+        ).rawTransaction
+        return lambda: self.web3.eth.sendRawTransaction(raw_transaction)
+
+    def _wait_for_result(self, tx_hash, send, make_result):
+        try:
+            receipt = self._wait_for_receipt(tx_hash, send)
+        finally:
+            self._in_flight.release()
+        if receipt["status"] != 1:
+            raise TransactionFailed(tx_hash)
+        return make_result(receipt)
+
+    def _wait_for_receipt(self, tx_hash, send):
+        start_time = time.monotonic()
+        last_sent_time = start_time
+        while True:
+            receipt = self._get_receipt(tx_hash)
+            if receipt is not None:
+                return receipt
+
+            now = time.monotonic()
+            if now - start_time > self.receipt_timeout:
+                raise TimeExhausted(
+                    f"Transaction {tx_hash.hex()} is not in the chain after {self.receipt_timeout} seconds"
+                )
+            if now - last_sent_time > self.resend_after and self._is_dropped(tx_hash):
+                try:
+                    send()
+                except ValueError:
+                    # The node might know the transaction again or have mined it in the meantime
+                    pass
+                last_sent_time = now
+            time.sleep(self.poll_interval)
+
+    def _get_receipt(self, tx_hash) -> Optional[Dict]:
+        try:
+            return self.web3.eth.getTransactionReceipt(tx_hash)
+        except TransactionNotFound:
+            return None
+
+    def _is_dropped(self, tx_hash) -> bool:
+        try:
+            self.web3.eth.getTransaction(tx_hash)
+        except TransactionNotFound:
+            return True
+        return False
@@ -1,7 +1,8 @@
-from typing import List, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple, Union
 
 from eth_keys import keys
-from eth_keys.exceptions import BadSignature
+from eth_keys.exceptions import BadSignature, ValidationError
 from web3 import Web3
 
 
@@ -52,3 +53,83 @@ def solidity_keccak(abi_types: List, values: List) -> bytes:
 
 def sign_msg_hash(hash: bytes, key: keys.PrivateKey) -> bytes:
     return key.sign_msg_hash(hash).to_bytes()
+
+
+def recover_msg_hash_signer(hash: bytes, signature: Optional[bytes]) -> Optional[str]:
+    """Recover the checksum address of the signer of a hash signed like `sign_msg_hash`,
+    accepting the same signatures as `ECDSA.recover` of the contracts. Invalid signatures give `None`."""
+    if signature is None or len(signature) != 65:
+        return None
+    v = signature[64]
+    if v >= 27:
+        v -= 27
+    if v not in (0, 1):
+        return None
+    try:
+        return (
+            keys.Signature(signature[:64] + bytes([v]))
+            .recover_public_key_from_msg_hash(hash)
+            .to_checksum_address()
+        )
+    except (BadSignature, ValidationError):
+        return None
+
+
+def sign_msg_hashes(
+    hashes: Sequence[bytes], key: keys.PrivateKey, *, max_workers: int = 1
+) -> List[bytes]:
+    """Sign multiple hashes like `sign_msg_hash`, with `max_workers` processes if more than one"""
+    return _map_chunks(
+        _sign_msg_hashes,
+        [(key.to_bytes(), chunk) for chunk in _chunks(hashes, max_workers)],
+        max_workers,
+    )
+
+
+def recover_msg_hash_signers(
+    hashes: Sequence[bytes], signatures: Sequence[bytes], *, max_workers: int = 1
+) -> List[Optional[str]]:
+    """Recover the checksum addresses of the signers of multiple hashes signed like `sign_msg_hash`,
+    with `max_workers` processes if more than one. Invalid signatures give `None`."""
+    if len(hashes) != len(signatures):
+        raise ValueError(f"Got {len(hashes)} hashes but {len(signatures)} signatures.")
+    return _map_chunks(
+        _recover_msg_hash_signers,
+        list(zip(_chunks(hashes, max_workers), _chunks(signatures, max_workers))),
+        max_workers,
+    )
+
+
+def _sign_msg_hashes(arguments) -> List[bytes]:
+    key, hashes = arguments
+    private_key = keys.PrivateKey(key)
+    return [sign_msg_hash(hash, private_key) for hash in hashes]
+
+
+def _recover_msg_hash_signers(arguments) -> List[Optional[str]]:
+    hashes, signatures = arguments
+    return [
+        recover_msg_hash_signer(hash, signature)
+        for hash, signature in zip(hashes, signatures)
+    ]
+
+
+def _chunks(items: Sequence, max_workers: int) -> List[Sequence]:
+    """Split `items` into a few chunks per worker, so that every worker gets work without passing every item
+    to a process on its own"""
+    if max_workers == 1:
+        return [items]
+    chunk_size = max(1, -(-len(items) // (max_workers * 4)))
+    starts = range(0, len(items), chunk_size)
+    return [
+        items[start:end] for start, end in zip(starts, list(starts[1:]) + [len(items)])
+    ]
+
+
+def _map_chunks(function, chunks: List, max_workers: int) -> List:
+    if max_workers == 1:
+        results = [function(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(function, chunks))
+    return [result for chunk_results in results for result in chunk_results]
@@ -0,0 +1,626 @@
+# This file provides an in-memory model of a currency network to evaluate transfers off-chain
+# It mirrors the transfer logic of `CurrencyNetworkBasic` and gives the same results
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import attr
+
+from tldeploy.interests import calculate_balance_with_interests
+from tldeploy.multicall import call_all
+
+MAX_UINT_64 = 2**64 - 1
+MIN_INT_256 = -(2**255)
+
+
+class TransferFailed(Exception):
+    """Raised for a transfer that would revert on chain, the message is the revert reason of the contract"""
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class Account:
+    """A trustline from the view of its first user, like returned by `getAccount`"""
+
+    creditline_given: int = 0
+    creditline_received: int = 0
+    interest_rate_given: int = 0
+    interest_rate_received: int = 0
+    is_frozen: bool = False
+    mtime: int = 0
+    balance: int = 0
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class BalanceUpdate:
+    sender: str
+    receiver: str
+    value: int
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class TransferResult:
+    fees: int
+    # In the order of the `BalanceUpdate` events of the contract
+    balance_updates: List[BalanceUpdate]
+
+
+def calculate_fees(
+    imbalance_generated: int, capacity_imbalance_fee_divisor: int
+) -> int:
+    if capacity_imbalance_fee_divisor == 0 or imbalance_generated == 0:
+        return 0
+    return (imbalance_generated - 1) // capacity_imbalance_fee_divisor + 1
+
+
+def calculate_fees_reverse(
+    imbalance_generated: int, capacity_imbalance_fee_divisor: int
+) -> int:
+    if capacity_imbalance_fee_divisor == 0 or imbalance_generated == 0:
+        return 0
+    if capacity_imbalance_fee_divisor == 1:
+        raise TransferFailed("Division by zero in fee calculation.")
+    return (imbalance_generated - 1) // (capacity_imbalance_fee_divisor - 1) + 1
+
+
+def calculate_imbalance_generated(value: int, balance: int) -> int:
+    imbalance_generated = value
+    if balance > 0:
+        imbalance_generated = value - balance
+    if imbalance_generated <= 0:
+        return 0
+    return imbalance_generated
+
+
+def interest_happiness(
+    balance_before: int,
+    balance: int,
+    interest_rate_given: int,
+    interest_rate_received: int,
+) -> int:
+    """Calculate how happy the sender and unhappy the receiver is because of the interests after a transfer,
+    where `balance_before` and `balance` are from the view of the sender"""
+    transferred_value = balance_before - balance
+    if balance_before <= 0:
+        return -transferred_value * interest_rate_received
+    elif balance >= 0:
+        return -transferred_value * interest_rate_given
+    else:
+        return -balance_before * interest_rate_given + balance * interest_rate_received
+
+
+class CurrencyNetworkSimulator:
+    """In-memory model of the trustlines of a currency network to evaluate transfers without calling the chain.
+
+    Transfers give the same fees and balances as `_mediatedTransferSenderPays` and `_mediatedTransferReceiverPays`
+    of the contract, including the interests applied at `timestamp` and the prevent mediator interests rule,
+    or raise `TransferFailed` if the transaction would revert. A failed transfer does not change the state.
+    The trustlines are stored in columns of compact arrays, ordered like in the contract by the lower address.
+    Addresses are compared as given, so they should all be checksummed like the ones returned by the contract."""
+
+    def __init__(
+        self,
+        *,
+        capacity_imbalance_fee_divisor: int = 0,
+        prevent_mediator_interests: bool = False,
+        is_network_frozen: bool = False,
+    ):
+        self.capacity_imbalance_fee_divisor = capacity_imbalance_fee_divisor
+        self.prevent_mediator_interests = prevent_mediator_interests
+        self.is_network_frozen = is_network_frozen
+
+        self._creditlines_given = array("Q")
+        self._creditlines_received = array("Q")
+        self._interest_rates_given = array("h")
+        self._interest_rates_received = array("h")
+        self._is_frozen = array("B")
+        self._mtimes = array("L")
+        # Balances are int72 and do not fit into an array
+        self._balances: List[int] = []
+        # Maps both orders of the users of a trustline to its row and whether the order is reversed
+        self._rows: Dict[Tuple[str, str], Tuple[int, bool]] = {}
+        # Ordered sets like in the contract, users and friends are only added by setting trustlines
+        self._users: Dict[str, None] = {}
+        self._friends: Dict[str, Dict[str, None]] = {}
+
+    @classmethod
+    def from_currency_network(cls, currency_network, *, multicall=None):
+        """Load the settings and all trustlines of `currency_network`, optionally in bulk via `multicall`"""
+        functions = currency_network.functions
+        (
+            capacity_imbalance_fee_divisor,
+            prevent_mediator_interests,
+            is_network_frozen,
+            users,
+        ) = call_all(
+            [
+                functions.capacityImbalanceFeeDivisor(),
+                functions.preventMediatorInterests(),
+                functions.isNetworkFrozen(),
+                functions.getUsers(),
+            ],
+            multicall,
+        )
+        friends_of_users = call_all(
+            [functions.getFriends(user) for user in users], multicall
+        )
+        trustlines = [
+            (user, friend)
+            for user, friends in zip(users, friends_of_users)
+            for friend in friends
+            if cls._is_lower_address(user, friend)
+        ]
+        accounts = call_all(
+            [functions.getAccount(user, friend) for user, friend in trustlines],
+            multicall,
+        )
+        return cls.from_trustlines(
+            users,
+            friends_of_users,
+            [
+                (user, friend, Account(*account))
+                for (user, friend), account in zip(trustlines, accounts)
+            ],
+            capacity_imbalance_fee_divisor=capacity_imbalance_fee_divisor,
+            prevent_mediator_interests=prevent_mediator_interests,
+            is_network_frozen=is_network_frozen,
+        )
+
+    @classmethod
+    def from_trustlines(
+        cls,
+        users: Sequence[str],
+        friends_of_users: Sequence[Sequence[str]],
+        trustlines: Iterable[Tuple[str, str, Account]],
+        **settings,
+    ):
+        """Create a simulator with `users` and their friends in the order of the contract
+        and the accounts of `trustlines` given from the view of their first user"""
+        simulator = cls(**settings)
+        for user, friend, account in trustlines:
+            simulator.set_account(
+                user,
+                friend,
+                account.creditline_given,
+                account.creditline_received,
+                account.interest_rate_given,
+                account.interest_rate_received,
+                account.is_frozen,
+                account.mtime,
+                account.balance,
+            )
+        simulator._users = dict.fromkeys(users)
+        simulator._friends = {
+            user: dict.fromkeys(friends)
+            for user, friends in zip(users, friends_of_users)
+        }
+        return simulator
+
+    def set_account(
+        self,
+        a: str,
+        b: str,
+        creditline_given: int,
+        creditline_received: int,
+        interest_rate_given: int,
+        interest_rate_received: int,
+        is_frozen: bool = False,
+        mtime: int = 0,
+        balance: int = 0,
+    ) -> None:
+        """Set the trustline between `a` and `b` from the view of `a`, like `setAccount` of the contract"""
+        if a == b:
+            raise ValueError("A trustline requires different addresses")
+        self._users[a] = None
+        self._users[b] = None
+        self._friends.setdefault(a, {})[b] = None
+        self._friends.setdefault(b, {})[a] = None
+
+        if self._is_lower_address(a, b):
+            values = (
+                creditline_given,
+                creditline_received,
+                interest_rate_given,
+                interest_rate_received,
+                balance,
+            )
+        else:
+            a, b = b, a
+            values = (
+                creditline_received,
+                creditline_given,
+                interest_rate_received,
+                interest_rate_given,
+                -balance,
+            )
+        row = self._get_or_create_row(a, b)
+        (
+            self._creditlines_given[row],
+            self._creditlines_received[row],
+            self._interest_rates_given[row],
+            self._interest_rates_received[row],
+            self._balances[row],
+        ) = values
+        self._is_frozen[row] = is_frozen
+        self._mtimes[row] = mtime
+
+    def set_balance(self, a: str, b: str, balance: int, mtime: int) -> None:
+        """Set the balance from the view of `a` and the mtime of the trustline between `a` and `b`"""
+        row, reversed_order = self._lookup(a, b)
+        if row is None:
+            self.set_account(a, b, 0, 0, 0, 0, mtime=mtime, balance=balance)
+            return
+        self._balances[row] = -balance if reversed_order else balance
+        self._mtimes[row] = mtime
+
+    def remove_trustline(self, a: str, b: str) -> None:
+        """Delete the trustline between `a` and `b` like `_closeTrustline` of the contract,
+        both stay users but are no longer friends"""
+        row, _ = self._lookup(a, b)
+        if row is not None:
+            for column in (
+                self._creditlines_given,
+                self._creditlines_received,
+                self._interest_rates_given,
+                self._interest_rates_received,
+                self._is_frozen,
+                self._mtimes,
+                self._balances,
+            ):
+                column[row] = 0
+        self._remove_friend(a, b)
+        self._remove_friend(b, a)
+
+    def _remove_friend(self, user: str, friend: str) -> None:
+        friends = self._friends.get(user)
+        if friends is None or friend not in friends:
+            return
+        # The contract moves the last friend to the position of the removed one
+        ordered_friends = list(friends)
+        last_friend = ordered_friends.pop()
+        if last_friend != friend:
+            ordered_friends[ordered_friends.index(friend)] = last_friend
+        self._friends[user] = dict.fromkeys(ordered_friends)
+
+    def get_account(self, a: str, b: str) -> Account:
+        """Return the trustline between `a` and `b` from the view of `a`"""
+        row, reversed_order = self._lookup(a, b)
+        if row is None:
+            return Account(is_frozen=self.is_network_frozen)
+        is_frozen = bool(self._is_frozen[row]) or self.is_network_frozen
+        if reversed_order:
+            return Account(
+                self._creditlines_received[row],
+                self._creditlines_given[row],
+                self._interest_rates_received[row],
+                self._interest_rates_given[row],
+                is_frozen,
+                self._mtimes[row],
+                -self._balances[row],
+            )
+        return Account(
+            self._creditlines_given[row],
+            self._creditlines_received[row],
+            self._interest_rates_given[row],
+            self._interest_rates_received[row],
+            is_frozen,
+            self._mtimes[row],
+            self._balances[row],
+        )
+
+    def get_trustlines(self) -> List[Tuple[str, str, Account]]:
+        """Return all trustlines from the view of their lower address, with their own frozen status
+        independent of the frozen status of the network. See `from_trustlines`."""
+        trustlines = []
+        for (a, b), (row, reversed_order) in self._rows.items():
+            if reversed_order or b not in self._friends.get(a, ()):
+                continue
+            trustlines.append(
+                (
+                    a,
+                    b,
+                    Account(
+                        self._creditlines_given[row],
+                        self._creditlines_received[row],
+                        self._interest_rates_given[row],
+                        self._interest_rates_received[row],
+                        bool(self._is_frozen[row]),
+                        self._mtimes[row],
+                        self._balances[row],
+                    ),
+                )
+            )
+        return trustlines
+
+    def get_friends(self, user: str) -> List[str]:
+        return list(self._friends.get(user, ()))
+
+    def get_users(self) -> List[str]:
+        return list(self._users)
+
+    def balance(self, a: str, b: str) -> int:
+        """Return the stored balance without interests, what `b` owes to `a`"""
+        return self.get_account(a, b).balance
+
+    def transfer_sender_pays(
+        self,
+        value: int,
+        max_fee: int,
+        path: Sequence[str],
+        timestamp: int,
+        *,
+        commit: bool = True,
+    ) -> TransferResult:
+        """Simulate a transfer where the sender pays the fees, like `transfer` of the contract.
+        The state is only changed if `commit` is true."""
+        _check_uint64(value, max_fee)
+        if len(path) <= 1:
+            raise TransferFailed("Path too short.")
+
+        transfer = _PendingTransfer(self, timestamp)
+        forwarded_value = value
+        fees = 0
+        receiver_unhappiness = 0
+        receiver_happiness = 0
+        reducing_debt_of_next_hop_only = True
+        balance_updates = []
+
+        for receiver_index in range(len(path) - 1, 0, -1):
+            receiver = path[receiver_index]
+            sender = path[receiver_index - 1]
+
+            trustline = transfer.load_trustline_with_interests(sender, receiver)
+
+            if receiver_index == len(path) - 1:
+                fee = 0
+            else:
+                fee = calculate_fees_reverse(
+                    calculate_imbalance_generated(forwarded_value, trustline.balance),
+                    self.capacity_imbalance_fee_divisor,
+                )
+
+            forwarded_value = _checked_uint64(forwarded_value + fee)
+            fees = _checked_uint64(fees + fee)
+            if fees > max_fee:
+                raise TransferFailed("The fees exceed the max fee parameter.")
+
+            balance_before = trustline.balance
+            trustline.apply_direct_transfer(forwarded_value)
+
+            if self.prevent_mediator_interests:
+                receiver_happiness = receiver_unhappiness
+                receiver_unhappiness = trustline.interest_happiness(balance_before)
+                if not (
+                    receiver_unhappiness <= receiver_happiness
+                    or reducing_debt_of_next_hop_only
+                ):
+                    raise TransferFailed(
+                        "The transfer was prevented by the prevent mediator interests strategy"
+                    )
+                reducing_debt_of_next_hop_only = trustline.balance >= 0
+
+            transfer.store_trustline(trustline)
+            balance_updates.append(BalanceUpdate(sender, receiver, trustline.balance))
+
+        if commit:
+            transfer.commit()
+        return TransferResult(fees, balance_updates)
+
+    def transfer_receiver_pays(
+        self,
+        value: int,
+        max_fee: int,
+        path: Sequence[str],
+        timestamp: int,
+        *,
+        commit: bool = True,
+    ) -> TransferResult:
+        """Simulate a transfer where the receiver pays the fees, like `transferReceiverPays` of the contract.
+        The state is only changed if `commit` is true."""
+        _check_uint64(value, max_fee)
+        if len(path) <= 1:
+            raise TransferFailed("Path too short.")
+
+        transfer = _PendingTransfer(self, timestamp)
+        forwarded_value = value
+        fees = 0
+        sender_happiness = MIN_INT_256
+        sender_unhappiness = MIN_INT_256
+        balance_updates = []
+
+        for sender_index in range(len(path) - 1):
+            receiver = path[sender_index + 1]
+            sender = path[sender_index]
+
+            trustline = transfer.load_trustline_with_interests(sender, receiver)
+
+            balance_before = trustline.balance
+            trustline.apply_direct_transfer(forwarded_value)
+
+            if self.prevent_mediator_interests:
+                sender_unhappiness = sender_happiness
+                sender_happiness = trustline.interest_happiness(balance_before)
+                reducing_debt_only = trustline.balance >= 0
+                if not (sender_happiness >= sender_unhappiness or reducing_debt_only):
+                    raise TransferFailed(
+                        "The transfer was prevented by the prevent mediator interests strategy"
+                    )
+
+            transfer.store_trustline(trustline)
+            balance_updates.append(BalanceUpdate(sender, receiver, trustline.balance))
+
+            if sender_index == len(path) - 2:
+                break
+
+            fee = calculate_fees(
+                calculate_imbalance_generated(forwarded_value, balance_before),
+                self.capacity_imbalance_fee_divisor,
+            )
+            forwarded_value = _checked_uint64(forwarded_value - fee)
+            fees = _checked_uint64(fees + fee)
+            if fees > max_fee:
+                raise TransferFailed("The fees exceed the max fee parameter.")
+
+        if commit:
+            transfer.commit()
+        return TransferResult(fees, balance_updates)
+
+    @staticmethod
+    def _is_lower_address(a: str, b: str) -> bool:
+        return int(a, 16) < int(b, 16)
+
+    def _lookup(self, a: str, b: str) -> Tuple[Optional[int], bool]:
+        """Return the row of the trustline between `a` and `b`, if any, and whether `a` is the higher address"""
+        row_and_order = self._rows.get((a, b))
+        if row_and_order is None:
+            return None, not self._is_lower_address(a, b)
+        return row_and_order
+
+    def _get_or_create_row(self, lower_address: str, higher_address: str) -> int:
+        row, _ = self._rows.get((lower_address, higher_address), (None, False))
+        if row is not None:
+            return row
+
+        row = len(self._balances)
+        for column in (
+            self._creditlines_given,
+            self._creditlines_received,
+            self._interest_rates_given,
+            self._interest_rates_received,
+            self._is_frozen,
+            self._mtimes,
+            self._balances,
+        ):
+            column.append(0)
+        self._rows[(lower_address, higher_address)] = (row, False)
+        self._rows[(higher_address, lower_address)] = (row, True)
+        return row
+
+
+class _Trustline:
+    """Working copy of a trustline from the view of the sender of a hop"""
+
+    __slots__ = (
+        "sender",
+        "receiver",
+        "creditline_received",
+        "interest_rate_given",
+        "interest_rate_received",
+        "mtime",
+        "balance",
+    )
+
+    def __init__(
+        self,
+        sender,
+        receiver,
+        creditline_received,
+        interest_rate_given,
+        interest_rate_received,
+        mtime,
+        balance,
+    ):
+        self.sender = sender
+        self.receiver = receiver
+        self.creditline_received = creditline_received
+        self.interest_rate_given = interest_rate_given
+        self.interest_rate_received = interest_rate_received
+        self.mtime = mtime
+        self.balance = balance
+
+    def apply_direct_transfer(self, value: int) -> None:
+        new_balance = self.balance - value
+        if -new_balance > self.creditline_received:
+            raise TransferFailed(
+                "The transferred value exceeds the capacity of the credit line."
+            )
+        self.balance = new_balance
+
+    def interest_happiness(self, balance_before: int) -> int:
+        return interest_happiness(
+            balance_before,
+            self.balance,
+            self.interest_rate_given,
+            self.interest_rate_received,
+        )
+
+
+class _PendingTransfer:
+    """Balances changed by a transfer in progress, which are only written to the simulator on commit"""
+
+    def __init__(self, simulator: CurrencyNetworkSimulator, timestamp: int):
+        self.simulator = simulator
+        self.timestamp = timestamp
+        # Maps the ordered users of changed trustlines to their new mtime and balance from the view of the lower user
+        self.changed_balances: Dict[Tuple[str, str], Tuple[int, int]] = {}
+
+    def load_trustline_with_interests(self, sender: str, receiver: str) -> _Trustline:
+        if sender == receiver:
+            raise TransferFailed("Unique identifiers require different addresses")
+        account = self.simulator.get_account(sender, receiver)
+        if account.is_frozen:
+            raise TransferFailed(
+                "The path given is incorrect: one trustline in the path is frozen."
+            )
+
+        mtime, balance = account.mtime, account.balance
+        changed_balance = self.changed_balances.get(self._key(sender, receiver))
+        if changed_balance is not None:
+            mtime, balance = changed_balance
+            if self.simulator._lookup(sender, receiver)[1]:
+                balance = -balance
+
+        try:
+            balance = calculate_balance_with_interests(
+                balance,
+                mtime,
+                self.timestamp,
+                account.interest_rate_given,
+                account.interest_rate_received,
+            )
+        except ValueError as e:
+            raise TransferFailed(str(e)) from e
+        return _Trustline(
+            sender,
+            receiver,
+            account.creditline_received,
+            account.interest_rate_given,
+            account.interest_rate_received,
+            # Fine until 2106
+            self.timestamp & 0xFFFFFFFF,
+            balance,
+        )
+
+    def store_trustline(self, trustline: _Trustline) -> None:
+        balance = trustline.balance
+        if self.simulator._lookup(trustline.sender, trustline.receiver)[1]:
+            balance = -balance
+        self.changed_balances[self._key(trustline.sender, trustline.receiver)] = (
+            trustline.mtime,
+            balance,
+        )
+
+    def commit(self) -> None:
+        simulator = self.simulator
+        for (lower_address, higher_address), (
+            mtime,
+            balance,
+        ) in self.changed_balances.items():
+            row = simulator._get_or_create_row(lower_address, higher_address)
+            simulator._mtimes[row] = mtime
+            simulator._balances[row] = balance
+
+    def _key(self, a: str, b: str) -> Tuple[str, str]:
+        if self.simulator._lookup(a, b)[1]:
+            return b, a
+        return a, b
+
+
+def _check_uint64(*values: int) -> None:
+    for value in values:
+        if not 0 <= value <= MAX_UINT_64:
+            raise ValueError(f"Value has to fit into uint64, got: {value}")
+
+
+def _checked_uint64(value: int) -> int:
+    if not 0 <= value <= MAX_UINT_64:
+        raise TransferFailed("Arithmetic overflow or underflow of uint64.")
+    return value
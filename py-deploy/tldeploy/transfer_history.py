@@ -0,0 +1,121 @@
+# This file provides the decoding of the transfers of a currency network from a single stream of its events
+from typing import Iterator, List, Tuple
+
+import attr
+from hexbytes import HexBytes
+
+from tldeploy.events import (
+    EventStream,
+    find_balance_updates_of_transfer,
+    get_delta_balances,
+    get_transfer_path,
+)
+from tldeploy.interest_report import TrustlineHistories
+
+
+@attr.s(auto_attribs=True, frozen=True)
+class DecodedTransfer:
+    transaction_hash: str
+    log_index: int
+    block_number: int
+    timestamp: int
+    sender: str
+    receiver: str
+    value: int
+    extra_data: bytes
+    # From the sender to the receiver
+    path: List[str]
+    # The changes of the balances of all users in the path without interests
+    delta_balances: List[int]
+    fees: int
+
+
+def decode_transfers(
+    currency_network,
+    *,
+    from_block: int = 0,
+    to_block="latest",
+    **event_stream_kwargs,
+) -> Iterator[DecodedTransfer]:
+    """Decode the transfers of `currency_network` from `from_block` to `to_block` with their paths,
+    the changes of the balances along the path and the fees.
+
+    The `Transfer`, `BalanceUpdate` and `TrustlineUpdate` events are read in a single stream from the first block on,
+    the balance updates of a transfer are the ones emitted right before it in the same transaction.
+    The balances and interest rates of the trustlines are tracked via `TrustlineHistories` to tell the change
+    of a balance by a transfer from the interests applied at the same time, so that no receipt has to be
+    fetched per transfer, only the timestamps of blocks with balance updates or transfers.
+    `event_stream_kwargs` are passed to `EventStream`."""
+    web3 = currency_network.web3
+    events = EventStream(
+        [
+            currency_network.events.Transfer,
+            currency_network.events.BalanceUpdate,
+            currency_network.events.TrustlineUpdate,
+        ],
+        from_block=0,
+        to_block=to_block,
+        **event_stream_kwargs,
+    )
+    trustline_histories = TrustlineHistories()
+    # The balance updates since the last transfer of the current transaction with the change of their balance
+    balance_updates: List[Tuple[dict, int]] = []
+    transaction_hash = None
+    last_block_hash = None
+    timestamp = 0
+
+    for event in events:
+        if event["transactionHash"] != transaction_hash:
+            transaction_hash = event["transactionHash"]
+            balance_updates = []
+        if (
+            event["blockHash"] != last_block_hash
+            and event["event"] != "TrustlineUpdate"
+        ):
+            last_block_hash = event["blockHash"]
+            timestamp = web3.eth.getBlock(last_block_hash)["timestamp"]
+
+        if event["event"] == "TrustlineUpdate":
+            trustline_histories.apply_trustline_update(event)
+        elif event["event"] == "BalanceUpdate":
+            previous_balance, interests = trustline_histories.apply_balance_update(
+                event, timestamp
+            )
+            balance_updates.append(
+                (event, event["args"]["_value"] - previous_balance - interests)
+            )
+        elif event["event"] == "Transfer":
+            if event["blockNumber"] >= from_block:
+                yield _decode_transfer(event, timestamp, balance_updates)
+            balance_updates = []
+
+
+def _decode_transfer(
+    transfer_event, timestamp: int, balance_updates: List[Tuple[dict, int]]
+) -> DecodedTransfer:
+    """Decode `transfer_event` given the balance updates emitted before it in the same transaction
+    with the changes of their balances without interests"""
+    args = transfer_event["args"]
+    balance_changes = {
+        event["logIndex"]: balance_change for event, balance_change in balance_updates
+    }
+    transfer_balance_update_events = find_balance_updates_of_transfer(
+        transfer_event, [event for event, _ in reversed(balance_updates)]
+    )
+    delta_balances = get_delta_balances(
+        [balance_changes[event["logIndex"]] for event in transfer_balance_update_events]
+    )
+    return DecodedTransfer(
+        transaction_hash=HexBytes(transfer_event["transactionHash"]).hex(),
+        log_index=transfer_event["logIndex"],
+        block_number=transfer_event["blockNumber"],
+        timestamp=timestamp,
+        sender=args["_from"],
+        receiver=args["_to"],
+        value=args["_value"],
+        extra_data=args["_extraData"],
+        path=get_transfer_path(transfer_balance_update_events),
+        delta_balances=delta_balances,
+        # What the mediators earned, which is what the sender paid but the receiver did not receive
+        fees=sum(delta_balances[1:-1]),
+    )
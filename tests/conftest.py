@@ -1,13 +1,20 @@
+import json
 import pathlib
+import threading
 
 from deploy_tools.transact import wait_for_successful_function_call
 import pytest
 
+import tldeploy.batch_request
 import tldeploy.core
 import deploy_tools.transact
+import eth_tester
 import eth_tester.exceptions
 
 
+from hexbytes import HexBytes
+from web3 import EthereumTesterProvider, HTTPProvider, Web3
+
 from tests.utils import (
     find_gas_values_for_call,
     assert_gas_values_for_call,
@@ -602,3 +609,74 @@ def make_currency_network_adapter(assert_failing_transaction, assert_failing_cal
         )
 
     return make
+
+
+@pytest.fixture()
+def http_web3(web3, monkeypatch):
+    """A web3 instance with an `HTTPProvider`, whose posted requests are answered by `web3`"""
+    posted_requests = []
+
+    def make_post_request(endpoint_uri, data, **kwargs):
+        requests = json.loads(data)
+        posted_requests.append(requests)
+        responses = []
+        # Answer in reverse order, nodes do not have to keep the order of a batch
+        for request in reversed(requests):
+            response = {"jsonrpc": "2.0", "id": request["id"]}
+            try:
+                result = web3.manager.request_blocking(
+                    request["method"], request["params"]
+                )
+            except Exception as exception:
+                response["error"] = {"code": -32000, "message": str(exception)}
+            else:
+                response["result"] = _to_json_rpc_result(result)
+            responses.append(response)
+        return json.dumps(responses).encode()
+
+    monkeypatch.setattr(tldeploy.batch_request, "make_post_request", make_post_request)
+    http_web3 = Web3(HTTPProvider("http://localhost:8545"))
+    http_web3.posted_requests = posted_requests
+    return http_web3
+
+
+def _to_json_rpc_result(result):
+    if isinstance(result, int):
+        return hex(result)
+    if isinstance(result, bytes):
+        return HexBytes(result).hex()
+    return result
+
+
+@pytest.fixture()
+def serialized_web3_requests(web3):
+    """Serialize the requests of `web3` to its provider for tests using it from multiple threads,
+    as eth tester is not thread-safe"""
+    # Reentrant, as middlewares make requests of their own, e.g. to estimate the gas
+    lock = threading.RLock()
+
+    def locking_middleware(make_request, web3):
+        def middleware(method, params):
+            with lock:
+                return make_request(method, params)
+
+        return middleware
+
+    web3.middleware_onion.add(locking_middleware, "serialized_requests")
+    yield
+    web3.middleware_onion.remove("serialized_requests")
+
+
+@pytest.fixture()
+def fresh_chain():
+    """A new chain for tests querying the logs from the first block on multiple times,
+    which takes time linear in the length of the chain shared by all tests"""
+    return eth_tester.EthereumTester(eth_tester.PyEVMBackend())
+
+
+@pytest.fixture()
+def fresh_web3(fresh_chain):
+    """Web3 object connected to `fresh_chain`, with the same accounts as `web3`"""
+    web3 = Web3(EthereumTesterProvider(fresh_chain))
+    web3.eth.default_account = web3.eth.accounts[0]
+    return web3
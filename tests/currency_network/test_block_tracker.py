@@ -0,0 +1,143 @@
+#! pytest
+
+import pytest
+from tldeploy.block_tracker import BlockTracker, ReorgTooDeep
+from tldeploy.event_store import EventStore, EventStoreConsumer
+from tldeploy.graph_state import TrustlineGraphState
+
+from tests.currency_network.test_event_store import (
+    assert_store_equals_logs,
+    deploy_network_with_trustlines,
+    make_transfers,
+    transfers,
+)
+from tests.currency_network.test_graph_state import assert_state_equals_contract
+
+"""
+Tests of the block tracker with chain reorganisations simulated by reverting to snapshots of eth-tester
+and mining a different chain which is longer than the reverted one.
+"""
+
+
+@pytest.fixture()
+def currency_network_contract(web3, accounts):
+    return deploy_network_with_trustlines(web3, accounts)
+
+
+@pytest.fixture()
+def event_store(tmp_path):
+    event_store = EventStore(str(tmp_path / "events.sqlite"))
+    yield event_store
+    event_store.close()
+
+
+@pytest.fixture()
+def graph_state(currency_network_contract):
+    return TrustlineGraphState.bootstrap(currency_network_contract)
+
+
+@pytest.fixture()
+def block_tracker(web3, currency_network_contract, event_store, graph_state):
+    block_tracker = BlockTracker(web3, next_block=graph_state.next_block)
+    block_tracker.register(graph_state)
+    block_tracker.register(EventStoreConsumer(event_store, [currency_network_contract]))
+    return block_tracker
+
+
+def reorganize(chain, snapshot, mine):
+    """Replace the blocks after `snapshot` by the ones mined by `mine`, followed by enough blocks
+    for the new chain to be the longer one"""
+    block_number = chain.get_block_by_number("latest")["number"]
+    chain.revert_to_snapshot(snapshot)
+    mine()
+    new_block_number = chain.get_block_by_number("latest")["number"]
+    chain.mine_blocks(max(block_number - new_block_number, 0) + 1)
+
+
+@pytest.mark.parametrize("checkpoint_interval", [1, 100])
+def test_reorganisation_rolls_back_consumers(
+    web3,
+    chain,
+    currency_network_contract,
+    accounts,
+    event_store,
+    graph_state,
+    block_tracker,
+    checkpoint_interval,
+):
+    contract = currency_network_contract
+    graph_state.checkpoint_interval = checkpoint_interval
+    for transfer in transfers[:2]:
+        make_transfers(web3, chain, contract, accounts, [transfer])
+        assert block_tracker.update() is None
+
+    snapshot = chain.take_snapshot()
+    # Empty blocks mined by time travel may be equal on both chains
+    first_possibly_reorganized_block = web3.eth.blockNumber + 1
+    make_transfers(web3, chain, contract, accounts, transfers[2:4])
+    assert block_tracker.update() is None
+
+    reorganize(
+        chain,
+        snapshot,
+        lambda: make_transfers(web3, chain, contract, accounts, transfers[4:]),
+    )
+    first_reorganized_block = block_tracker.update()
+    assert first_reorganized_block is not None
+    assert first_reorganized_block >= first_possibly_reorganized_block
+
+    assert_store_equals_logs(event_store, contract, accounts)
+    assert_state_equals_contract(graph_state, contract, accounts[:5])
+    assert block_tracker.next_block == web3.eth.blockNumber + 1
+
+
+def test_update_without_new_blocks(
+    web3, chain, currency_network_contract, accounts, graph_state, block_tracker
+):
+    make_transfers(web3, chain, currency_network_contract, accounts, transfers[:1])
+    block_tracker.update()
+    next_block = block_tracker.next_block
+
+    assert block_tracker.update() is None
+    assert block_tracker.next_block == next_block
+    assert graph_state.next_block == next_block
+
+
+def test_confirmations(
+    web3, chain, currency_network_contract, accounts, event_store, graph_state
+):
+    block_tracker = BlockTracker(
+        web3, next_block=graph_state.next_block, confirmations=2
+    )
+    block_tracker.register(graph_state)
+    make_transfers(web3, chain, currency_network_contract, accounts, transfers[:2])
+    chain.mine_blocks(2)
+
+    block_tracker.update()
+
+    assert block_tracker.next_block == web3.eth.blockNumber - 1
+    assert graph_state.next_block == web3.eth.blockNumber - 1
+    assert_state_equals_contract(graph_state, currency_network_contract, accounts[:5])
+
+
+def test_reorganisation_deeper_than_history(
+    web3, chain, currency_network_contract, accounts, graph_state
+):
+    block_tracker = BlockTracker(
+        web3, next_block=graph_state.next_block, history_size=2
+    )
+    block_tracker.register(graph_state)
+    snapshot = chain.take_snapshot()
+    make_transfers(web3, chain, currency_network_contract, accounts, transfers[:2])
+    block_tracker.update()
+
+    reorganize(
+        chain,
+        snapshot,
+        lambda: make_transfers(
+            web3, chain, currency_network_contract, accounts, transfers[2:3]
+        ),
+    )
+
+    with pytest.raises(ReorgTooDeep):
+        block_tracker.update()
@@ -465,6 +465,135 @@ def test_set_debt_event(
     assert event_args["_newDebt"] == value
 
 
+def test_set_accounts(
+    currency_network_adapter: CurrencyNetworkAdapter, owner, accounts, web3
+):
+    accounts_to_set = [
+        (accounts[1], accounts[2], 100, 200, 1, 2, False, 123456, 1000),
+        (accounts[3], accounts[2], 300, 400, 3, 4, True, 123456, -2000),
+    ]
+    currency_network_adapter.contract.functions.setAccounts(accounts_to_set).transact(
+        {"from": owner}
+    )
+
+    new_mtime = web3.eth.getBlock(web3.eth.blockNumber)["timestamp"]
+    for (
+        creditor,
+        debtor,
+        creditline_given,
+        creditline_received,
+        interest_rate_given,
+        interest_rate_received,
+        is_frozen,
+        old_mtime,
+        balance,
+    ) in accounts_to_set:
+        new_balance = currency_network_adapter.balance_with_interests(
+            balance, old_mtime, new_mtime, interest_rate_given, interest_rate_received
+        )
+        assert currency_network_adapter.check_account(
+            creditor,
+            debtor,
+            creditline_given,
+            creditline_received,
+            interest_rate_given,
+            interest_rate_received,
+            is_frozen,
+            new_mtime,
+            new_balance,
+        )
+
+
+def test_set_accounts_not_owner(
+    currency_network_adapter: CurrencyNetworkAdapter,
+    not_owner,
+    accounts,
+    assert_failing_transaction,
+):
+    assert_failing_transaction(
+        currency_network_adapter.contract.functions.setAccounts(
+            [(accounts[1], accounts[2], 1, 2, 0, 0, False, 123456, 0)]
+        ),
+        {"from": not_owner},
+    )
+
+
+def test_set_onboarders(currency_network_contract, owner, accounts):
+    users = [accounts[1], accounts[2]]
+    on_boarders = [accounts[3], accounts[4]]
+    currency_network_contract.functions.setOnboarders(users, on_boarders).transact(
+        {"from": owner}
+    )
+    for user, on_boarder in zip(users, on_boarders):
+        assert currency_network_contract.functions.onboarder(user).call() == on_boarder
+
+
+def test_set_onboarders_not_owner(
+    currency_network_adapter, not_owner, accounts, assert_failing_transaction
+):
+    assert_failing_transaction(
+        currency_network_adapter.contract.functions.setOnboarders(
+            [accounts[1]], [accounts[2]]
+        ),
+        {"from": not_owner},
+    )
+
+
+def test_set_onboarders_length_mismatch(
+    currency_network_adapter, owner, accounts, assert_failing_transaction
+):
+    assert_failing_transaction(
+        currency_network_adapter.contract.functions.setOnboarders(
+            [accounts[1], accounts[2]], [accounts[3]]
+        ),
+        {"from": owner},
+    )
+
+
+def test_set_debts(currency_network_contract, owner, accounts):
+    debtors = [accounts[1], accounts[3]]
+    creditors = [accounts[2], accounts[2]]
+    values = [123, -456]
+    debts_before = [
+        currency_network_contract.functions.getDebt(debtor, creditor).call()
+        for debtor, creditor in zip(debtors, creditors)
+    ]
+
+    currency_network_contract.functions.setDebts(debtors, creditors, values).transact(
+        {"from": owner}
+    )
+
+    for debtor, creditor, value, debt_before in zip(
+        debtors, creditors, values, debts_before
+    ):
+        assert (
+            currency_network_contract.functions.getDebt(debtor, creditor).call()
+            == debt_before + value
+        )
+
+
+def test_set_debts_not_owner(
+    currency_network_adapter, not_owner, accounts, assert_failing_transaction
+):
+    assert_failing_transaction(
+        currency_network_adapter.contract.functions.setDebts(
+            [accounts[1]], [accounts[2]], [123]
+        ),
+        {"from": not_owner},
+    )
+
+
+def test_set_debts_length_mismatch(
+    currency_network_adapter, owner, accounts, assert_failing_transaction
+):
+    assert_failing_transaction(
+        currency_network_adapter.contract.functions.setDebts(
+            [accounts[1]], [accounts[2]], [123, 456]
+        ),
+        {"from": owner},
+    )
+
+
 def test_network_starts_frozen(currency_network_contract):
     assert currency_network_contract.functions.isNetworkFrozen().call()
 
@@ -490,3 +619,20 @@ def test_unfreeze_network_event(currency_network_adapter, owner, web3):
         )
         is not None
     )
+
+
+def test_batch_setters_not_frozen(
+    currency_network_adapter, owner, accounts, assert_failing_transaction
+):
+    if currency_network_adapter.is_network_frozen:
+        currency_network_adapter.unfreeze_network(transaction_options={"from": owner})
+    functions = currency_network_adapter.contract.functions
+
+    for function_call in [
+        functions.setAccounts(
+            [(accounts[1], accounts[2], 1, 2, 0, 0, False, 123456, 0)]
+        ),
+        functions.setOnboarders([accounts[1]], [accounts[2]]),
+        functions.setDebts([accounts[1]], [accounts[2]], [123]),
+    ]:
+        assert_failing_transaction(function_call, {"from": owner})
@@ -1,7 +1,14 @@
 #! pytest
+import json
+
 import pytest
+import tldeploy.core
 
-from tests.currency_network.conftest import ADDRESS_0
+from tests.currency_network.conftest import (
+    ADDRESS_0,
+    deploy_test_network,
+    trustlines,
+)
 from tldeploy.core import (
     deploy_networks,
     deploy_network,
@@ -9,9 +16,12 @@ from tldeploy.core import (
     deploy_currency_network_proxy,
     verify_owner_not_deployer,
     deploy_and_migrate_network,
+    deploy_and_migrate_networks_from_file,
     NetworkSettings,
 )
 
+from tldeploy.journal import MigrationJournal
+
 from tests.conftest import EXPIRATION_TIME, NETWORK_SETTINGS
 
 
@@ -46,6 +56,25 @@ def test_deploy_networks(web3):
     assert unw_eth.functions.decimals().call() == 18
 
 
+def test_deploy_networks_closes_pipeline_on_failure(web3, monkeypatch):
+    closed_pipelines = []
+
+    class RecordingPipeline(tldeploy.core.TransactionPipeline):
+        def close(self):
+            super().close()
+            closed_pipelines.append(self)
+
+    monkeypatch.setattr(tldeploy.core, "TransactionPipeline", RecordingPipeline)
+
+    # The exchange cannot be initialized as a currency network
+    with pytest.raises(Exception):
+        deploy_networks(
+            web3, [NETWORK_SETTINGS], currency_network_contract_name="Exchange"
+        )
+
+    assert len(closed_pipelines) == 1
+
+
 def test_deploy_network(web3):
     network = deploy_network(web3, NETWORK_SETTINGS)
 
@@ -168,3 +197,100 @@ def test_deploy_and_migrate_network(
         old_network=currency_network_contract_with_trustlines,
         private_key=not_owner_key,
     )
+
+
+def test_deploy_and_migrate_network_resumes_from_journal(
+    tmp_path,
+    web3,
+    beacon_with_currency_network,
+    currency_network_contract_with_trustlines,
+    owner,
+    not_owner_key,
+    chain,
+):
+    expiration_time = (
+        currency_network_contract_with_trustlines.functions.expirationTime().call()
+    )
+    if web3.eth.getBlock("latest")["timestamp"] <= expiration_time:
+        chain.time_travel(expiration_time + 1)
+        chain.mine_block()
+    journal = MigrationJournal(str(tmp_path / "journal.jsonl"))
+
+    def deploy_and_migrate():
+        return deploy_and_migrate_network(
+            web3_source=web3,
+            web3_dest=web3,
+            beacon_address=beacon_with_currency_network.address,
+            owner_address=owner,
+            master_copy_address=ADDRESS_0,
+            proxy_factory_address=ADDRESS_0,
+            old_network=currency_network_contract_with_trustlines,
+            private_key=not_owner_key,
+            journal=journal,
+        )
+
+    new_network = deploy_and_migrate()
+    block_number = web3.eth.blockNumber
+
+    assert deploy_and_migrate().address == new_network.address
+    assert web3.eth.blockNumber == block_number
+
+
+def test_deploy_and_migrate_networks_in_parallel(
+    tmp_path,
+    web3,
+    accounts,
+    beacon_with_currency_network,
+    owner,
+    not_owner_key,
+    chain,
+    serialized_web3_requests,
+):
+    old_networks = []
+    for i in range(3):
+        old_network = deploy_test_network(
+            web3, NetworkSettings(name=f"Network {i}", expiration_time=EXPIRATION_TIME)
+        )
+        for (A, B, clAB, clBA) in trustlines:
+            old_network.functions.setAccount(
+                accounts[A], accounts[B], clAB, clBA, 0, 0, False, 0, 0
+            ).transact()
+        old_networks.append(old_network)
+    if web3.eth.getBlock("latest")["timestamp"] <= EXPIRATION_TIME:
+        chain.time_travel(EXPIRATION_TIME + 1)
+        chain.mine_block()
+
+    addresses_file_path = tmp_path / "addresses.csv"
+    addresses_file_path.write_text(
+        "".join(f"{old_network.address}\n" for old_network in old_networks)
+    )
+    output_file_path = tmp_path / "output.json"
+
+    deploy_and_migrate_networks_from_file(
+        web3_source=web3,
+        web3_dest=web3,
+        beacon_address=beacon_with_currency_network.address,
+        owner_address=owner,
+        master_copy_address=ADDRESS_0,
+        proxy_factory_address=ADDRESS_0,
+        addresses_file_path=str(addresses_file_path),
+        private_key=not_owner_key,
+        output_file_path=str(output_file_path),
+        parallel=3,
+    )
+
+    network_addresses_mapping = json.loads(output_file_path.read_text())
+    assert list(network_addresses_mapping.keys()) == [
+        old_network.address for old_network in old_networks
+    ]
+    for old_network in old_networks:
+        new_network = web3.eth.contract(
+            address=network_addresses_mapping[old_network.address],
+            abi=old_network.abi,
+        )
+        assert (
+            new_network.functions.name().call() == old_network.functions.name().call()
+        )
+        assert len(new_network.functions.getUsers().call()) == len(
+            old_network.functions.getUsers().call()
+        )
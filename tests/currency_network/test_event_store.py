@@ -0,0 +1,171 @@
+#! pytest
+
+import pytest
+from tldeploy.core import NetworkSettings
+from tldeploy.event_store import EventStore
+
+from tests.currency_network.conftest import deploy_test_network
+from tests.currency_network.test_information_from_events import (
+    get_all_balances_for_trustline,
+    get_delta_balances_of_transfer,
+    get_interests_for_trustline,
+    get_transfer_path,
+)
+
+"""
+Tests of the event store against the helpers of `test_information_from_events`, which query the logs directly.
+"""
+
+SECONDS_PER_YEAR = 60 * 60 * 24 * 365
+INTEREST_RATE = 1000
+
+trustlines = [
+    (0, 1, 100, 150),
+    (1, 2, 200, 250),
+    (2, 3, 300, 350),
+    (3, 4, 400, 450),
+]  # (A, B, clAB, clBA)
+
+transfers = [
+    ([0, 1], 10, "sender"),
+    ([0, 1, 2, 3], 20, "sender"),
+    ([4, 3, 2, 1], 30, "receiver"),
+    ([1, 2, 3, 4], 99, "sender"),
+    ([3, 2, 1, 0], 15, "receiver"),
+]
+
+
+def deploy_network_with_trustlines(web3, accounts):
+    contract = deploy_test_network(
+        web3,
+        NetworkSettings(
+            fee_divisor=100,
+            default_interest_rate=INTEREST_RATE,
+            custom_interests=False,
+        ),
+    )
+    for (A, B, clAB, clBA) in trustlines:
+        contract.functions.updateTrustline(
+            accounts[B], clAB, clBA, INTEREST_RATE, INTEREST_RATE, False
+        ).transact({"from": accounts[A]})
+        contract.functions.updateTrustline(
+            accounts[A], clBA, clAB, INTEREST_RATE, INTEREST_RATE, False
+        ).transact({"from": accounts[B]})
+    return contract
+
+
+@pytest.fixture()
+def currency_network_contract(fresh_web3, accounts):
+    return deploy_network_with_trustlines(fresh_web3, accounts)
+
+
+@pytest.fixture()
+def event_store(tmp_path):
+    event_store = EventStore(str(tmp_path / "events.sqlite"))
+    yield event_store
+    event_store.close()
+
+
+def make_transfers(web3, chain, contract, accounts, transfers):
+    for path, value, fee_payer in transfers:
+        timestamp = web3.eth.getBlock("latest").timestamp + SECONDS_PER_YEAR
+        chain.time_travel(timestamp)
+        account_path = [accounts[i] for i in path]
+        if fee_payer == "sender":
+            function = contract.functions.transfer
+        else:
+            function = contract.functions.transferReceiverPays
+        function(value, 1000, account_path, b"").transact({"from": account_path[0]})
+
+
+def assert_store_equals_logs(event_store, contract, accounts):
+    stored_transfer_events = event_store.get_events(contract.address, "Transfer")
+    transfer_events = contract.events.Transfer().getLogs(fromBlock=0)
+    assert len(stored_transfer_events) == len(transfer_events)
+
+    for stored_transfer_event, transfer_event in zip(
+        stored_transfer_events, transfer_events
+    ):
+        assert event_store.get_transfer_path(
+            stored_transfer_event
+        ) == get_transfer_path(contract, transfer_event)
+        assert event_store.get_delta_balances_of_transfer(
+            stored_transfer_event
+        ) == get_delta_balances_of_transfer(contract, transfer_event)
+
+    for (A, B, _, _) in trustlines:
+        a, b = accounts[A], accounts[B]
+        assert event_store.get_balances_of_trustline(
+            contract.address, a, b
+        ) == get_all_balances_for_trustline(contract, a, b)
+        assert event_store.get_interests_of_trustline(
+            contract.address, b, a
+        ) == get_interests_for_trustline(contract, b, a)
+
+
+def test_helpers_equal_logs(
+    fresh_web3, fresh_chain, currency_network_contract, accounts, event_store
+):
+    make_transfers(
+        fresh_web3, fresh_chain, currency_network_contract, accounts, transfers
+    )
+
+    assert event_store.ingest([currency_network_contract]) > 0
+    assert_store_equals_logs(event_store, currency_network_contract, accounts)
+
+
+def test_ingest_incrementally(
+    fresh_web3, fresh_chain, currency_network_contract, accounts, event_store
+):
+    make_transfers(
+        fresh_web3, fresh_chain, currency_network_contract, accounts, transfers[:2]
+    )
+    event_store.ingest([currency_network_contract])
+    assert event_store.ingest([currency_network_contract]) == 0
+
+    make_transfers(
+        fresh_web3, fresh_chain, currency_network_contract, accounts, transfers[2:]
+    )
+    assert event_store.ingest([currency_network_contract]) > 0
+    assert_store_equals_logs(event_store, currency_network_contract, accounts)
+
+
+def test_ingest_after_reorganisation(
+    fresh_web3, fresh_chain, currency_network_contract, accounts, event_store
+):
+    make_transfers(
+        fresh_web3, fresh_chain, currency_network_contract, accounts, transfers[:2]
+    )
+    event_store.ingest([currency_network_contract])
+    snapshot = fresh_chain.take_snapshot()
+
+    make_transfers(
+        fresh_web3, fresh_chain, currency_network_contract, accounts, transfers[2:4]
+    )
+    event_store.ingest([currency_network_contract])
+
+    fresh_chain.revert_to_snapshot(snapshot)
+    make_transfers(
+        fresh_web3, fresh_chain, currency_network_contract, accounts, transfers[4:]
+    )
+    fresh_chain.mine_blocks(3)
+    event_store.ingest([currency_network_contract])
+
+    assert_store_equals_logs(event_store, currency_network_contract, accounts)
+
+
+def test_events_of_transaction(
+    fresh_web3, fresh_chain, currency_network_contract, accounts, event_store
+):
+    make_transfers(
+        fresh_web3, fresh_chain, currency_network_contract, accounts, transfers[1:2]
+    )
+    event_store.ingest([currency_network_contract])
+    transfer_event = event_store.get_events(
+        currency_network_contract.address, "Transfer"
+    )[0]
+
+    events = event_store.get_events_of_transaction(transfer_event["transactionHash"])
+
+    assert [event["event"] for event in events] == ["BalanceUpdate"] * 3 + ["Transfer"]
+    assert events[-1] == transfer_event
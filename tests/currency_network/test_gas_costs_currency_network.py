@@ -17,8 +17,16 @@
 """
 import pytest
 from tldeploy.core import deploy_network, NetworkSettings
+from tldeploy.migration import (
+    SET_ACCOUNT_GAS_PER_ITEM,
+    SET_DEBT_GAS_PER_ITEM,
+    SET_ON_BOARDER_GAS_PER_ITEM,
+    TRANSACTION_BASE_GAS,
+)
+from web3 import Web3
 
 from ..conftest import EXTRA_DATA
+from .conftest import deploy_ownable_network
 
 trustlines = [
     (0, 1, 100, 150),
@@ -269,3 +277,130 @@ def test_cancel_trustline_update(
     gas_values_snapshot.assert_gas_values_match_for_call(
         "CANCEL_TL_UPDATE", web3, call, transaction_options={"from": A}
     )
+
+
+def make_addresses(number, offset=1):
+    return [
+        Web3.toChecksumAddress(f"0x{i:040x}") for i in range(offset, offset + number)
+    ]
+
+
+@pytest.fixture()
+def owned_currency_network_contract(web3):
+    """A network in migration, owned and frozen, for the batch setters to be usable"""
+    return deploy_ownable_network(web3, NetworkSettings(custom_interests=True))
+
+
+@pytest.mark.gas_costs
+def test_cost_set_account(web3, owned_currency_network_contract, gas_values_snapshot):
+    creditor, debtor = make_addresses(2)
+    call = owned_currency_network_contract.functions.setAccount(
+        creditor, debtor, 100, 150, 1, 2, False, 123456, 10
+    )
+
+    gas_values_snapshot.assert_gas_values_match_for_call("SET_ACCOUNT", web3, call)
+
+
+@pytest.mark.gas_costs
+def test_cost_set_debt(web3, owned_currency_network_contract, gas_values_snapshot):
+    debtor, creditor = make_addresses(2)
+    call = owned_currency_network_contract.functions.setDebt(debtor, creditor, 123)
+
+    gas_values_snapshot.assert_gas_values_match_for_call("SET_DEBT", web3, call)
+
+
+@pytest.mark.gas_costs
+def test_cost_set_onboarder(web3, owned_currency_network_contract, gas_values_snapshot):
+    user, on_boarder = make_addresses(2)
+    call = owned_currency_network_contract.functions.setOnboarder(user, on_boarder)
+
+    gas_values_snapshot.assert_gas_values_match_for_call("SET_ONBOARDER", web3, call)
+
+
+@pytest.mark.gas_costs
+@pytest.mark.parametrize("batch_size", [1, 10, 50])
+def test_cost_set_accounts_per_account(
+    web3, owned_currency_network_contract, gas_values_snapshot, batch_size
+):
+    creditors = make_addresses(batch_size)
+    debtors = make_addresses(batch_size, offset=batch_size + 1)
+    accounts_to_set = [
+        (creditor, debtor, 100, 150, 1, 2, False, 123456, 10)
+        for creditor, debtor in zip(creditors, debtors)
+    ]
+
+    tx_hash = owned_currency_network_contract.functions.setAccounts(
+        accounts_to_set
+    ).transact()
+
+    gas_used = web3.eth.getTransactionReceipt(tx_hash)["gasUsed"]
+    gas_values_snapshot.assert_gas_costs_match(
+        f"SET_ACCOUNTS_PER_ACCOUNT_BATCH_{batch_size}", gas_used // batch_size
+    )
+
+
+@pytest.mark.gas_costs
+@pytest.mark.parametrize("batch_size", [1, 10, 50])
+def test_cost_set_debts_per_debt(
+    web3, owned_currency_network_contract, gas_values_snapshot, batch_size
+):
+    debtors = make_addresses(batch_size)
+    creditors = make_addresses(batch_size, offset=batch_size + 1)
+
+    tx_hash = owned_currency_network_contract.functions.setDebts(
+        debtors, creditors, [123] * batch_size
+    ).transact()
+
+    gas_used = web3.eth.getTransactionReceipt(tx_hash)["gasUsed"]
+    gas_values_snapshot.assert_gas_costs_match(
+        f"SET_DEBTS_PER_DEBT_BATCH_{batch_size}", gas_used // batch_size
+    )
+
+
+@pytest.mark.gas_costs
+@pytest.mark.parametrize("batch_size", [1, 10, 50])
+def test_cost_set_onboarders_per_onboarder(
+    web3, owned_currency_network_contract, gas_values_snapshot, batch_size
+):
+    users = make_addresses(batch_size)
+    on_boarders = make_addresses(batch_size, offset=batch_size + 1)
+
+    tx_hash = owned_currency_network_contract.functions.setOnboarders(
+        users, on_boarders
+    ).transact()
+
+    gas_used = web3.eth.getTransactionReceipt(tx_hash)["gasUsed"]
+    gas_values_snapshot.assert_gas_costs_match(
+        f"SET_ONBOARDERS_PER_ONBOARDER_BATCH_{batch_size}", gas_used // batch_size
+    )
+
+
+@pytest.mark.gas_costs
+@pytest.mark.parametrize(
+    "gas_per_item, single_setter_key, batch_key",
+    [
+        (SET_ACCOUNT_GAS_PER_ITEM, "SET_ACCOUNT", "SET_ACCOUNTS_PER_ACCOUNT_BATCH"),
+        (SET_DEBT_GAS_PER_ITEM, "SET_DEBT", "SET_DEBTS_PER_DEBT_BATCH"),
+        (
+            SET_ON_BOARDER_GAS_PER_ITEM,
+            "SET_ONBOARDER",
+            "SET_ONBOARDERS_PER_ONBOARDER_BATCH",
+        ),
+    ],
+)
+def test_migration_gas_per_item_bounds(
+    gas_values_snapshot, gas_per_item, single_setter_key, batch_key
+):
+    """The gas per item used to size the batches of the migration is derived from the single setter
+    and has to cover the gas of the batch setters, as recorded by the `test_cost_set_*_per_*` tests"""
+    single_setter_cost = gas_values_snapshot.data[single_setter_key].cost
+    assert (
+        gas_per_item
+        == -(-(single_setter_cost - TRANSACTION_BASE_GAS) * 105 // 100 // 1000) * 1000
+    )
+    for batch_size in [1, 10, 50]:
+        key = f"{batch_key}_{batch_size}"
+        assert key in gas_values_snapshot.data, f"No gas values recorded for {key}"
+        # The recorded cost is the gas used by the batch divided by the batch size, rounded down
+        gas_used_bound = (gas_values_snapshot.data[key].cost + 1) * batch_size
+        assert gas_used_bound <= TRANSACTION_BASE_GAS + gas_per_item * batch_size
@@ -0,0 +1,183 @@
+#! pytest
+
+import time
+
+import pytest
+from tldeploy.core import NetworkSettings
+from tldeploy.graph_state import TrustlineGraphState, TrustlineRequest
+from tldeploy.migration import CurrencyNetworkEventIndex
+from tldeploy.simulation import Account
+
+from tests.currency_network.conftest import deploy_test_network
+
+"""
+Tests that the trustline graph state bootstrapped from a currency network and synced via its events
+equals the state of the contract after all kinds of trustline, transfer and debt operations.
+"""
+
+SECONDS_PER_YEAR = 60 * 60 * 24 * 365
+
+
+@pytest.fixture()
+def expiration_time():
+    return int(time.time()) + 10 * SECONDS_PER_YEAR
+
+
+@pytest.fixture()
+def currency_network_contract(web3, expiration_time):
+    return deploy_test_network(
+        web3,
+        NetworkSettings(
+            fee_divisor=100, custom_interests=True, expiration_time=expiration_time
+        ),
+    )
+
+
+def open_trustline(contract, a, b, creditline_given, creditline_received):
+    contract.functions.updateTrustline(
+        b, creditline_given, creditline_received, 100, 200, False
+    ).transact({"from": a})
+    contract.functions.updateTrustline(
+        a, creditline_received, creditline_given, 200, 100, False
+    ).transact({"from": b})
+
+
+def assert_state_equals_contract(state, contract, users):
+    functions = contract.functions
+    simulator = state.simulator
+    assert simulator.get_users() == functions.getUsers().call()
+    assert simulator.is_network_frozen == functions.isNetworkFrozen().call()
+    for a in users:
+        assert simulator.get_friends(a) == functions.getFriends(a).call()
+        for b in users:
+            if a != b:
+                assert simulator.get_account(a, b) == Account(
+                    *functions.getAccount(a, b).call()
+                )
+                assert state.get_debt(a, b) == functions.getDebt(a, b).call()
+
+    pending_requests = {
+        TrustlineRequest.from_event(event)
+        for event in CurrencyNetworkEventIndex(
+            contract
+        ).pending_trustline_update_requests()
+    }
+    assert set(state.get_trustline_requests()) == pending_requests
+
+
+def make_changes(contract, chain, accounts, expiration_time):
+    functions = contract.functions
+    open_trustline(contract, accounts[2], accounts[3], 1000, 2000)
+    open_trustline(contract, accounts[3], accounts[4], 1000, 1000)
+    functions.transfer(100, 10, [accounts[2], accounts[3], accounts[4]], b"").transact(
+        {"from": accounts[2]}
+    )
+    # Pending and cancelled requests
+    functions.updateTrustline(accounts[5], 10, 20, 0, 0, False).transact(
+        {"from": accounts[4]}
+    )
+    functions.updateTrustline(accounts[0], 10, 20, 0, 0, False).transact(
+        {"from": accounts[5]}
+    )
+    functions.cancelTrustlineUpdate(accounts[0]).transact({"from": accounts[5]})
+    # Interests and changed interest rates
+    chain.time_travel(int(time.time()) + SECONDS_PER_YEAR)
+    functions.applyInterests(accounts[3]).transact({"from": accounts[2]})
+    open_trustline(contract, accounts[3], accounts[4], 3000, 1000)
+    # Closed trustline
+    open_trustline(contract, accounts[1], accounts[4], 100, 100)
+    open_trustline(contract, accounts[1], accounts[3], 100, 100)
+    functions.closeTrustline(accounts[4]).transact({"from": accounts[1]})
+    # Debts
+    functions.increaseDebt(accounts[0], 50).transact({"from": accounts[2]})
+    functions.increaseDebt(accounts[2], 20).transact({"from": accounts[0]})
+    functions.increaseDebt(accounts[1], 20).transact({"from": accounts[0]})
+    functions.increaseDebt(accounts[0], 20).transact({"from": accounts[1]})
+    # Frozen network
+    chain.time_travel(expiration_time)
+    functions.freezeNetwork().transact()
+
+
+def test_sync_equals_contract(
+    currency_network_contract, chain, accounts, expiration_time
+):
+    contract = currency_network_contract
+    users = accounts[:6]
+    contract.functions.setAccount(
+        accounts[0], accounts[1], 100, 200, 0, 0, False, 0, 50
+    ).transact()
+    open_trustline(contract, accounts[1], accounts[2], 500, 500)
+    contract.functions.updateTrustline(accounts[3], 10, 20, 0, 0, False).transact(
+        {"from": accounts[0]}
+    )
+    contract.functions.increaseDebt(accounts[1], 30).transact({"from": accounts[0]})
+
+    state = TrustlineGraphState.bootstrap(contract)
+    assert_state_equals_contract(state, contract, users)
+
+    make_changes(contract, chain, accounts, expiration_time)
+    assert state.sync() > 0
+    assert_state_equals_contract(state, contract, users)
+    assert state.sync() == 0
+
+
+def test_sync_from_empty_network(
+    currency_network_contract, chain, accounts, expiration_time
+):
+    contract = currency_network_contract
+    state = TrustlineGraphState.bootstrap(contract)
+    assert state.simulator.get_users() == []
+
+    make_changes(contract, chain, accounts, expiration_time)
+    state.sync()
+    assert_state_equals_contract(state, contract, accounts[:6])
+
+
+def test_applying_events_again_is_harmless(
+    currency_network_contract, chain, accounts, expiration_time
+):
+    contract = currency_network_contract
+    state = TrustlineGraphState.bootstrap(contract)
+    make_changes(contract, chain, accounts, expiration_time)
+    state.sync()
+
+    state.next_block = 0
+    state.sync()
+    assert_state_equals_contract(state, contract, accounts[:6])
+
+
+def test_snapshot(
+    currency_network_contract, chain, accounts, expiration_time, tmp_path
+):
+    contract = currency_network_contract
+    open_trustline(contract, accounts[0], accounts[1], 100, 200)
+    contract.functions.updateTrustline(accounts[0], 10, 20, 100, 200, True).transact(
+        {"from": accounts[1]}
+    )
+    snapshot_path = str(tmp_path / "snapshot.json")
+    TrustlineGraphState.bootstrap(contract).save_snapshot(snapshot_path)
+
+    state = TrustlineGraphState.load_snapshot(contract, snapshot_path)
+    assert_state_equals_contract(state, contract, accounts[:6])
+
+    make_changes(contract, chain, accounts, expiration_time)
+    state.sync()
+    state.save_snapshot(snapshot_path)
+    state = TrustlineGraphState.load_snapshot(contract, snapshot_path)
+    assert_state_equals_contract(state, contract, accounts[:6])
+    assert state.sync() == 0
+
+
+def test_snapshot_of_other_network(
+    currency_network_contract, web3, expiration_time, tmp_path
+):
+    snapshot_path = str(tmp_path / "snapshot.json")
+    TrustlineGraphState.bootstrap(currency_network_contract).save_snapshot(
+        snapshot_path
+    )
+    other_contract = deploy_test_network(
+        web3, NetworkSettings(expiration_time=expiration_time)
+    )
+
+    with pytest.raises(ValueError):
+        TrustlineGraphState.load_snapshot(other_contract, snapshot_path)
@@ -0,0 +1,121 @@
+#! pytest
+
+import csv
+import io
+
+import pytest
+from tldeploy.interest_report import (
+    REPORT_COLUMNS,
+    InterestAccrual,
+    calculate_interest_accruals,
+    generate_interest_report,
+    interest_report_to_columns,
+    write_interest_report_csv,
+)
+
+from tests.currency_network.test_event_store import (
+    deploy_network_with_trustlines,
+    make_transfers,
+    transfers,
+    trustlines,
+)
+from tests.currency_network.test_information_from_events import (
+    get_interests_for_trustline,
+)
+
+"""
+Tests of the interest report against `get_interests_for_trustline`, which replays the history of every trustline.
+"""
+
+
+@pytest.fixture()
+def currency_network_contract(web3, accounts, chain):
+    contract = deploy_network_with_trustlines(web3, accounts)
+    make_transfers(web3, chain, contract, accounts, transfers)
+    return contract
+
+
+def interests_per_user(interest_accruals):
+    return {
+        (
+            interest_accrual.user,
+            interest_accrual.counterparty,
+        ): interest_accrual.interests
+        for interest_accrual in interest_accruals
+    }
+
+
+def test_interests_equal_replayed_history(currency_network_contract, accounts):
+    interests = interests_per_user(
+        calculate_interest_accruals(currency_network_contract)
+    )
+
+    assert interests
+    for (A, B, _, _) in trustlines:
+        a, b = accounts[A], accounts[B]
+        expected_interests = sum(
+            get_interests_for_trustline(currency_network_contract, a, b)
+        )
+        assert interests.get((a, b), 0) == expected_interests
+        assert interests.get((b, a), 0) == -expected_interests
+
+
+def test_interests_of_periods_add_up(web3, currency_network_contract):
+    all_interests = interests_per_user(
+        calculate_interest_accruals(currency_network_contract)
+    )
+    timestamps = sorted(
+        {
+            web3.eth.getBlock(event["blockNumber"])["timestamp"]
+            for event in currency_network_contract.events.BalanceUpdate().getLogs(
+                fromBlock=0
+            )
+        }
+    )
+    middle = timestamps[len(timestamps) // 2]
+
+    first_period = interests_per_user(
+        calculate_interest_accruals(currency_network_contract, to_timestamp=middle)
+    )
+    second_period = interests_per_user(
+        calculate_interest_accruals(currency_network_contract, from_timestamp=middle)
+    )
+
+    assert first_period and second_period
+    for users, interests in all_interests.items():
+        assert first_period.get(users, 0) + second_period.get(users, 0) == interests
+
+
+def test_report_of_multiple_networks(web3, accounts, currency_network_contract):
+    other_contract = deploy_network_with_trustlines(web3, accounts)
+
+    report = list(generate_interest_report([currency_network_contract, other_contract]))
+
+    assert {interest_accrual.currency_network for interest_accrual in report} == {
+        currency_network_contract.address
+    }
+
+
+def test_write_csv(currency_network_contract):
+    report = list(calculate_interest_accruals(currency_network_contract))
+    file = io.StringIO()
+
+    assert write_interest_report_csv(file, report) == len(report)
+
+    rows = list(csv.reader(io.StringIO(file.getvalue())))
+    assert rows[0] == REPORT_COLUMNS
+    assert [
+        InterestAccrual(network, user, counterparty, int(interests))
+        for network, user, counterparty, interests in rows[1:]
+    ] == report
+
+
+def test_columns(currency_network_contract):
+    report = list(calculate_interest_accruals(currency_network_contract))
+
+    columns = interest_report_to_columns(report)
+
+    assert list(columns) == REPORT_COLUMNS
+    assert columns["interests"] == [
+        interest_accrual.interests for interest_accrual in report
+    ]
@@ -3,12 +3,29 @@
 import pytest
 from tldeploy.core import (
     NetworkSettings,
+    deploy_multicall,
 )
 from tldeploy.migration import (
+    CurrencyNetworkEventIndex,
     NetworkMigrater,
+    NetworkMigrationVerifier,
+    SafeAddressMapper,
+    UnresolvedTransactionError,
+    account_journal_key,
+    get_all_debts_of_currency_network,
     get_last_frozen_status_of_account,
+    get_pending_trustline_update_requests,
+    get_safe_address,
     gnosis_safe_user_address,
 )
+from tldeploy.journal import (
+    MigrationJournal,
+    CONFIRMED,
+    FAILED,
+    SENT,
+    read_json_lines,
+)
+from tldeploy.multicall import Multicall
 
 from tests.currency_network.conftest import (
     NO_ONBOARDER,
@@ -142,6 +159,33 @@ def new_contract_adapter(new_contract, make_currency_network_adapter):
     return make_currency_network_adapter(new_contract)
 
 
+@pytest.fixture()
+def fresh_new_contract(web3, owner):
+    """A new network to migrate to that is not shared with the other tests"""
+    return deploy_ownable_network(
+        web3,
+        NetworkSettings(custom_interests=True),
+        transaction_options={"from": owner},
+    )
+
+
+@pytest.fixture(scope="session")
+def make_network_migrater(web3, owner, old_contract, get_migrated_user_address):
+    def make_migrater(new_contract, **kwargs):
+        return NetworkMigrater(
+            web3_source=web3,
+            web3_dest=web3,
+            old_currency_network_address=old_contract.address,
+            new_currency_network_address=new_contract.address,
+            get_migrated_user_address=get_migrated_user_address,
+            transaction_options_source={"from": owner},
+            transaction_options_dest={"from": owner},
+            **kwargs,
+        )
+
+    return make_migrater
+
+
 @pytest.fixture(scope="session")
 def assert_accounts_migrated(new_contract, accounts, get_migrated_user_address):
     def assert_migrated():
@@ -315,6 +359,242 @@ def test_migrate_network_accounts(network_migrater, assert_accounts_migrated):
     assert_accounts_migrated()
 
 
+def test_migrate_network_accounts_with_read_workers(
+    fresh_new_contract,
+    make_network_migrater,
+    accounts,
+    get_migrated_user_address,
+    serialized_web3_requests,
+):
+    new_contract = fresh_new_contract
+    make_network_migrater(new_contract, read_workers=4).migrate_accounts()
+
+    for (first_user, second_user, credit_given, credit_received, _) in trustlines:
+        (
+            effective_credit_given,
+            effective_credit_received,
+            *rest,
+        ) = new_contract.functions.getAccount(
+            get_migrated_user_address(accounts[first_user]),
+            get_migrated_user_address(accounts[second_user]),
+        ).call()
+        assert effective_credit_given == credit_given
+        assert effective_credit_received == credit_received
+
+
+def test_migrate_network_in_batches(
+    fresh_new_contract,
+    make_network_migrater,
+    accounts,
+    get_migrated_user_address,
+    on_boarders,
+    on_boardees,
+    creditors,
+    debtors,
+    debt_values,
+):
+    new_contract = fresh_new_contract
+    network_migrater = make_network_migrater(new_contract, batch_gas_budget=1_000_000)
+
+    network_migrater.migrate_accounts()
+    network_migrater.migrate_on_boarders()
+    network_migrater.migrate_debts()
+
+    for (first_user, second_user, credit_given, credit_received, _) in trustlines:
+        (
+            effective_credit_given,
+            effective_credit_received,
+            *rest,
+        ) = new_contract.functions.getAccount(
+            get_migrated_user_address(accounts[first_user]),
+            get_migrated_user_address(accounts[second_user]),
+        ).call()
+        assert effective_credit_given == credit_given
+        assert effective_credit_received == credit_received
+    for (on_boarder, on_boardee) in zip(on_boarders, on_boardees):
+        assert new_contract.functions.onboarder(
+            get_migrated_user_address(on_boardee)
+        ).call() == get_migrated_user_address(on_boarder)
+    for (creditor, debtor, debt_value) in zip(creditors, debtors, debt_values):
+        assert (
+            new_contract.functions.getDebt(
+                get_migrated_user_address(debtor), get_migrated_user_address(creditor)
+            ).call()
+            == debt_value
+        )
+
+
+def test_journal_records_migrated_accounts(
+    tmp_path, fresh_new_contract, make_network_migrater, old_contract, accounts
+):
+    journal = MigrationJournal(str(tmp_path / "journal.jsonl"))
+    make_network_migrater(fresh_new_contract, journal=journal).migrate_accounts()
+
+    reloaded_journal = MigrationJournal(str(tmp_path / "journal.jsonl"))
+    for (first_user, second_user, *rest) in trustlines:
+        user, friend = sorted([accounts[first_user], accounts[second_user]])
+        assert (
+            reloaded_journal.get_status(
+                old_contract.address, "account", account_journal_key(friend, user)
+            )
+            == CONFIRMED
+        )
+    assert reloaded_journal.in_flight_records(old_contract.address) == []
+
+
+def test_journal_records_nonces_of_sent_transactions(
+    tmp_path, web3, owner, fresh_new_contract, make_network_migrater, old_contract
+):
+    journal = MigrationJournal(str(tmp_path / "journal.jsonl"))
+    nonce = web3.eth.getTransactionCount(owner)
+    make_network_migrater(fresh_new_contract, journal=journal).migrate_accounts()
+
+    records = [
+        record
+        for record in read_json_lines(str(tmp_path / "journal.jsonl"))
+        if record["status"] == SENT
+    ]
+    assert {record["sender"] for record in records} == {owner}
+    assert sorted({record["nonce"] for record in records}) == list(
+        range(nonce, web3.eth.getTransactionCount(owner))
+    )
+
+
+def test_journal_skips_journaled_accounts(
+    tmp_path, web3, owner, make_network_migrater, accounts, get_migrated_user_address
+):
+    journal = MigrationJournal(str(tmp_path / "journal.jsonl"))
+    first_new_contract, second_new_contract = [
+        deploy_ownable_network(
+            web3,
+            NetworkSettings(custom_interests=True),
+            transaction_options={"from": owner},
+        )
+        for _ in range(2)
+    ]
+    make_network_migrater(first_new_contract, journal=journal).migrate_accounts()
+
+    make_network_migrater(second_new_contract, journal=journal).migrate_accounts()
+
+    for (first_user, second_user, *rest) in trustlines:
+        (
+            creditline_given,
+            creditline_received,
+            *rest,
+        ) = second_new_contract.functions.getAccount(
+            get_migrated_user_address(accounts[first_user]),
+            get_migrated_user_address(accounts[second_user]),
+        ).call()
+        assert creditline_given == creditline_received == 0
+
+
+def test_journal_resumes_in_flight_transactions(
+    tmp_path, web3, owner, fresh_new_contract, make_network_migrater, old_contract
+):
+    journal = MigrationJournal(str(tmp_path / "journal.jsonl"))
+    tx_hash = fresh_new_contract.functions.unfreezeNetwork().transact({"from": owner})
+    journal.record(
+        old_contract.address, "unfreeze", "", SENT, tx_hash=tx_hash.hex(), chain="dest"
+    )
+    # A transaction unknown to the node whose nonce was used by another transaction
+    journal.record(
+        old_contract.address,
+        "remove_owner",
+        "",
+        SENT,
+        tx_hash="0x" + "12" * 32,
+        chain="dest",
+        nonce=0,
+        sender=owner,
+    )
+
+    make_network_migrater(
+        fresh_new_contract, journal=journal, receipt_timeout=0.1
+    ).resume_in_flight_transactions()
+
+    assert journal.get_status(old_contract.address, "unfreeze", "") == CONFIRMED
+    assert journal.get_status(old_contract.address, "remove_owner", "") == FAILED
+    assert journal.in_flight_records(old_contract.address) == []
+
+
+def test_journal_keeps_transactions_that_might_be_mined(
+    tmp_path, web3, owner, fresh_new_contract, make_network_migrater, old_contract
+):
+    journal = MigrationJournal(str(tmp_path / "journal.jsonl"))
+    journal.record(
+        old_contract.address,
+        "remove_owner",
+        "",
+        SENT,
+        tx_hash="0x" + "12" * 32,
+        chain="dest",
+    )
+
+    with pytest.raises(UnresolvedTransactionError):
+        make_network_migrater(
+            fresh_new_contract, journal=journal, receipt_timeout=0.1
+        ).resume_in_flight_transactions()
+
+    assert journal.get_status(old_contract.address, "remove_owner", "") == SENT
+
+
+def test_journal_does_not_resend_debts_mined_late(
+    tmp_path,
+    web3,
+    owner,
+    fresh_new_contract,
+    make_network_migrater,
+    old_contract,
+    get_migrated_user_address,
+):
+    journal = MigrationJournal(str(tmp_path / "journal.jsonl"))
+    network_migrater = make_network_migrater(
+        fresh_new_contract, journal=journal, receipt_timeout=0.1
+    )
+    debts = network_migrater.old_network_events.debts
+    debtor = next(iter(debts))
+    creditor, debt_value = next(iter(debts[debtor].items()))
+    debt_journal_key = account_journal_key(debtor, creditor)
+    ethereum_tester = web3.provider.ethereum_tester
+    ethereum_tester.disable_auto_mine_transactions()
+    try:
+        tx_hash = fresh_new_contract.functions.setDebt(
+            get_migrated_user_address(debtor),
+            get_migrated_user_address(creditor),
+            debt_value,
+        ).transact({"from": owner, "gas": 1_000_000})
+        journal.record(
+            old_contract.address,
+            "debt",
+            debt_journal_key,
+            SENT,
+            tx_hash=tx_hash.hex(),
+            chain="dest",
+        )
+
+        with pytest.raises(UnresolvedTransactionError):
+            network_migrater.resume_in_flight_transactions()
+        assert (
+            journal.get_status(old_contract.address, "debt", debt_journal_key) == SENT
+        )
+    finally:
+        # Mines the timed out transaction
+        ethereum_tester.enable_auto_mine_transactions()
+
+    network_migrater.resume_in_flight_transactions()
+    network_migrater.migrate_debts()
+
+    assert (
+        journal.get_status(old_contract.address, "debt", debt_journal_key) == CONFIRMED
+    )
+    assert (
+        fresh_new_contract.functions.getDebt(
+            get_migrated_user_address(debtor), get_migrated_user_address(creditor)
+        ).call()
+        == debt_value
+    )
+
+
 def test_migrate_network_on_boarders(network_migrater, assert_on_boarders_migrated):
     network_migrater.migrate_on_boarders()
     assert_on_boarders_migrated()
@@ -363,6 +643,37 @@ def test_migrate_network_global(
     assert new_contract.functions.owner().call() == ADDRESS_0
 
 
+@pytest.mark.parametrize("use_multicall", [False, True])
+def test_verify_migrated_network(
+    web3,
+    old_contract,
+    fresh_new_contract,
+    make_network_migrater,
+    get_migrated_user_address,
+    use_multicall,
+    capsys,
+):
+    make_network_migrater(fresh_new_contract).migrate_network()
+    capsys.readouterr()
+
+    multicall = None
+    if use_multicall:
+        multicall = Multicall(web3, deploy_multicall(web3=web3).address)
+    NetworkMigrationVerifier(
+        web3,
+        web3,
+        old_contract.address,
+        fresh_new_contract.address,
+        get_migrated_user_address,
+        multicall_source=multicall,
+        multicall_dest=multicall,
+    ).verify_migration()
+
+    output = capsys.readouterr().out
+    assert "verification failed" not in output
+    assert "Debts migration verified" in output
+
+
 def test_get_last_frozen_status_of_account(old_contract_adapter, accounts):
     old_contract_adapter.freeze_network_if_not_frozen()
     for (
@@ -390,6 +701,31 @@ def test_get_last_frozen_status_of_account(old_contract_adapter, accounts):
         )
 
 
+@pytest.mark.parametrize("initial_block_range", [1, 7, 10_000])
+def test_event_index_matches_queries(old_contract, accounts, initial_block_range):
+    event_index = CurrencyNetworkEventIndex(
+        old_contract, initial_block_range=initial_block_range
+    )
+
+    for (first_user, second_user, _, _, is_frozen) in trustlines:
+        assert (
+            event_index.get_last_frozen_status_of_account(
+                accounts[first_user], accounts[second_user]
+            )
+            == get_last_frozen_status_of_account(
+                old_contract, accounts[first_user], accounts[second_user]
+            )
+            == is_frozen
+        )
+    assert event_index.debts == get_all_debts_of_currency_network(old_contract)
+    assert event_index.pending_trustline_update_requests() == (
+        get_pending_trustline_update_requests(old_contract)
+    )
+    assert len(event_index.pending_trustline_update_requests()) == len(
+        pending_trustlines_requests
+    )
+
+
 def test_gnosis_safe_user_address():
     # test data taken from e2e tests with safe-relay
     assert (
@@ -401,3 +737,64 @@ def test_gnosis_safe_user_address():
         )
         == "0xf6ab4D3509cdF9d4a71AFC3Bae6faa92204fD8fc"
     )
+
+
+MASTER_COPY_ADDRESS = "0xea56b73C2FbA87D10913DC721396F1d87ed73A66"
+PROXY_FACTORY_ADDRESS = "0x74bF4E15576B145dfc51de0484d9553c50DF2645"
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_safe_address_mapper(web3, accounts, max_workers):
+    mapper = SafeAddressMapper(
+        web3, MASTER_COPY_ADDRESS, PROXY_FACTORY_ADDRESS, max_workers=max_workers
+    )
+
+    users = accounts[:5] + accounts[:2]
+    assert mapper.get_safe_addresses(users) == [
+        get_safe_address(user, MASTER_COPY_ADDRESS, PROXY_FACTORY_ADDRESS, web3)
+        for user in users
+    ]
+    assert mapper(accounts[6]) == get_safe_address(
+        accounts[6], MASTER_COPY_ADDRESS, PROXY_FACTORY_ADDRESS, web3
+    )
+
+
+def test_safe_address_mapper_cache_file(web3, accounts, tmp_path):
+    cache_file_path = str(tmp_path / "safe_addresses.jsonl")
+    safe_addresses = SafeAddressMapper(
+        web3,
+        MASTER_COPY_ADDRESS,
+        PROXY_FACTORY_ADDRESS,
+        cache_file_path=cache_file_path,
+    ).get_safe_addresses(accounts[:3])
+
+    # The addresses are read from the file, no connection to the chain is needed
+    cached_mapper = SafeAddressMapper(
+        None,
+        MASTER_COPY_ADDRESS,
+        PROXY_FACTORY_ADDRESS,
+        cache_file_path=cache_file_path,
+    )
+    assert cached_mapper.get_safe_addresses(accounts[:3]) == safe_addresses
+
+
+def test_safe_address_mapper_cache_file_after_truncated_last_line(
+    web3, accounts, tmp_path
+):
+    cache_file_path = str(tmp_path / "safe_addresses.jsonl")
+    with open(cache_file_path, "w") as file:
+        file.write('{"user": "0x01", "mas')
+    safe_addresses = SafeAddressMapper(
+        web3,
+        MASTER_COPY_ADDRESS,
+        PROXY_FACTORY_ADDRESS,
+        cache_file_path=cache_file_path,
+    ).get_safe_addresses(accounts[:3])
+
+    cached_mapper = SafeAddressMapper(
+        None,
+        MASTER_COPY_ADDRESS,
+        PROXY_FACTORY_ADDRESS,
+        cache_file_path=cache_file_path,
+    )
+    assert cached_mapper.get_safe_addresses(accounts[:3]) == safe_addresses
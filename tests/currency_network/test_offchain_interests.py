@@ -0,0 +1,142 @@
+#! pytest
+
+import random
+
+import pytest
+from tldeploy.interests import (
+    MAX_BALANCE,
+    MAX_INTEREST_RATE,
+    MIN_BALANCE,
+    MIN_INTEREST_RATE,
+    SECONDS_PER_YEAR,
+    balance_with_interests,
+    calculate_balance_with_interests,
+)
+
+"""
+Differential tests of the off-chain interest calculation against the contract function
+`calculateBalanceWithInterests`. Apart from edge cases, the inputs are randomly generated with a fixed seed
+to cover the whole input space while keeping the tests reproducible.
+"""
+
+NUMBER_OF_RANDOM_CASES = 300
+MAX_UINT_256 = 2**256 - 1
+
+edge_cases = [
+    (0, 0, SECONDS_PER_YEAR, 1000, 1000),
+    (1000, 0, SECONDS_PER_YEAR, 0, 1000),
+    (1000, 0, SECONDS_PER_YEAR, 1000, 0),
+    (-1000, 0, SECONDS_PER_YEAR, 1000, 0),
+    (1000, 0, 0, 1000, 1000),
+    (-1, 0, SECONDS_PER_YEAR, 1, 1),
+    (-1, 0, SECONDS_PER_YEAR, -1, -1),
+    (MAX_BALANCE, 0, SECONDS_PER_YEAR, 1000, 0),
+    (MIN_BALANCE, 0, SECONDS_PER_YEAR, 0, 1000),
+    (MAX_BALANCE, 0, SECONDS_PER_YEAR, MIN_INTEREST_RATE, 0),
+    (MIN_BALANCE, 0, SECONDS_PER_YEAR, 0, MIN_INTEREST_RATE),
+    (MAX_BALANCE - 10, 0, SECONDS_PER_YEAR, 1000, 1000),
+    (1000, 0, 2**32 - 1, MAX_INTEREST_RATE, 0),
+    (1000, 0, 2**32 - 1, MIN_INTEREST_RATE, 0),
+    (-1000, 0, 2**32 - 1, 0, MAX_INTEREST_RATE),
+    (-1000, 0, 2**32 - 1, 0, MIN_INTEREST_RATE),
+    (MAX_BALANCE, 0, 100 * SECONDS_PER_YEAR, MIN_INTEREST_RATE, MIN_INTEREST_RATE),
+    (MIN_BALANCE, 0, 100 * SECONDS_PER_YEAR, MIN_INTEREST_RATE, MIN_INTEREST_RATE),
+    (MAX_BALANCE, 0, 2**100, MAX_INTEREST_RATE, MAX_INTEREST_RATE),
+    (MIN_BALANCE, 0, 2**100, MIN_INTEREST_RATE, MIN_INTEREST_RATE),
+    (1, 0, 2**255 - 1, 1, 1),
+    (1, 0, 2**255, 1, 1),
+    (1, 0, MAX_UINT_256, 1, 1),
+    (1000, 1, 0, 1000, 1000),
+    (1000, MAX_UINT_256, MAX_UINT_256, 1000, 1000),
+]
+
+
+def random_log_uniform(rng, max_value):
+    """Return a random value in [0, max_value] with a uniformly distributed bit length"""
+    return min(rng.randrange(2 ** rng.randint(0, max_value.bit_length())), max_value)
+
+
+def generate_random_cases(seed, number_of_cases):
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(number_of_cases):
+        balance = random_log_uniform(rng, MAX_BALANCE) * rng.choice([1, -1])
+        start_time = random_log_uniform(rng, 2**40)
+        # Mostly realistic time differences, sometimes huge ones that overflow
+        max_delta_time = rng.choice(
+            [SECONDS_PER_YEAR, 100 * SECONDS_PER_YEAR, 2**200]
+        )
+        end_time = start_time + random_log_uniform(rng, max_delta_time)
+        interest_rate_given = rng.randint(MIN_INTEREST_RATE, MAX_INTEREST_RATE)
+        interest_rate_received = rng.randint(MIN_INTEREST_RATE, MAX_INTEREST_RATE)
+        cases.append(
+            (
+                balance,
+                start_time,
+                end_time,
+                interest_rate_given,
+                interest_rate_received,
+            )
+        )
+    return cases
+
+
+@pytest.fixture(scope="session")
+def currency_network_contract(deploy_contract):
+    return deploy_contract("CurrencyNetwork")
+
+
+@pytest.mark.parametrize(
+    "balance, start_time, end_time, interest_rate_given, interest_rate_received",
+    edge_cases + generate_random_cases(0, NUMBER_OF_RANDOM_CASES),
+)
+def test_calculate_balance_with_interests_equals_contract(
+    currency_network_contract,
+    assert_failing_call,
+    balance,
+    start_time,
+    end_time,
+    interest_rate_given,
+    interest_rate_received,
+):
+    function_call = currency_network_contract.functions.calculateBalanceWithInterests(
+        balance, start_time, end_time, interest_rate_given, interest_rate_received
+    )
+    try:
+        offchain_balance = calculate_balance_with_interests(
+            balance, start_time, end_time, interest_rate_given, interest_rate_received
+        )
+    except ValueError:
+        assert_failing_call(function_call)
+    else:
+        assert offchain_balance == function_call.call()
+
+
+@pytest.mark.parametrize(
+    "balance, start_time, end_time, interest_rate_given, interest_rate_received",
+    [
+        (MAX_BALANCE + 1, 0, SECONDS_PER_YEAR, 1000, 1000),
+        (MIN_BALANCE - 1, 0, SECONDS_PER_YEAR, 1000, 1000),
+        (1000, 0, SECONDS_PER_YEAR, MAX_INTEREST_RATE + 1, 1000),
+        (1000, 0, SECONDS_PER_YEAR, 1000, MIN_INTEREST_RATE - 1),
+        (1000, -1, SECONDS_PER_YEAR, 1000, 1000),
+        (1000, 0, MAX_UINT_256 + 1, 1000, 1000),
+    ],
+)
+def test_calculate_balance_with_interests_invalid_input(
+    balance, start_time, end_time, interest_rate_given, interest_rate_received
+):
+    with pytest.raises(ValueError):
+        calculate_balance_with_interests(
+            balance, start_time, end_time, interest_rate_given, interest_rate_received
+        )
+
+
+@pytest.mark.parametrize("delta_time", [-60, -1, 0])
+def test_balance_with_interests_small_negative_delta_time(delta_time):
+    assert balance_with_interests(1000, 1000, 1000, delta_time) == 1000
+
+
+def test_balance_with_interests_negative_delta_time_out_of_bounds():
+    with pytest.raises(ValueError):
+        balance_with_interests(1000, 1000, 1000, -61)
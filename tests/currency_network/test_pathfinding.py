@@ -0,0 +1,347 @@
+#! pytest
+
+import random
+import time
+
+import pytest
+from tldeploy.pathfinding import PathFinder, PaymentPath
+from tldeploy.simulation import CurrencyNetworkSimulator, TransferFailed
+
+"""
+Tests of the path finder against a brute force search over all simple paths of small random networks,
+where every path is simulated with the `CurrencyNetworkSimulator`.
+"""
+
+SECONDS_PER_YEAR = 60 * 60 * 24 * 365
+NUMBER_OF_USERS = 6
+MAX_UINT_64 = 2**64 - 1
+
+network_parameters = [(0, 0), (100, 0), (3, 0), (100, 1000), (1, 0)]
+
+
+def generate_simulator(
+    rng,
+    users,
+    fee_divisor,
+    max_interest_rate,
+    timestamp,
+    prevent_mediator_interests=False,
+):
+    simulator = CurrencyNetworkSimulator(
+        capacity_imbalance_fee_divisor=fee_divisor,
+        prevent_mediator_interests=prevent_mediator_interests,
+    )
+    edges = [(users[i], users[(i + 1) % len(users)]) for i in range(len(users))]
+    edges += [(users[0], users[3]), (users[1], users[4]), (users[2], users[4])]
+    for a, b in edges:
+        creditline_given = rng.randrange(10 ** rng.randint(0, 6))
+        creditline_received = rng.randrange(10 ** rng.randint(0, 6))
+        simulator.set_account(
+            a,
+            b,
+            creditline_given,
+            creditline_received,
+            rng.randint(0, max_interest_rate),
+            rng.randint(0, max_interest_rate),
+            is_frozen=rng.random() < 0.05,
+            mtime=timestamp - rng.randint(0, SECONDS_PER_YEAR),
+            balance=rng.randint(-creditline_received, creditline_given),
+        )
+    return simulator
+
+
+def generate_simple_paths(simulator, source, target):
+    paths = []
+    stack = [[source]]
+    while stack:
+        path = stack.pop()
+        for friend in simulator.get_friends(path[-1]):
+            if friend == target:
+                paths.append(path + [friend])
+            elif friend not in path:
+                stack.append(path + [friend])
+    return paths
+
+
+def find_path_brute_force(transfer, paths, value, max_fee, timestamp):
+    """Return the lowest fees of any path or None if no path is possible"""
+    lowest_fees = None
+    for path in paths:
+        try:
+            fees = transfer(value, max_fee, path, timestamp, commit=False).fees
+        except TransferFailed:
+            continue
+        if lowest_fees is None or fees < lowest_fees:
+            lowest_fees = fees
+    return lowest_fees
+
+
+def find_max_transferable_amount_brute_force(simulator, paths, timestamp):
+    max_value = 0
+    for path in paths:
+        # Only values higher than the current maximum are of interest
+        lower_bound, upper_bound = max_value + 1, MAX_UINT_64
+        while lower_bound <= upper_bound:
+            value = (lower_bound + upper_bound) // 2
+            try:
+                simulator.transfer_sender_pays(
+                    value, MAX_UINT_64, path, timestamp, commit=False
+                )
+            except TransferFailed:
+                upper_bound = value - 1
+            else:
+                max_value = value
+                lower_bound = value + 1
+    return max_value
+
+
+def assert_path_valid(transfer, payment_path, max_fee, timestamp):
+    result = transfer(
+        payment_path.value, max_fee, payment_path.path, timestamp, commit=False
+    )
+    assert result.fees == payment_path.fees
+
+
+@pytest.fixture()
+def users(accounts):
+    return accounts[:NUMBER_OF_USERS]
+
+
+@pytest.mark.parametrize("fee_divisor, max_interest_rate", network_parameters)
+@pytest.mark.parametrize("seed", range(3))
+def test_find_path_equals_brute_force(users, fee_divisor, max_interest_rate, seed):
+    rng = random.Random(seed)
+    timestamp = 2 * SECONDS_PER_YEAR
+    simulator = generate_simulator(
+        rng, users, fee_divisor, max_interest_rate, timestamp
+    )
+    path_finder = PathFinder(simulator, timestamp)
+
+    for _ in range(30):
+        source, target = rng.sample(users, 2)
+        value = rng.randrange(10 ** rng.randint(0, 6))
+        max_fee = rng.choice([0, rng.randrange(10 ** rng.randint(0, 4)), MAX_UINT_64])
+        paths = generate_simple_paths(simulator, source, target)
+
+        for find_path, transfer in [
+            (path_finder.find_path, simulator.transfer_sender_pays),
+            (path_finder.find_path_receiver_pays, simulator.transfer_receiver_pays),
+        ]:
+            payment_path = find_path(source, target, value, max_fee=max_fee)
+            lowest_fees = find_path_brute_force(
+                transfer, paths, value, max_fee, timestamp
+            )
+            if lowest_fees is None:
+                assert payment_path is None
+            else:
+                assert payment_path.fees == lowest_fees
+                assert payment_path.path[0] == source
+                assert payment_path.path[-1] == target
+                assert_path_valid(transfer, payment_path, max_fee, timestamp)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_find_path_prevent_mediator_interests_equals_brute_force(users, seed):
+    rng = random.Random(seed)
+    timestamp = 2 * SECONDS_PER_YEAR
+    simulator = generate_simulator(
+        rng, users, 100, 1000, timestamp, prevent_mediator_interests=True
+    )
+    # The networks are small enough to explore all candidates
+    path_finder = PathFinder(simulator, timestamp, max_candidate_paths=10**6)
+    number_of_paths_found = 0
+
+    for _ in range(30):
+        source, target = rng.sample(users, 2)
+        value = rng.randrange(10 ** rng.randint(0, 6))
+        paths = generate_simple_paths(simulator, source, target)
+
+        for find_path, transfer in [
+            (path_finder.find_path, simulator.transfer_sender_pays),
+            (path_finder.find_path_receiver_pays, simulator.transfer_receiver_pays),
+        ]:
+            payment_path = find_path(source, target, value)
+            lowest_fees = find_path_brute_force(
+                transfer, paths, value, MAX_UINT_64, timestamp
+            )
+            if lowest_fees is None:
+                assert payment_path is None
+            else:
+                assert payment_path.fees == lowest_fees
+                assert_path_valid(transfer, payment_path, MAX_UINT_64, timestamp)
+                number_of_paths_found += 1
+
+    assert number_of_paths_found > 0
+
+
+def test_find_path_prevent_mediator_interests_uses_next_candidate(users):
+    simulator = CurrencyNetworkSimulator(
+        capacity_imbalance_fee_divisor=100, prevent_mediator_interests=True
+    )
+    simulator.set_account(users[0], users[1], 1000, 1000, 0, 0)
+    # users[1] would pay interests to users[3] for the value it receives without interests
+    simulator.set_account(users[1], users[3], 1000, 1000, 0, 1000)
+    simulator.set_account(users[0], users[2], 1000, 1000, 0, 0)
+    simulator.set_account(users[2], users[4], 1000, 1000, 0, 0)
+    simulator.set_account(users[4], users[3], 1000, 1000, 0, 0)
+    path_finder = PathFinder(simulator, 0)
+
+    assert path_finder.find_path(users[0], users[3], 100) == PaymentPath(
+        100, 4, [users[0], users[2], users[4], users[3]]
+    )
+    assert (
+        PathFinder(simulator, 0, max_candidate_paths=1).find_path(
+            users[0], users[3], 100
+        )
+        is None
+    )
+
+
+def test_find_max_transferable_amount_prevent_mediator_interests(users):
+    simulator = CurrencyNetworkSimulator(
+        capacity_imbalance_fee_divisor=100, prevent_mediator_interests=True
+    )
+    simulator.set_account(users[0], users[1], 1000, 1000, 0, 0)
+    simulator.set_account(users[1], users[2], 500, 500, 0, 0)
+    path_finder = PathFinder(simulator, 0)
+
+    assert path_finder.find_path(users[2], users[0], 100) is not None
+    assert path_finder.find_max_transferable_amount(users[2], users[0]) is None
+
+
+@pytest.mark.parametrize("fee_divisor, max_interest_rate", network_parameters[:4])
+@pytest.mark.parametrize("seed", range(2))
+def test_find_max_transferable_amount_equals_brute_force(
+    users, fee_divisor, max_interest_rate, seed
+):
+    rng = random.Random(seed)
+    timestamp = 2 * SECONDS_PER_YEAR
+    simulator = generate_simulator(
+        rng, users, fee_divisor, max_interest_rate, timestamp
+    )
+    path_finder = PathFinder(simulator, timestamp)
+
+    for _ in range(3):
+        source, target = rng.sample(users, 2)
+        max_value = find_max_transferable_amount_brute_force(
+            simulator, generate_simple_paths(simulator, source, target), timestamp
+        )
+        payment_path = path_finder.find_max_transferable_amount(source, target)
+        if max_value == 0:
+            assert payment_path is None
+        else:
+            assert payment_path.value == max_value
+            assert_path_valid(
+                simulator.transfer_sender_pays, payment_path, MAX_UINT_64, timestamp
+            )
+
+
+def test_find_path_cheapest_of_two(users):
+    simulator = CurrencyNetworkSimulator(capacity_imbalance_fee_divisor=100)
+    simulator.set_account(users[0], users[1], 1000, 1000, 0, 0)
+    simulator.set_account(users[1], users[3], 1000, 1000, 0, 0)
+    # users[2] owes users[0], so that the transfer to the mediator reduces the imbalance and has no fees
+    simulator.set_account(users[0], users[2], 1000, 1000, 0, 0, balance=500)
+    simulator.set_account(users[2], users[3], 1000, 1000, 0, 0)
+    path_finder = PathFinder(simulator, 0)
+
+    assert path_finder.find_path(users[0], users[3], 100) == PaymentPath(
+        100, 0, [users[0], users[2], users[3]]
+    )
+
+
+def test_find_path_respects_capacity(users):
+    simulator = CurrencyNetworkSimulator(capacity_imbalance_fee_divisor=100)
+    simulator.set_account(users[0], users[1], 1000, 1000, 0, 0)
+    simulator.set_account(users[1], users[2], 1000, 50, 0, 0)
+    path_finder = PathFinder(simulator, 0)
+
+    assert path_finder.find_path(users[0], users[2], 100) is None
+    assert path_finder.find_path(users[2], users[0], 100) == PaymentPath(
+        100, 2, [users[2], users[1], users[0]]
+    )
+    assert path_finder.find_max_transferable_amount(users[0], users[2]) == PaymentPath(
+        50, 1, [users[0], users[1], users[2]]
+    )
+
+
+def test_find_path_ignores_frozen_trustlines(users):
+    simulator = CurrencyNetworkSimulator()
+    simulator.set_account(users[0], users[1], 1000, 1000, 0, 0, is_frozen=True)
+    path_finder = PathFinder(simulator, 0)
+
+    assert path_finder.find_path(users[0], users[1], 1) is None
+    assert path_finder.find_path_receiver_pays(users[0], users[1], 1) is None
+
+
+def test_find_max_transferable_amount(users):
+    simulator = CurrencyNetworkSimulator(capacity_imbalance_fee_divisor=100)
+    simulator.set_account(users[0], users[1], 1000, 1000, 0, 0)
+    simulator.set_account(users[1], users[2], 500, 500, 0, 0)
+    path_finder = PathFinder(simulator, 0)
+
+    # The value and the fee of the mediator have to fit into the capacity of 500 of the first hop
+    assert path_finder.find_max_transferable_amount(users[2], users[0]) == PaymentPath(
+        495, 5, [users[2], users[1], users[0]]
+    )
+
+
+def generate_synthetic_simulator(rng, number_of_users, trustlines_per_user):
+    """Generate a network in which every user has trustlines to random users that joined before"""
+    users = [f"0x{index + 1:040x}" for index in range(number_of_users)]
+    simulator = CurrencyNetworkSimulator(capacity_imbalance_fee_divisor=1000)
+    for index in range(1, number_of_users):
+        for friend in rng.sample(users[:index], min(index, trustlines_per_user)):
+            creditline = rng.randrange(10**6)
+            simulator.set_account(
+                users[index],
+                friend,
+                creditline,
+                creditline,
+                0,
+                0,
+                balance=rng.randint(-creditline, creditline),
+            )
+    return users, simulator
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize(
+    "number_of_users, number_of_searches", [(10_000, 50), (100_000, 5)]
+)
+def test_benchmark_find_path(number_of_users, number_of_searches):
+    rng = random.Random(0)
+    users, simulator = generate_synthetic_simulator(rng, number_of_users, 3)
+
+    start = time.perf_counter()
+    path_finder = PathFinder(simulator, 0)
+    build_duration = time.perf_counter() - start
+
+    searches = [
+        (*rng.sample(users, 2), rng.randrange(10**4))
+        for _ in range(number_of_searches)
+    ]
+    start = time.perf_counter()
+    payment_paths = [
+        path_finder.find_path(source, target, value)
+        for source, target, value in searches
+    ]
+    search_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    max_payment_path = path_finder.find_max_transferable_amount(*searches[0][:2])
+    max_amount_duration = time.perf_counter() - start
+
+    found_paths = [path for path in payment_paths if path is not None]
+    for payment_path in found_paths + [max_payment_path]:
+        if payment_path is not None:
+            assert_path_valid(
+                simulator.transfer_sender_pays, payment_path, MAX_UINT_64, 0
+            )
+
+    print(
+        f"\nBuilt path finder for {number_of_users} users in {build_duration:.3f}s, "
+        f"found {len(found_paths)} of {number_of_searches} paths in {search_duration:.3f}s, "
+        f"{search_duration / number_of_searches * 1000:.1f}ms per search, "
+        f"max transferable amount in {max_amount_duration:.3f}s"
+    )
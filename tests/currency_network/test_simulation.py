@@ -0,0 +1,239 @@
+#! pytest
+
+import random
+import time
+
+import eth_tester.exceptions
+import pytest
+from tldeploy.core import NetworkSettings
+from tldeploy.simulation import (
+    Account,
+    BalanceUpdate,
+    CurrencyNetworkSimulator,
+    TransferFailed,
+    calculate_fees,
+    calculate_fees_reverse,
+    calculate_imbalance_generated,
+)
+
+from tests.currency_network.conftest import deploy_test_network
+
+"""
+Differential tests of the off-chain currency network simulator against `TestCurrencyNetwork`.
+Trustlines and transfers are randomly generated with a fixed seed, every transfer is sent to the chain
+and simulated at the timestamp of its block.
+"""
+
+SECONDS_PER_YEAR = 60 * 60 * 24 * 365
+NUMBER_OF_USERS = 6
+NUMBER_OF_TRANSFERS = 40
+
+network_settings = [
+    NetworkSettings(fee_divisor=100, custom_interests=True),
+    NetworkSettings(
+        fee_divisor=100, custom_interests=True, prevent_mediator_interests=True
+    ),
+    NetworkSettings(fee_divisor=3, default_interest_rate=-500),
+    NetworkSettings(fee_divisor=0, default_interest_rate=1000),
+]
+
+
+def generate_trustlines(rng, users, settings, start_time):
+    edges = [(users[i], users[(i + 1) % len(users)]) for i in range(len(users))]
+    edges += [(users[0], users[3]), (users[1], users[4])]
+    trustlines = []
+    for a, b in edges:
+        creditline_given = rng.randrange(10 ** rng.randint(0, 12))
+        creditline_received = rng.randrange(10 ** rng.randint(0, 12))
+        if settings.custom_interests:
+            interest_rate_given = rng.choice([0, rng.randint(0, 2000)])
+            interest_rate_received = rng.choice([0, rng.randint(0, 2000)])
+        else:
+            interest_rate_given = (
+                interest_rate_received
+            ) = settings.default_interest_rate
+        trustlines.append(
+            (
+                a,
+                b,
+                creditline_given,
+                creditline_received,
+                interest_rate_given,
+                interest_rate_received,
+                rng.random() < 0.05,
+                start_time - rng.randint(0, SECONDS_PER_YEAR),
+                rng.randint(-creditline_received, creditline_given),
+            )
+        )
+    return trustlines
+
+
+def generate_path(rng, simulator, users):
+    path = [rng.choice(users)]
+    for _ in range(rng.randint(1, 4)):
+        path.append(rng.choice(simulator.get_friends(path[-1]) or users))
+    return path
+
+
+def send_transfer(web3, function_call):
+    try:
+        tx_hash = function_call.transact({"gas": 2_000_000})
+    except eth_tester.exceptions.TransactionFailed:
+        return False, []
+    receipt = web3.eth.getTransactionReceipt(tx_hash)
+    return receipt["status"] == 1, receipt
+
+
+@pytest.fixture(params=network_settings)
+def currency_network_contract(web3, request):
+    return deploy_test_network(web3, request.param)
+
+
+@pytest.fixture()
+def users(accounts):
+    return accounts[:NUMBER_OF_USERS]
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_transfers_equal_contract(web3, chain, currency_network_contract, users, seed):
+    rng = random.Random(seed)
+    contract = currency_network_contract
+    settings = NetworkSettings(
+        fee_divisor=contract.functions.capacityImbalanceFeeDivisor().call(),
+        default_interest_rate=contract.functions.defaultInterestRate().call(),
+        custom_interests=contract.functions.customInterests().call(),
+    )
+    timestamp = int(time.time()) + 1000
+    for trustline in generate_trustlines(rng, users, settings, timestamp):
+        contract.functions.setAccount(*trustline).transact()
+
+    simulator = CurrencyNetworkSimulator.from_currency_network(contract)
+
+    for _ in range(NUMBER_OF_TRANSFERS):
+        path = generate_path(rng, simulator, users)
+        value = rng.randrange(10 ** rng.randint(0, 10))
+        max_fee = rng.choice([0, rng.randrange(10 ** rng.randint(0, 8)), 2**64 - 1])
+        sender_pays = rng.random() < 0.5
+        timestamp += rng.choice([1, rng.randint(1, SECONDS_PER_YEAR)])
+
+        if sender_pays:
+            function_call = contract.functions.testTransferSenderPays(
+                value, max_fee, path
+            )
+            simulate_transfer = simulator.transfer_sender_pays
+        else:
+            function_call = contract.functions.testTransferReceiverPays(
+                value, max_fee, path
+            )
+            simulate_transfer = simulator.transfer_receiver_pays
+
+        chain.time_travel(timestamp)
+        success, receipt = send_transfer(web3, function_call)
+        assert web3.eth.getBlock("latest")["timestamp"] == timestamp
+
+        if not success:
+            with pytest.raises(TransferFailed):
+                simulate_transfer(value, max_fee, path, timestamp)
+            continue
+
+        result = simulate_transfer(value, max_fee, path, timestamp)
+        balance_updates = [
+            BalanceUpdate(event.args._from, event.args._to, event.args._value)
+            for event in contract.events.BalanceUpdate().processReceipt(receipt)
+        ]
+        assert result.balance_updates == balance_updates
+
+    assert simulator.get_users() == contract.functions.getUsers().call()
+    for a in users:
+        assert simulator.get_friends(a) == contract.functions.getFriends(a).call()
+        for b in users:
+            if a != b:
+                assert simulator.get_account(a, b) == Account(
+                    *contract.functions.getAccount(a, b).call()
+                )
+
+
+def test_failed_transfer_does_not_change_state(users):
+    simulator = CurrencyNetworkSimulator(capacity_imbalance_fee_divisor=100)
+    simulator.set_account(users[0], users[1], 1000, 1000, 0, 0)
+    simulator.set_account(users[1], users[2], 10, 10, 0, 0)
+
+    with pytest.raises(TransferFailed):
+        simulator.transfer_sender_pays(100, 100, users[:3], 0)
+
+    assert simulator.balance(users[0], users[1]) == 0
+    assert simulator.balance(users[1], users[2]) == 0
+
+
+def test_transfer_without_commit(users):
+    simulator = CurrencyNetworkSimulator(capacity_imbalance_fee_divisor=100)
+    simulator.set_account(users[0], users[1], 1000, 1000, 0, 0)
+    simulator.set_account(users[1], users[2], 1000, 1000, 0, 0)
+
+    result = simulator.transfer_sender_pays(100, 100, users[:3], 0, commit=False)
+
+    assert result.fees == 2
+    assert simulator.balance(users[0], users[1]) == 0
+    assert simulator.transfer_sender_pays(100, 100, users[:3], 0) == result
+    assert simulator.balance(users[0], users[1]) == -102
+    assert simulator.balance(users[2], users[1]) == 100
+
+
+@pytest.fixture(scope="session")
+def test_currency_network_contract(deploy_contract):
+    return deploy_contract("TestCurrencyNetwork")
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_fee_functions_equal_contract(test_currency_network_contract, seed):
+    rng = random.Random(seed)
+    functions = test_currency_network_contract.functions
+    for _ in range(20):
+        value = rng.randrange(2 ** rng.randint(0, 64))
+        balance = rng.randint(-(2**64) + 1, 2**64 - 1) >> rng.randint(0, 64)
+        divisor = rng.choice([0, 2, 3, 100, 1000, 2**16 - 1])
+
+        assert (
+            calculate_imbalance_generated(value, balance)
+            == functions.testImbalanceGenerated(value, balance).call()
+        )
+        assert (
+            calculate_fees(value, divisor)
+            == functions.testCalculateFees(value, divisor).call()
+        )
+        assert (
+            calculate_fees_reverse(value, divisor)
+            == functions.testCalculateFeesReverse(value, divisor).call()
+        )
+
+
+@pytest.mark.benchmark
+def test_benchmark_simulated_transfers(accounts):
+    rng = random.Random(0)
+    users = accounts[:NUMBER_OF_USERS]
+    simulator = CurrencyNetworkSimulator(capacity_imbalance_fee_divisor=100)
+    for a, b, *account in generate_trustlines(
+        rng, users, NetworkSettings(custom_interests=True), SECONDS_PER_YEAR
+    ):
+        simulator.set_account(a, b, *account)
+    transfers = [
+        (rng.randrange(10**6), 2**64 - 1, generate_path(rng, simulator, users))
+        for _ in range(10_000)
+    ]
+
+    start = time.perf_counter()
+    succeeded = 0
+    for value, max_fee, path in transfers:
+        try:
+            simulator.transfer_sender_pays(
+                value, max_fee, path, 2 * SECONDS_PER_YEAR, commit=False
+            )
+            succeeded += 1
+        except TransferFailed:
+            pass
+    duration = time.perf_counter() - start
+
+    print(
+        f"\nSimulated {len(transfers)} transfers ({succeeded} succeeding) in {duration:.3f}s, "
+        f"{len(transfers) / duration:.0f} transfers per second"
+    )
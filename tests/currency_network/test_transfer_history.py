@@ -0,0 +1,81 @@
+#! pytest
+
+import pytest
+from tldeploy.transfer_history import decode_transfers
+
+from tests.currency_network.test_event_store import (
+    deploy_network_with_trustlines,
+    make_transfers,
+    transfers,
+)
+from tests.currency_network.test_information_from_events import (
+    get_delta_balances_of_transfer,
+    get_transfer_path,
+)
+
+"""
+Tests of the transfer decoder against the helpers of `test_information_from_events`,
+which fetch the receipt of every transfer.
+"""
+
+
+@pytest.fixture()
+def currency_network_contract(fresh_web3, accounts, fresh_chain):
+    contract = deploy_network_with_trustlines(fresh_web3, accounts)
+    make_transfers(fresh_web3, fresh_chain, contract, accounts, transfers)
+    return contract
+
+
+def test_decoded_transfers_equal_receipts(currency_network_contract):
+    decoded_transfers = list(decode_transfers(currency_network_contract))
+    transfer_events = currency_network_contract.events.Transfer().getLogs(fromBlock=0)
+
+    assert len(decoded_transfers) == len(transfer_events) == len(transfers)
+    for decoded_transfer, transfer_event in zip(decoded_transfers, transfer_events):
+        assert decoded_transfer.path == get_transfer_path(
+            currency_network_contract, transfer_event
+        )
+        delta_balances = get_delta_balances_of_transfer(
+            currency_network_contract, transfer_event
+        )
+        assert decoded_transfer.delta_balances == delta_balances
+        assert decoded_transfer.fees == sum(delta_balances[1:-1])
+        assert decoded_transfer.value == transfer_event["args"]["_value"]
+
+
+def test_fees(currency_network_contract):
+    for decoded_transfer, (_, value, fee_payer) in zip(
+        decode_transfers(currency_network_contract), transfers
+    ):
+        if fee_payer == "sender":
+            assert decoded_transfer.delta_balances[-1] == value
+            assert -decoded_transfer.delta_balances[0] == value + decoded_transfer.fees
+        else:
+            assert -decoded_transfer.delta_balances[0] == value
+            assert decoded_transfer.delta_balances[-1] == value - decoded_transfer.fees
+        assert decoded_transfer.fees >= 0
+
+
+def test_decode_from_block(currency_network_contract):
+    transfer_events = currency_network_contract.events.Transfer().getLogs(fromBlock=0)
+    from_block = transfer_events[2]["blockNumber"]
+
+    decoded_transfers = list(
+        decode_transfers(currency_network_contract, from_block=from_block)
+    )
+
+    assert [decoded_transfer.log_index for decoded_transfer in decoded_transfers] == [
+        transfer_event["logIndex"] for transfer_event in transfer_events[2:]
+    ]
+    assert decoded_transfers == list(decode_transfers(currency_network_contract))[2:]
+
+
+def test_no_receipts_fetched(fresh_web3, currency_network_contract, monkeypatch):
+    def get_transaction_receipt(transaction_hash):
+        raise AssertionError("Receipt fetched")
+
+    monkeypatch.setattr(
+        fresh_web3.eth, "getTransactionReceipt", get_transaction_receipt
+    )
+
+    assert len(list(decode_transfers(currency_network_contract))) == len(transfers)
@@ -1,14 +1,20 @@
 #! pytest
+import time
+
 import pytest
 import attr
+import tldeploy.core
 from eth_tester.exceptions import TransactionFailed
 from hexbytes import HexBytes
 from tldeploy.core import deploy_network, deploy_identity, NetworkSettings
+from tldeploy.pipeline import TransactionPipeline
 from tldeploy.identity import (
+    Delegate,
     MetaTransaction,
     UnexpectedIdentityContractException,
     build_create2_address,
     MetaTransactionStatus,
+    RelayResult,
 )
 from tldeploy.signing import solidity_keccak, sign_msg_hash
 
@@ -582,6 +588,221 @@ def test_validate_valid_nonce_increase(each_identity, delegate, accounts):
     assert delegate.validate_meta_transaction(meta_transaction2)
 
 
+@pytest.fixture()
+def local_delegate(contract_assets, delegate_address, web3):
+    return Delegate(
+        delegate_address,
+        web3=web3,
+        identity_contract_abi=contract_assets["Identity"]["abi"],
+        default_gas=None,
+        local_validation=True,
+        on_chain_fallback=False,
+    )
+
+
+def test_local_validation_equals_on_chain(
+    each_identity, delegate, local_delegate, accounts, account_keys, chain_id
+):
+    to = accounts[2]
+    local_delegate.get_identity_state(each_identity.address)
+
+    executed_meta_transactions = [
+        MetaTransaction(to=to, value=1, nonce=1),
+        MetaTransaction(to=to, value=2, nonce=0),
+        MetaTransaction(to=to, value=3, nonce=2**255 + 1),
+    ]
+    for meta_transaction in executed_meta_transactions:
+        delegate.send_signed_meta_transaction(
+            each_identity.filled_and_signed_meta_transaction(meta_transaction)
+        )
+    cancelled_meta_transaction = each_identity.filled_and_signed_meta_transaction(
+        MetaTransaction(to=to, value=4, nonce=0)
+    )
+    each_identity.contract.functions.cancelTransaction(
+        cancelled_meta_transaction.hash
+    ).transact({"from": each_identity.contract.functions.owner().call()})
+    local_delegate.sync_identity_states()
+
+    meta_transactions = [
+        each_identity.filled_and_signed_meta_transaction(meta_transaction)
+        for meta_transaction in executed_meta_transactions
+        + [
+            MetaTransaction(to=to, value=5, nonce=2),
+            MetaTransaction(to=to, value=5, nonce=3),
+            MetaTransaction(to=to, value=5, nonce=0),
+            MetaTransaction(to=to, value=5, nonce=2, time_limit=1),
+            MetaTransaction(to=to, value=5, nonce=2, time_limit=2**40),
+            MetaTransaction(to=to, value=5, nonce=2, chain_id=chain_id + 1),
+        ]
+    ] + [
+        cancelled_meta_transaction,
+        MetaTransaction(
+            from_=each_identity.address, to=to, nonce=2, chain_id=chain_id
+        ).signed(account_keys[3]),
+    ]
+
+    local_validations = [
+        local_delegate.validate_meta_transaction(meta_transaction)
+        for meta_transaction in meta_transactions
+    ]
+
+    assert local_validations == [
+        delegate.validate_meta_transaction(meta_transaction)
+        for meta_transaction in meta_transactions
+    ]
+    assert (
+        local_validations
+        == [False] * 3 + [True, False, True, False, True] + [False] * 3
+    )
+    assert local_delegate.get_identity_state(each_identity.address).last_nonce == 1
+
+
+def test_local_validation_invalid_signature(each_identity, local_delegate, accounts):
+    meta_transaction = each_identity.filled_and_signed_meta_transaction(
+        MetaTransaction(to=accounts[2])
+    )
+
+    assert local_delegate.validate_meta_transaction(meta_transaction)
+    for signature in [None, bytes(65), meta_transaction.signature[:64]]:
+        assert not local_delegate.validate_meta_transaction(
+            attr.evolve(meta_transaction, signature=signature)
+        )
+
+
+def test_local_validation_falls_back_on_chain(
+    each_identity, delegate, local_delegate, accounts
+):
+    local_delegate.get_identity_state(each_identity.address)
+    delegate.send_signed_meta_transaction(
+        each_identity.filled_and_signed_meta_transaction(
+            MetaTransaction(to=accounts[2], nonce=1)
+        )
+    )
+    meta_transaction = each_identity.filled_and_signed_meta_transaction(
+        MetaTransaction(to=accounts[2], nonce=2)
+    )
+
+    # The cached state is not synced yet
+    assert not local_delegate.validate_meta_transaction(meta_transaction)
+    local_delegate.on_chain_fallback = True
+    assert local_delegate.validate_meta_transaction(meta_transaction)
+
+
+@pytest.mark.parametrize("nonce", [1, 0, 2**255 + 1])
+def test_local_validation_of_meta_transaction_sent_by_delegate(
+    each_identity, local_delegate, accounts, nonce
+):
+    local_delegate.get_identity_state(each_identity.address)
+    meta_transaction = each_identity.filled_and_signed_meta_transaction(
+        MetaTransaction(to=accounts[2], nonce=nonce)
+    )
+    local_delegate.send_signed_meta_transaction(meta_transaction)
+
+    # The cached state is not synced, but knows the meta transaction sent by the delegate
+    assert not local_delegate.validate_meta_transaction(meta_transaction)
+    if nonce == 1:
+        assert local_delegate.validate_meta_transaction(
+            each_identity.filled_and_signed_meta_transaction(
+                MetaTransaction(to=accounts[2], nonce=2)
+            )
+        )
+
+
+def test_local_validation_from_wrong_contract(
+    local_delegate, accounts, owner_key, currency_network_contract, chain_id
+):
+    meta_transaction = MetaTransaction(
+        from_=currency_network_contract.address,
+        to=accounts[2],
+        nonce=0,
+        chain_id=chain_id,
+    ).signed(owner_key)
+
+    with pytest.raises(UnexpectedIdentityContractException):
+        local_delegate.validate_meta_transaction(meta_transaction)
+
+
+def test_identity_contracts_cached(
+    contract_assets, delegate_address, web3, identity, proxied_identity
+):
+    delegate = Delegate(
+        delegate_address,
+        web3=web3,
+        identity_contract_abi=contract_assets["Identity"]["abi"],
+        contract_cache_size=1,
+    )
+    contract = delegate._get_identity_contract(identity.address)
+
+    assert delegate._get_identity_contract(identity.address) is contract
+    delegate._get_identity_contract(proxied_identity.address)
+    assert delegate._get_identity_contract(identity.address) is not contract
+
+    contract = delegate._get_identity_contract(identity.address)
+    delegate.invalidate_caches()
+    assert delegate._get_identity_contract(identity.address) is not contract
+
+
+def test_chain_id_cached_until_invalidated(
+    each_identity, delegate, accounts, chain_id, monkeypatch
+):
+    calls = []
+
+    def get_chain_id(web3):
+        calls.append(web3)
+        return chain_id
+
+    monkeypatch.setattr(tldeploy.core, "get_chain_id", get_chain_id)
+    delegate.invalidate_caches()
+    meta_transaction = each_identity.filled_and_signed_meta_transaction(
+        MetaTransaction(to=accounts[2], value=1)
+    )
+
+    assert delegate.validate_meta_transaction(meta_transaction)
+    assert delegate.validate_meta_transaction(meta_transaction)
+    assert len(calls) == 1
+
+    delegate.invalidate_caches()
+    assert delegate.validate_meta_transaction(meta_transaction)
+    assert len(calls) == 2
+
+
+@pytest.mark.benchmark
+def test_benchmark_delegate(
+    contract_assets, delegate_address, web3, each_identity, accounts
+):
+    # Meta transactions with nonce 0 are valid independent of the last nonce
+    meta_transactions = each_identity.filled_and_signed_meta_transactions(
+        [MetaTransaction(to=accounts[2], value=value, nonce=0) for value in range(20)]
+    )
+
+    def run(delegate, invalidate_caches):
+        start = time.perf_counter()
+        for meta_transaction in meta_transactions:
+            if invalidate_caches:
+                delegate.invalidate_caches()
+            assert delegate.validate_meta_transaction(meta_transaction)
+        return len(meta_transactions) / (time.perf_counter() - start)
+
+    uncached_delegate = Delegate(
+        delegate_address,
+        web3=web3,
+        identity_contract_abi=contract_assets["Identity"]["abi"],
+        contract_cache_size=0,
+    )
+    cached_delegate = Delegate(
+        delegate_address,
+        web3=web3,
+        identity_contract_abi=contract_assets["Identity"]["abi"],
+    )
+
+    uncached = run(uncached_delegate, invalidate_caches=True)
+    cached = run(cached_delegate, invalidate_caches=False)
+    print(
+        f"\nValidations per second of {len(meta_transactions)} meta transactions: "
+        f"uncached {uncached:.1f}, cached {cached:.1f}"
+    )
+
+
 def test_estimate_gas(each_identity, delegate, accounts):
     to = accounts[2]
     value = 1000
@@ -595,6 +816,114 @@ def test_estimate_gas(each_identity, delegate, accounts):
     )
 
 
+@pytest.fixture()
+def bundle(each_identity, account_keys, accounts, test_contract):
+    """Meta transactions of a bundle, which succeeds, fails in the identity and fails the estimation"""
+    # Meta transactions with nonce 0 do not depend on each other
+    meta_transactions = each_identity.filled_and_signed_meta_transactions(
+        [
+            MetaTransaction(to=accounts[2], value=1000, nonce=0),
+            MetaTransaction.from_function_call(
+                test_contract.functions.fails(), to=test_contract.address, nonce=0
+            ),
+            MetaTransaction(to=accounts[2], value=2000, nonce=0),
+        ]
+    )
+    meta_transactions[2] = meta_transactions[2].signed(account_keys[3])
+    return meta_transactions
+
+
+def test_estimate_gas_signed_meta_transactions(delegate, bundle):
+    gas_estimates = delegate.estimate_gas_signed_meta_transactions(bundle)
+
+    assert gas_estimates[:2] == [
+        delegate.estimate_gas_signed_meta_transaction(meta_transaction)
+        for meta_transaction in bundle[:2]
+    ]
+    assert isinstance(gas_estimates[2], Exception)
+
+
+def test_relay_signed_meta_transactions(web3, delegate, bundle, accounts):
+    balance = web3.eth.getBalance(accounts[2])
+
+    relay_results = delegate.relay_signed_meta_transactions(bundle)
+
+    assert [relay_result.meta_transaction for relay_result in relay_results] == bundle
+    assert [relay_result.status.result() for relay_result in relay_results[:2]] == [
+        MetaTransactionStatus.SUCCESS,
+        MetaTransactionStatus.FAILURE,
+    ]
+    assert relay_results[2] == RelayResult(
+        meta_transaction=bundle[2], error=relay_results[2].error
+    )
+    assert isinstance(relay_results[2].error, Exception)
+    assert web3.eth.getBalance(accounts[2]) == balance + 1000
+
+
+def test_relay_signed_meta_transactions_gas_heavy_call(
+    currency_network_contract, each_identity, delegate, accounts
+):
+    """The envelope transaction does not revert if the call of the meta transaction runs out of gas,
+    so that its estimated gas might not be enough to execute the call"""
+    A = each_identity.address
+    B = accounts[3]
+    to = currency_network_contract.address
+    currency_network_contract.functions.updateCreditlimits(A, 100, 100).transact(
+        {"from": B}
+    )
+    meta_transaction = each_identity.filled_and_signed_meta_transaction(
+        MetaTransaction.from_function_call(
+            currency_network_contract.functions.updateCreditlimits(B, 100, 100),
+            to=to,
+        )
+    )
+
+    (relay_result,) = delegate.relay_signed_meta_transactions([meta_transaction])
+
+    assert relay_result.status.result() == MetaTransactionStatus.SUCCESS
+    assert currency_network_contract.functions.creditline(A, B).call() == 100
+
+
+def test_relay_signed_meta_transactions_with_pipeline(
+    web3, delegate, delegate_address, bundle
+):
+    nonce = web3.eth.getTransactionCount(delegate_address)
+
+    with TransactionPipeline(
+        web3, transaction_options={"from": delegate_address}
+    ) as pipeline:
+        relay_results = delegate.relay_signed_meta_transactions(
+            bundle, pipeline=pipeline
+        )
+        relay_results += delegate.relay_signed_meta_transactions(
+            bundle[1:], pipeline=pipeline
+        )
+
+    assert [
+        relay_result.status.result() if relay_result.status else None
+        for relay_result in relay_results
+    ] == [
+        MetaTransactionStatus.SUCCESS,
+        MetaTransactionStatus.FAILURE,
+        None,
+        # Meta transactions with nonce 0 can not be executed twice
+        None,
+        None,
+    ]
+    assert pipeline.next_nonce == nonce + 2
+    assert web3.eth.getTransactionCount(delegate_address) == nonce + 2
+
+
+def test_relay_signed_meta_transactions_wrong_pipeline(
+    web3, delegate, bundle, accounts
+):
+    with TransactionPipeline(
+        web3, transaction_options={"from": accounts[0]}
+    ) as pipeline:
+        with pytest.raises(ValueError):
+            delegate.relay_signed_meta_transactions(bundle, pipeline=pipeline)
+
+
 def test_deploy_identity(web3, delegate, owner, owner_key, test_contract):
     each_identity_contract = deploy_identity(web3, owner)
 
@@ -630,6 +959,49 @@ def test_next_nonce(each_identity, delegate, accounts):
     assert delegate.get_next_nonce(each_identity.address) == 3
 
 
+def test_filled_and_signed_meta_transactions(each_identity, delegate, accounts):
+    meta_transactions = each_identity.filled_and_signed_meta_transactions(
+        [MetaTransaction(to=accounts[2], value=value) for value in range(3)]
+    )
+
+    assert [meta_transaction.nonce for meta_transaction in meta_transactions] == [
+        1,
+        2,
+        3,
+    ]
+    for meta_transaction in meta_transactions:
+        assert meta_transaction == each_identity.filled_and_signed_meta_transaction(
+            attr.evolve(meta_transaction, signature=None)
+        )
+        delegate.send_signed_meta_transaction(meta_transaction)
+    assert delegate.get_next_nonce(each_identity.address) == 4
+
+
+def test_signed_meta_transactions_in_processes(identity, accounts):
+    meta_transactions = identity.defaults_filled_batch(
+        [MetaTransaction(to=accounts[2], value=value) for value in range(20)]
+    )
+
+    assert identity.signed_meta_transactions(
+        meta_transactions, max_workers=2
+    ) == identity.signed_meta_transactions(meta_transactions)
+
+
+def test_validate_signatures(identity, owner_key, account_keys, accounts):
+    meta_transactions = identity.filled_and_signed_meta_transactions(
+        [MetaTransaction(to=accounts[2], value=value) for value in range(3)]
+    )
+    meta_transactions[1] = meta_transactions[1].signed(account_keys[3])
+    meta_transactions[2] = attr.evolve(meta_transactions[2], signature=bytes(65))
+
+    assert identity.validate_signatures(meta_transactions) == [True, False, False]
+    assert identity.validate_signatures(meta_transactions, max_workers=2) == [
+        True,
+        False,
+        False,
+    ]
+
+
 def test_meta_transaction_with_fees_increases_debt(
     currency_network_contract, each_identity, delegate, delegate_address, accounts
 ):
@@ -1141,6 +1513,41 @@ def test_get_not_found_meta_transaction_status(each_identity, delegate):
     assert meta_tx_status == MetaTransactionStatus.NOT_FOUND
 
 
+@pytest.mark.parametrize("max_block_range", [None, 2])
+def test_get_meta_transaction_status_queries(
+    web3, each_identity, delegate, monkeypatch, max_block_range
+):
+    meta_transaction = each_identity.filled_and_signed_meta_transaction(
+        MetaTransaction(to=each_identity.address)
+    )
+    delegate.send_signed_meta_transaction(meta_transaction)
+    get_logs = web3.eth.get_logs
+    queried_ranges = []
+
+    def get_range_limited_logs(filter_params):
+        from_block, to_block = filter_params["fromBlock"], filter_params["toBlock"]
+        queried_ranges.append((from_block, to_block))
+        if to_block == "latest":
+            to_block = web3.eth.blockNumber
+        if max_block_range is not None and to_block - from_block + 1 > max_block_range:
+            raise ValueError(
+                {"code": -32005, "message": "query returned more than 10000 results"}
+            )
+        return get_logs(filter_params)
+
+    monkeypatch.setattr(web3.eth, "get_logs", get_range_limited_logs)
+
+    meta_tx_status = delegate.get_meta_transaction_status(
+        each_identity.address, meta_transaction.hash
+    )
+
+    assert meta_tx_status == MetaTransactionStatus.SUCCESS
+    if max_block_range is None:
+        assert len(queried_ranges) == 1
+    else:
+        assert len(queried_ranges) > 1
+
+
 def test_set_delegate_transaction_params(web3, each_identity, delegate, accounts):
 
     meta_transaction = each_identity.filled_and_signed_meta_transaction(
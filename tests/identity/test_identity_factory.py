@@ -2,7 +2,12 @@ import pytest
 
 from web3 import Web3
 
-from tldeploy.identity import MetaTransaction, Identity, get_pinned_proxy_interface
+from tldeploy.identity import (
+    Delegate,
+    MetaTransaction,
+    Identity,
+    get_pinned_proxy_interface,
+)
 from eth_tester.exceptions import TransactionFailed
 
 from tldeploy.identity import deploy_proxied_identity, build_create2_address
@@ -260,6 +265,35 @@ def test_change_identity_implementation(
     )
 
 
+def test_local_identity_state_after_implementation_change(
+    contract_assets,
+    web3,
+    identity_implementation_different_address,
+    proxied_identity,
+    delegate,
+):
+    local_delegate = Delegate(
+        delegate.delegate_address,
+        web3=web3,
+        identity_contract_abi=contract_assets["Identity"]["abi"],
+        local_validation=True,
+    )
+    identity_state = local_delegate.get_identity_state(proxied_identity.address)
+
+    function_call = proxied_identity.contract.functions.changeImplementation(
+        identity_implementation_different_address.address
+    )
+    meta_transaction = proxied_identity.filled_and_signed_meta_transaction(
+        MetaTransaction.from_function_call(function_call, to=proxied_identity.address)
+    )
+    assert local_delegate.validate_meta_transaction(meta_transaction)
+    delegate.send_signed_meta_transaction(meta_transaction)
+    local_delegate.sync_identity_states()
+
+    assert identity_state.last_nonce == meta_transaction.nonce
+    assert not local_delegate.validate_meta_transaction_locally(meta_transaction)
+
+
 def test_clientlib_calculate_proxy_address(proxy_factory, get_proxy_initcode):
     """Give out some tests values for pre calculating the proxy address in the clientlib tests"""
 
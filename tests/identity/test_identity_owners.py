@@ -0,0 +1,68 @@
+#! pytest
+
+import pytest
+from tldeploy.identity_owners import (
+    EOA,
+    IDENTITY,
+    OTHER_CONTRACT,
+    IdentityOwnerResolver,
+)
+
+
+@pytest.fixture(scope="session")
+def currency_network_contract(deploy_contract):
+    return deploy_contract("CurrencyNetwork")
+
+
+@pytest.fixture()
+def users(
+    accounts, identity_contract, proxied_identity_contract, currency_network_contract
+):
+    return [
+        accounts[5],
+        identity_contract.address,
+        proxied_identity_contract.address,
+        currency_network_contract.address,
+    ]
+
+
+def test_classify_users(web3, users):
+    resolver = IdentityOwnerResolver(web3)
+
+    assert resolver.classify(users) == [EOA, IDENTITY, IDENTITY, OTHER_CONTRACT]
+
+
+def test_classify_users_in_one_request(http_web3, users):
+    resolver = IdentityOwnerResolver(http_web3)
+    # Contracts with unknown code would be probed with `owner()` outside of the batch
+    known_users = users[:3]
+
+    assert resolver.classify(known_users) == [EOA, IDENTITY, IDENTITY]
+    assert [
+        [request["method"] for request in requests]
+        for requests in http_web3.posted_requests
+    ] == [["eth_getCode"] * len(known_users)]
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_get_owners(web3, users, owner, max_workers):
+    resolver = IdentityOwnerResolver(web3, max_workers=max_workers)
+
+    assert resolver.get_owners(users) == [users[0], owner, owner, users[3]]
+
+
+def test_get_owners_cached(web3, users, owner):
+    resolver = IdentityOwnerResolver(web3)
+    owners = resolver.get_owners(users)
+
+    # Everything is cached, no connection to the chain is needed anymore
+    resolver.web3 = None
+    assert resolver.get_owners(users) == owners
+    assert resolver.get_owner(users[1]) == owner
+
+
+def test_identity_with_unknown_code_is_probed(web3, users, owner):
+    resolver = IdentityOwnerResolver(web3, identity_runtime_codes=set())
+
+    assert resolver.classify(users) == [EOA, IDENTITY, IDENTITY, OTHER_CONTRACT]
+    assert resolver.get_owners(users) == [users[0], owner, owner, users[3]]
@@ -0,0 +1,185 @@
+#! pytest
+
+import random
+import time
+
+import attr
+import pytest
+from eth_utils import to_checksum_address
+from tldeploy.identity import (
+    MetaTransaction,
+    validate_and_checksum_addresses,
+)
+from tldeploy.signing import solidity_keccak
+
+"""
+Tests of the hash of meta transactions against the hash via `solidity_keccak`, which the identity contract agrees
+with as tested in `test_identity.py`.
+"""
+
+MAX_UINT_256 = 2**256 - 1
+
+
+def hash_via_solidity_keccak(meta_transaction):
+    (from_, to, currency_network_of_fees) = validate_and_checksum_addresses(
+        [
+            meta_transaction.from_,
+            meta_transaction.to,
+            meta_transaction.currency_network_of_fees,
+        ]
+    )
+    return solidity_keccak(
+        [
+            "bytes1",
+            "bytes1",
+            "address",
+            "uint256",
+            "uint256",
+            "address",
+            "uint256",
+            "bytes32",
+            "uint256",
+            "uint256",
+            "uint256",
+            "address",
+            "address",
+            "uint256",
+            "uint256",
+            "uint8",
+        ],
+        [
+            "0x19",
+            "0x00",
+            from_,
+            meta_transaction.chain_id,
+            meta_transaction.version,
+            to,
+            meta_transaction.value,
+            solidity_keccak(["bytes"], [meta_transaction.data]),
+            meta_transaction.base_fee,
+            meta_transaction.gas_price,
+            meta_transaction.gas_limit,
+            meta_transaction.fee_recipient,
+            currency_network_of_fees,
+            meta_transaction.nonce,
+            meta_transaction.time_limit,
+            meta_transaction.operation_type.value,
+        ],
+    )
+
+
+def random_address(rng):
+    return to_checksum_address(rng.getrandbits(160).to_bytes(20, byteorder="big"))
+
+
+def random_meta_transaction(rng):
+    return MetaTransaction(
+        from_=random_address(rng),
+        chain_id=rng.choice([1, 4, 61, 2**64]),
+        version=rng.randint(0, 2),
+        to=random_address(rng),
+        value=rng.choice([0, rng.randint(0, MAX_UINT_256)]),
+        data=bytes(rng.getrandbits(8) for _ in range(rng.randint(0, 200))),
+        base_fee=rng.randint(0, 2**64),
+        gas_price=rng.randint(0, 2**64),
+        gas_limit=rng.randint(0, 2**64),
+        fee_recipient=random_address(rng),
+        currency_network_of_fees=random_address(rng),
+        nonce=rng.choice([0, rng.randint(0, MAX_UINT_256)]),
+        time_limit=rng.randint(0, 2**64),
+        operation_type=rng.choice(list(MetaTransaction.OperationType)),
+    )
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_hash_equals_solidity_keccak(seed):
+    meta_transaction = random_meta_transaction(random.Random(seed))
+
+    assert meta_transaction.hash == hash_via_solidity_keccak(meta_transaction)
+
+
+def test_hash_of_hex_data_and_lower_case_addresses():
+    meta_transaction = random_meta_transaction(random.Random(0))
+    meta_transaction = attr.evolve(
+        meta_transaction,
+        from_=meta_transaction.from_.lower(),
+        data="0x" + meta_transaction.data.hex(),
+    )
+
+    assert meta_transaction.hash == hash_via_solidity_keccak(meta_transaction)
+
+
+def test_hash_is_cached_per_meta_transaction():
+    meta_transaction = random_meta_transaction(random.Random(0))
+    hash = meta_transaction.hash
+
+    assert meta_transaction.hash is hash
+    assert attr.evolve(meta_transaction, nonce=1).hash == hash_via_solidity_keccak(
+        attr.evolve(meta_transaction, nonce=1)
+    )
+    assert attr.evolve(meta_transaction, nonce=1).hash != hash
+    assert attr.evolve(meta_transaction, signature=b"signature").hash == hash
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"from_": None},
+        {"to": "0x123"},
+        # Invalid checksum
+        {"currency_network_of_fees": "0x7E5F4552091A69125d5DfCb7b8C2659029395BDF"},
+    ],
+)
+def test_hash_invalid_address(changes):
+    meta_transaction = attr.evolve(random_meta_transaction(random.Random(0)), **changes)
+
+    with pytest.raises(ValueError):
+        meta_transaction.hash
+
+
+def test_hash_without_nonce():
+    meta_transaction = attr.evolve(
+        random_meta_transaction(random.Random(0)), nonce=None
+    )
+
+    with pytest.raises(TypeError):
+        meta_transaction.hash
+
+
+@pytest.mark.benchmark
+def test_benchmark_hash():
+    rng = random.Random(0)
+    # Delegates mostly see meta transactions of the same identities to the same currency networks
+    identities = [random_address(rng) for _ in range(10)]
+    meta_transactions = [
+        attr.evolve(
+            random_meta_transaction(rng),
+            from_=rng.choice(identities),
+            to=identities[0],
+            currency_network_of_fees=identities[0],
+        )
+        for _ in range(2000)
+    ]
+
+    start = time.perf_counter()
+    hashes_via_solidity_keccak = [
+        hash_via_solidity_keccak(meta_transaction)
+        for meta_transaction in meta_transactions
+    ]
+    solidity_keccak_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hashes = [meta_transaction.hash for meta_transaction in meta_transactions]
+    duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cached_hashes = [meta_transaction.hash for meta_transaction in meta_transactions]
+    cached_duration = time.perf_counter() - start
+
+    assert hashes == cached_hashes == hashes_via_solidity_keccak
+    print(
+        f"\nHashes per second of {len(meta_transactions)} meta transactions: "
+        f"solidity_keccak {len(meta_transactions) / solidity_keccak_duration:.0f}, "
+        f"packed {len(meta_transactions) / duration:.0f}, "
+        f"cached {len(meta_transactions) / cached_duration:.0f}"
+    )
@@ -0,0 +1,61 @@
+#! pytest
+
+import pytest
+from tldeploy.batch_request import (
+    estimate_gas_batch,
+    get_code_batch,
+    make_batch_request,
+)
+
+
+@pytest.fixture()
+def transactions(accounts):
+    return [
+        {"from": accounts[0], "to": accounts[1], "data": b"", "value": value}
+        for value in range(3)
+    ] + [
+        # Sending more than the balance fails the estimation
+        {"from": accounts[0], "to": accounts[1], "data": b"", "value": 2**200},
+    ]
+
+
+def test_estimate_gas_batch(web3, transactions):
+    gas_estimates = estimate_gas_batch(web3, transactions)
+
+    assert gas_estimates[:3] == [21000] * 3
+    assert isinstance(gas_estimates[3], Exception)
+
+
+def test_estimate_gas_batch_in_one_request(web3, http_web3, transactions):
+    gas_estimates = estimate_gas_batch(http_web3, transactions)
+
+    assert len(http_web3.posted_requests) == 1
+    assert gas_estimates[:3] == estimate_gas_batch(web3, transactions)[:3]
+    assert isinstance(gas_estimates[3], ValueError)
+
+
+def test_make_batch_request_keeps_order(web3, http_web3, accounts):
+    responses = make_batch_request(
+        http_web3.provider,
+        [("eth_getBalance", [account, "latest"]) for account in accounts[:3]]
+        + [("eth_blockNumber", [])],
+    )
+
+    assert [int(response["result"], 16) for response in responses] == [
+        web3.eth.getBalance(account) for account in accounts[:3]
+    ] + [web3.eth.blockNumber]
+
+
+def test_make_batch_request_without_requests(http_web3):
+    assert make_batch_request(http_web3.provider, []) == []
+    assert http_web3.posted_requests == []
+
+
+def test_get_code_batch_in_one_request(web3, http_web3, accounts, deploy_contract):
+    addresses = [accounts[0], deploy_contract("TestContract").address]
+
+    codes = get_code_batch(http_web3, addresses)
+
+    assert len(http_web3.posted_requests) == 1
+    assert codes == get_code_batch(web3, addresses)
+    assert len(codes[0]) == 0 and len(codes[1]) > 0
@@ -0,0 +1,129 @@
+#! pytest
+
+import pytest
+from tldeploy.core import NetworkSettings
+from tldeploy.events import EventStream, is_range_too_large_error
+
+from tests.currency_network.conftest import deploy_test_network
+
+trustlines = [(0, 1, 100, 150), (1, 2, 200, 250), (2, 3, 300, 350), (3, 4, 400, 450)]
+
+
+class RangeLimitedEvent:
+    """Wrap a contract event so that log queries over more than `max_block_range` blocks fail"""
+
+    def __init__(self, contract_event, max_block_range):
+        self.contract_event = contract_event
+        self.web3 = contract_event.web3
+        self.max_block_range = max_block_range
+        self.queried_ranges = []
+
+    def getLogs(self, *, fromBlock, toBlock, argument_filters=None):
+        self.queried_ranges.append((fromBlock, toBlock))
+        if toBlock - fromBlock + 1 > self.max_block_range:
+            raise ValueError(
+                {"code": -32005, "message": "query returned more than 10000 results"}
+            )
+        return self.contract_event.getLogs(
+            fromBlock=fromBlock, toBlock=toBlock, argument_filters=argument_filters
+        )
+
+
+@pytest.fixture(scope="session")
+def currency_network_contract(web3, accounts):
+    contract = deploy_test_network(web3, NetworkSettings())
+    for (A, B, clAB, clBA) in trustlines:
+        contract.functions.setAccount(
+            accounts[A], accounts[B], clAB, clBA, 0, 0, False, 0, 0
+        ).transact()
+        contract.functions.transfer(1, 0, [accounts[A], accounts[B]], b"").transact(
+            {"from": accounts[A]}
+        )
+    return contract
+
+
+@pytest.mark.parametrize("initial_block_range", [1, 3, 10_000])
+def test_event_stream_yields_all_logs_sorted(
+    currency_network_contract, initial_block_range
+):
+    events = currency_network_contract.events
+    stream = EventStream(
+        [events.Transfer, events.BalanceUpdate], initial_block_range=initial_block_range
+    )
+
+    streamed = list(stream)
+
+    expected = events.Transfer.getLogs(fromBlock=0) + events.BalanceUpdate.getLogs(
+        fromBlock=0
+    )
+    assert len(streamed) == len(expected) > 0
+    assert [(event["blockNumber"], event["logIndex"]) for event in streamed] == sorted(
+        (event["blockNumber"], event["logIndex"]) for event in expected
+    )
+
+
+def test_event_stream_argument_filters(currency_network_contract, accounts):
+    stream = EventStream(
+        [currency_network_contract.events.Transfer],
+        argument_filters={"_from": accounts[1]},
+    )
+
+    streamed = list(stream)
+
+    assert len(streamed) == 1
+    assert streamed[0]["args"]["_to"] == accounts[2]
+
+
+def test_event_stream_shrinks_block_range(currency_network_contract):
+    transfer = RangeLimitedEvent(
+        currency_network_contract.events.Transfer, max_block_range=2
+    )
+    stream = EventStream([transfer], initial_block_range=64)
+
+    streamed = list(stream)
+
+    assert len(streamed) == len(trustlines)
+    assert all(
+        to_block - from_block < 64
+        for from_block, to_block in transfer.queried_ranges[1:]
+    )
+
+
+def test_event_stream_resumes(currency_network_contract):
+    events = currency_network_contract.events
+    stream = EventStream([events.Transfer], initial_block_range=1)
+
+    first_event = next(iter(stream))
+    assert stream.next_block <= first_event["blockNumber"]
+
+    resumed = list(EventStream([events.Transfer], from_block=stream.next_block))
+    assert resumed[0] == first_event
+    assert len(resumed) == len(trustlines)
+
+
+def test_event_stream_raises_if_single_block_fails(currency_network_contract):
+    transfer = RangeLimitedEvent(
+        currency_network_contract.events.Transfer, max_block_range=0
+    )
+
+    with pytest.raises(ValueError):
+        list(EventStream([transfer], initial_block_range=8))
+
+
+@pytest.mark.parametrize(
+    "exception, expected",
+    [
+        (
+            ValueError(
+                {"code": -32005, "message": "query returned more than 10000 results"}
+            ),
+            True,
+        ),
+        (ValueError("Query timeout exceeded"), True),
+        (TimeoutError(), True),
+        (ValueError("execution reverted"), False),
+        (RuntimeError("too many"), False),
+    ],
+)
+def test_is_range_too_large_error(exception, expected):
+    assert is_range_too_large_error(exception) is expected
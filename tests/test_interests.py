@@ -0,0 +1,199 @@
+#! pytest
+
+import random
+import time
+
+import pytest
+from tldeploy.interests import (
+    MAX_BALANCE,
+    MAX_INTEREST_RATE,
+    MIN_BALANCE,
+    MIN_INTEREST_RATE,
+    SECONDS_PER_YEAR,
+    balance_with_interests,
+    calculate_balances_with_interests,
+    calculate_interests,
+)
+
+
+def generate_columns(seed, number_of_rows):
+    rng = random.Random(seed)
+    balances = []
+    rates_positive_balance = []
+    rates_negative_balance = []
+    delta_times = []
+    for _ in range(number_of_rows):
+        balances.append(
+            min(rng.randrange(2 ** rng.randint(0, 64)), MAX_BALANCE)
+            * rng.choice([1, -1, 0])
+        )
+        rates_positive_balance.append(
+            rng.choice(
+                [
+                    0,
+                    rng.randint(-1000, 1000),
+                    rng.randint(MIN_INTEREST_RATE, MAX_INTEREST_RATE),
+                ]
+            )
+        )
+        rates_negative_balance.append(
+            rng.choice(
+                [
+                    0,
+                    rng.randint(-1000, 1000),
+                    rng.randint(MIN_INTEREST_RATE, MAX_INTEREST_RATE),
+                ]
+            )
+        )
+        delta_times.append(
+            rng.choice(
+                [
+                    rng.randint(-60, 60),
+                    rng.randint(0, SECONDS_PER_YEAR),
+                    rng.randint(0, 100 * SECONDS_PER_YEAR),
+                ]
+            )
+        )
+    return balances, rates_positive_balance, rates_negative_balance, delta_times
+
+
+def calculate_interests_order_by_order(
+    balance, internal_interest_rate, delta_time_in_seconds, highest_order=15
+):
+    """Straightforward calculation of the interests, dividing toward zero at every order like solidity"""
+    delta_time_in_seconds = max(delta_time_in_seconds, 0)
+    intermediate_order = balance
+    interests = 0
+    for order in range(1, highest_order + 1):
+        numerator = intermediate_order * internal_interest_rate * delta_time_in_seconds
+        denominator = SECONDS_PER_YEAR * 100 * 100 * order
+        intermediate_order = abs(numerator) // denominator
+        if numerator < 0:
+            intermediate_order = -intermediate_order
+
+        if intermediate_order == 0:
+            break
+        interests += intermediate_order
+    return interests
+
+
+def calculate_balances_with_interests_one_by_one(*columns):
+    return [balance_with_interests(*row) for row in zip(*columns)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batch_equals_scalar(seed):
+    columns = generate_columns(seed, 2000)
+
+    assert calculate_balances_with_interests(
+        *columns
+    ) == calculate_balances_with_interests_one_by_one(*columns)
+
+
+@pytest.mark.parametrize(
+    "row",
+    [
+        (MAX_BALANCE, MAX_INTEREST_RATE, 0, SECONDS_PER_YEAR),
+        (MIN_BALANCE, 0, MAX_INTEREST_RATE, SECONDS_PER_YEAR),
+        (MAX_BALANCE, MIN_INTEREST_RATE, 0, SECONDS_PER_YEAR),
+        (MIN_BALANCE, 0, MIN_INTEREST_RATE, SECONDS_PER_YEAR),
+        (MAX_BALANCE - 10, 1000, 1000, SECONDS_PER_YEAR),
+        (MAX_BALANCE, 10000, 10000, SECONDS_PER_YEAR),
+        (-MAX_BALANCE, -10000, -10000, SECONDS_PER_YEAR),
+        (1000, 1000, 1000, -60),
+        (0, 1000, 1000, SECONDS_PER_YEAR),
+    ],
+)
+def test_batch_equals_scalar_edge_cases(row):
+    columns = [[value] for value in row]
+
+    assert calculate_balances_with_interests(*columns) == [balance_with_interests(*row)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("highest_order", [0, 1, 3, 15, 20])
+def test_calculate_interests_equals_order_by_order(seed, highest_order):
+    balances, rates, _, delta_times = generate_columns(seed, 2000)
+
+    for balance, rate, delta_time in zip(balances, rates, delta_times):
+        assert calculate_interests(
+            balance, rate, delta_time, highest_order
+        ) == calculate_interests_order_by_order(
+            balance, rate, delta_time, highest_order
+        )
+
+
+def test_batch_empty():
+    assert calculate_balances_with_interests([], [], [], []) == []
+
+
+@pytest.mark.parametrize(
+    "columns",
+    [
+        ([1000, 1000], [1000], [1000], [1000]),
+        ([MAX_BALANCE + 1], [1000], [1000], [1000]),
+        ([MIN_BALANCE - 1], [1000], [1000], [1000]),
+        ([1000], [MAX_INTEREST_RATE + 1], [1000], [1000]),
+        ([1000], [1000], [MIN_INTEREST_RATE - 1], [1000]),
+        ([1000], [1000], [1000], [-61]),
+        ([1], [1], [1], [2**200]),
+    ],
+)
+def test_batch_invalid_input(columns):
+    with pytest.raises(ValueError):
+        calculate_balances_with_interests(*columns)
+
+
+def generate_realistic_columns(seed, number_of_rows, max_delta_time):
+    """Generate columns like the ones of a relay updating balances, with rates of at most 10% per year"""
+    rng = random.Random(seed)
+    balances = [rng.randint(-(10**12), 10**12) for _ in range(number_of_rows)]
+    rates_positive_balance = [rng.randint(0, 1000) for _ in range(number_of_rows)]
+    rates_negative_balance = [rng.randint(0, 1000) for _ in range(number_of_rows)]
+    delta_times = [rng.randint(0, max_delta_time) for _ in range(number_of_rows)]
+    return balances, rates_positive_balance, rates_negative_balance, delta_times
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("max_delta_time", [15, 60 * 60, SECONDS_PER_YEAR])
+def test_benchmark_batch_interests(max_delta_time):
+    columns = generate_realistic_columns(0, 100_000, max_delta_time)
+
+    start = time.perf_counter()
+    one_by_one = calculate_balances_with_interests_one_by_one(*columns)
+    one_by_one_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = calculate_balances_with_interests(*columns)
+    batch_duration = time.perf_counter() - start
+
+    assert batch == one_by_one
+    print(
+        f"\nInterests of {len(batch)} trustlines over up to {max_delta_time}s: "
+        f"one by one {one_by_one_duration:.3f}s, batch {batch_duration:.3f}s, "
+        f"speedup {one_by_one_duration / batch_duration:.1f}x"
+    )
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("max_delta_time", [15, 60 * 60, SECONDS_PER_YEAR])
+def test_benchmark_calculate_interests(max_delta_time):
+    balances, rates, _, delta_times = generate_realistic_columns(
+        0, 100_000, max_delta_time
+    )
+    rows = list(zip(balances, rates, delta_times))
+
+    start = time.perf_counter()
+    order_by_order = [calculate_interests_order_by_order(*row) for row in rows]
+    order_by_order_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    interests = [calculate_interests(*row) for row in rows]
+    duration = time.perf_counter() - start
+
+    assert interests == order_by_order
+    print(
+        f"\nInterests of {len(rows)} balances over up to {max_delta_time}s: "
+        f"order by order {order_by_order_duration:.3f}s, calculate_interests {duration:.3f}s, "
+        f"speedup {order_by_order_duration / duration:.1f}x"
+    )
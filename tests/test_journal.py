@@ -0,0 +1,62 @@
+#! pytest
+
+from tldeploy.journal import MigrationJournal, CONFIRMED, FAILED, SENT
+
+NETWORK = "0x" + "01" * 20
+
+
+def test_journal_record_and_reload(tmp_path):
+    file_path = str(tmp_path / "journal.jsonl")
+    journal = MigrationJournal(file_path)
+
+    journal.record(NETWORK, "debt", "a-b", SENT, tx_hash="0x01")
+    journal.record(NETWORK, "debt", "a-b", CONFIRMED, tx_hash="0x01")
+    journal.record(NETWORK, "onboarder", "c", SENT, tx_hash="0x02")
+    journal.record(NETWORK, "onboarder", "d", FAILED, tx_hash="0x03")
+
+    reloaded_journal = MigrationJournal(file_path)
+    assert reloaded_journal.get_status(NETWORK, "debt", "a-b") == CONFIRMED
+    assert reloaded_journal.is_done(NETWORK, "onboarder", "c")
+    assert not reloaded_journal.is_done(NETWORK, "onboarder", "d")
+    assert not reloaded_journal.is_done(NETWORK, "onboarder", "e")
+    assert [
+        record["key"] for record in reloaded_journal.in_flight_records(NETWORK)
+    ] == ["c"]
+    assert reloaded_journal.in_flight_records("0x" + "02" * 20) == []
+
+
+def test_journal_ignores_truncated_last_line(tmp_path):
+    file_path = str(tmp_path / "journal.jsonl")
+    MigrationJournal(file_path).record(NETWORK, "account", "a-b", CONFIRMED)
+    with open(file_path, "a") as file:
+        file.write('{"network": "0x01", "ki')
+
+    journal = MigrationJournal(file_path)
+
+    assert journal.get_status(NETWORK, "account", "a-b") == CONFIRMED
+
+
+def test_journal_records_after_truncated_last_line(tmp_path):
+    file_path = str(tmp_path / "journal.jsonl")
+    MigrationJournal(file_path).record(NETWORK, "account", "a-b", CONFIRMED)
+    with open(file_path, "a") as file:
+        file.write('{"network": "0x01", "ki')
+
+    MigrationJournal(file_path).record(NETWORK, "debt", "a-b", SENT, tx_hash="0x01")
+    journal = MigrationJournal(file_path)
+
+    assert journal.get_status(NETWORK, "account", "a-b") == CONFIRMED
+    assert journal.get_status(NETWORK, "debt", "a-b") == SENT
+
+
+def test_journal_keeps_complete_last_line_without_line_break(tmp_path):
+    file_path = str(tmp_path / "journal.jsonl")
+    MigrationJournal(file_path).record(NETWORK, "account", "a-b", CONFIRMED)
+    with open(file_path, "rb+") as file:
+        file.truncate(len(file.read()) - 1)
+
+    MigrationJournal(file_path).record(NETWORK, "debt", "a-b", SENT, tx_hash="0x01")
+    journal = MigrationJournal(file_path)
+
+    assert journal.get_status(NETWORK, "account", "a-b") == CONFIRMED
+    assert journal.get_status(NETWORK, "debt", "a-b") == SENT
@@ -0,0 +1,73 @@
+#! pytest
+
+import eth_tester.exceptions
+import pytest
+from tldeploy.core import NetworkSettings, deploy_multicall
+from tldeploy.multicall import Multicall, call_all
+
+from tests.currency_network.conftest import deploy_test_network
+
+trustlines = [(0, 1, 100, 150), (1, 2, 200, 250), (2, 3, 300, 350), (3, 4, 400, 450)]
+
+
+@pytest.fixture(scope="session")
+def multicall_contract(web3):
+    return deploy_multicall(web3=web3)
+
+
+@pytest.fixture(scope="session")
+def currency_network_contract(web3, accounts):
+    contract = deploy_test_network(web3, NetworkSettings())
+    for (A, B, clAB, clBA) in trustlines:
+        contract.functions.setAccount(
+            accounts[A], accounts[B], clAB, clBA, 0, 0, False, 0, 0
+        ).transact()
+        contract.functions.transfer(1, 0, [accounts[A], accounts[B]], b"").transact(
+            {"from": accounts[A]}
+        )
+    return contract
+
+
+def get_function_calls(currency_network_contract, accounts):
+    functions = currency_network_contract.functions
+    function_calls = [functions.getUsers(), functions.name()]
+    for (A, B, _, _) in trustlines:
+        function_calls += [
+            functions.getAccount(accounts[A], accounts[B]),
+            functions.getFriends(accounts[A]),
+            functions.balance(accounts[A], accounts[B]),
+            functions.creditline(accounts[A], accounts[B]),
+        ]
+    return function_calls
+
+
+@pytest.mark.parametrize("max_calls_per_request", [1, 7, 500])
+def test_multicall_results_equal_single_calls(
+    web3, multicall_contract, currency_network_contract, accounts, max_calls_per_request
+):
+    function_calls = get_function_calls(currency_network_contract, accounts)
+    multicall = Multicall(
+        web3, multicall_contract.address, max_calls_per_request=max_calls_per_request
+    )
+
+    assert multicall.call(function_calls) == call_all(function_calls)
+
+
+def test_multicall_no_calls(web3, multicall_contract):
+    assert Multicall(web3, multicall_contract.address).call([]) == []
+
+
+def test_multicall_failing_call(web3, multicall_contract, currency_network_contract):
+    multicall = Multicall(web3, multicall_contract.address)
+    # The currency network has no function `aggregate` and will revert
+    failing_call = web3.eth.contract(
+        address=currency_network_contract.address, abi=multicall_contract.abi
+    ).functions.aggregate([])
+
+    with pytest.raises(eth_tester.exceptions.TransactionFailed):
+        multicall.call([currency_network_contract.functions.getUsers(), failing_call])
+
+
+def test_multicall_invalid_max_calls_per_request(web3, multicall_contract):
+    with pytest.raises(ValueError):
+        Multicall(web3, multicall_contract.address, max_calls_per_request=0)
@@ -0,0 +1,66 @@
+#! pytest
+
+import pytest
+from deploy_tools.transact import TransactionFailed
+from tldeploy.pipeline import TransactionPipeline
+
+
+def test_pipeline_deploys_and_sends_back_to_back(web3, accounts):
+    nonce = web3.eth.getTransactionCount(accounts[0])
+
+    with TransactionPipeline(web3) as pipeline:
+        exchange_future = pipeline.deploy("Exchange")
+        unw_eth_future = pipeline.deploy("UnwEth")
+        exchange = exchange_future.result()
+        unw_eth = unw_eth_future.result()
+        receipt = pipeline.send_function_call(
+            unw_eth.functions.addAuthorizedAddress(exchange.address)
+        ).result()
+
+    assert receipt["status"] == 1
+    assert unw_eth.functions.globalAuthorized(exchange.address).call()
+    assert pipeline.next_nonce == nonce + 3
+    assert web3.eth.getTransactionCount(accounts[0]) == nonce + 3
+
+
+def test_pipeline_with_private_key_and_nonce(web3, accounts, account_keys):
+    nonce = web3.eth.getTransactionCount(accounts[2])
+
+    with TransactionPipeline(
+        web3, transaction_options={"nonce": nonce}, private_key=account_keys[2]
+    ) as pipeline:
+        futures = [pipeline.deploy("Exchange") for _ in range(3)]
+        contracts = [future.result() for future in futures]
+
+    assert len({contract.address for contract in contracts}) == 3
+    assert web3.eth.getTransactionCount(accounts[2]) == nonce + 3
+
+
+def test_pipeline_failed_transaction(web3, accounts):
+    with TransactionPipeline(web3) as pipeline:
+        unw_eth = pipeline.deploy("UnwEth").result()
+
+    # Removing an address that is not authorized reverts, the gas is given to skip failing gas estimation
+    with TransactionPipeline(
+        web3, transaction_options={"from": accounts[1], "gas": 1_000_000}
+    ) as pipeline:
+        future = pipeline.send_function_call(
+            unw_eth.functions.removeAuthorizedAddress(accounts[2])
+        )
+        with pytest.raises(TransactionFailed):
+            future.result()
+
+
+def test_pipeline_send_with_gas(web3, accounts):
+    with TransactionPipeline(web3) as pipeline:
+        unw_eth = pipeline.deploy("UnwEth").result()
+        receipt = pipeline.send_function_call(
+            unw_eth.functions.addAuthorizedAddress(accounts[2]), gas=200_000
+        ).result()
+
+    assert web3.eth.getTransaction(receipt["transactionHash"])["gas"] == 200_000
+
+
+def test_pipeline_invalid_max_in_flight(web3):
+    with pytest.raises(ValueError):
+        TransactionPipeline(web3, max_in_flight=0)
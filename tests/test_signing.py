@@ -1,7 +1,13 @@
 #! pytest
 
 from eth_utils import to_checksum_address
-from tldeploy.signing import eth_validate, eth_sign
+from tldeploy.signing import (
+    eth_sign,
+    eth_validate,
+    recover_msg_hash_signers,
+    sign_msg_hash,
+    sign_msg_hashes,
+)
 
 
 def test_eth_validate(accounts, account_keys):
@@ -31,3 +37,27 @@ def test_eth_validate_fail2(accounts, account_keys):
     r = 18
     s = 2748
     assert not eth_validate(msg_hash, (v, r, s), to_checksum_address(address))
+
+
+def test_sign_msg_hashes(account_keys):
+    key = account_keys[0]
+    hashes = [i.to_bytes(32, byteorder="big") for i in range(10)]
+
+    signatures = sign_msg_hashes(hashes, key)
+
+    assert signatures == [sign_msg_hash(hash, key) for hash in hashes]
+    assert sign_msg_hashes(hashes, key, max_workers=3) == signatures
+
+
+def test_recover_msg_hash_signers(accounts, account_keys):
+    hashes = [i.to_bytes(32, byteorder="big") for i in range(3)]
+    signatures = [
+        sign_msg_hash(hashes[0], account_keys[0]),
+        sign_msg_hash(hashes[1], account_keys[1]),
+        bytes(65),
+    ]
+
+    signers = recover_msg_hash_signers(hashes, signatures)
+
+    assert signers == [accounts[0], accounts[1], None]
+    assert recover_msg_hash_signers(hashes, signatures, max_workers=2) == signers